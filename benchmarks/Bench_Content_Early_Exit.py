@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+БЕНЧМАРК: РАННИЙ ВЫХОД ИЗ ПАГИНАЦИИ CONTENT API (get_product_info_from_cabinet)
+
+Синтетический каталог (по умолчанию 50 000 карточек, 500 страниц по 100)
+отдаётся из памяти вместо content-api.wildberries.ru. Сравниваются:
+- старая проверка: список найденных пересобирается на каждой странице,
+  совпадения по vendorCode не учитываются (выход может не сработать вовсе)
+- новая: множество ещё не найденных артикулов по nmID и vendorCode
+
+ЗАПУСК:
+    python benchmarks/Bench_Content_Early_Exit.py
+    python benchmarks/Bench_Content_Early_Exit.py --cards 100000 --targets 5000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "parsers"))
+import WB_Content_Sync  # noqa: E402
+import Parser_WB_API_FAST  # noqa: E402
+from WB_Content_Sync import iter_content_pages, CONTENT_PAGE_LIMIT  # noqa: E402
+
+
+class _FakeResponse:
+    status_code = 200
+    text = ""
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def make_catalog(count):
+    """Каталог карточек в порядке выдачи cards/list"""
+    return [
+        {"nmID": 100_000_000 + i, "vendorCode": f"ART-{i}", "title": f"Товар {i}",
+         "updatedAt": f"2026-01-01T00:00:{i:08d}Z"}
+        for i in range(count)
+    ]
+
+
+def make_fake_post(catalog, counter):
+    """Подмена http_post: отдаёт страницы каталога по курсору nmID"""
+    position = {card["nmID"]: i for i, card in enumerate(catalog)}
+
+    def fake_post(url, api_key=None, json=None, timeout=None):
+        counter[0] += 1
+        cursor = json["settings"]["cursor"]
+        start = position[cursor["nmID"]] + 1 if cursor.get("nmID") else 0
+        cards = catalog[start:start + CONTENT_PAGE_LIMIT]
+        last = cards[-1] if cards else {}
+        return _FakeResponse({"cards": cards, "cursor": {"updatedAt": last.get("updatedAt", ""),
+                                                         "nmID": last.get("nmID", 0)}})
+
+    return fake_post
+
+
+def old_early_exit(articles_set, cabinet_name):
+    """Прежняя логика: list comprehension по найденным на каждой странице"""
+    product_info = {}
+    for page, cards, cursor_data in iter_content_pages("key", cabinet_name):
+        for card in cards:
+            nm_id = str(card.get("nmID", ""))
+            vendor_code = str(card.get("vendorCode", ""))
+            if nm_id in articles_set or vendor_code in articles_set:
+                product_info[nm_id] = {"nmID": nm_id, "vendorCode": vendor_code, "cabinet": cabinet_name}
+        if len([x for x in product_info if str(x) in articles_set]) >= len(articles_set):
+            break
+    return product_info
+
+
+def new_early_exit(articles_set, cabinet_name):
+    return Parser_WB_API_FAST.get_product_info_from_cabinet(articles_set, "key", cabinet_name, 1, 1)
+
+
+def run_case(title, catalog, articles_set, runs):
+    print(f"\n{title} (артикулов: {len(articles_set)})")
+    for name, func in (("старая проверка", old_early_exit), ("новая проверка", new_early_exit)):
+        counter = [0]
+        WB_Content_Sync.http_post = make_fake_post(catalog, counter)
+        timings = []
+        found = 0
+        for _ in range(runs):
+            counter[0] = 0
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                found = len(func(articles_set, "BENCH"))
+            timings.append(time.perf_counter() - start)
+        print(f"  {name:16s}: страниц {counter[0]:5d} | найдено {found:5d} | {min(timings) * 1000:8.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ранний выход из пагинации Content API")
+    parser.add_argument("--cards", type=int, default=50_000, help="Размер каталога")
+    parser.add_argument("--targets", type=int, default=2_000, help="Сколько артикулов искать")
+    parser.add_argument("--runs", type=int, default=3, help="Повторов (берётся лучший)")
+    args = parser.parse_args()
+
+    Parser_WB_API_FAST.INCREMENTAL_CONTENT_SYNC = False
+    random.seed(42)
+    catalog = make_catalog(args.cards)
+    # Все цели в первых 60% каталога - дальше листать незачем
+    head = catalog[:int(len(catalog) * 0.6)]
+    sample = random.sample(head, args.targets)
+
+    print("=" * 80)
+    print(f"КАТАЛОГ: {len(catalog)} карточек, {len(catalog) // CONTENT_PAGE_LIMIT} страниц")
+    print("=" * 80)
+
+    nm_targets = {str(card["nmID"]) for card in sample}
+    run_case("Поиск по nmID", catalog, nm_targets, args.runs)
+
+    half = len(sample) // 2
+    mixed_targets = ({str(card["nmID"]) for card in sample[:half]}
+                     | {card["vendorCode"] for card in sample[half:]})
+    run_case("Поиск по nmID + vendorCode", catalog, mixed_targets, args.runs)
+
+    # Часть артикулов в кабинете нет - обе проверки проходят каталог целиком
+    missing_targets = nm_targets | {"999999999"}
+    run_case("Часть артикулов не найдена", catalog, missing_targets, args.runs)
+
+
+if __name__ == "__main__":
+    main()
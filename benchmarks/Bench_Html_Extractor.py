@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+БЕНЧМАРК И ПРОВЕРКА: ЦЕНЫ СО СНИМКА СТРАНИЦЫ (WB_Html_Extractor) НА code_pages
+
+1. Проверка: extract_prices на сохранённых страницах и элементах code_pages
+   сравнивается с ожидаемыми значениями (код выхода 1, если что-то не совпало).
+   Дополнительно - страница товара с ценой после клика на кошелёк
+   (copy_black_price.html, вставленная в блок цены) и заглушка captcha.
+2. Скорость на product_page_example.html:
+   - по селектору: как раньше - отдельный поиск на каждый из селекторов
+     Parser_WB_Search (XPath-аналоги) и два прохода page_source.lower()
+   - один проход: extract_prices (разбор + один обход элементов)
+   - проверки captcha и "нет в наличии": два page_source.lower() (как раньше)
+     против PageSnapshot (одна копия lower(), без разбора дерева)
+   В браузере старый способ ещё и платит запрос к драйверу за каждый селектор
+   (до 9 ожиданий по 3-5 сек, если цены нет) и за каждый page_source - здесь это
+   не учитывается.
+
+ЗАПУСК:
+    python benchmarks/Bench_Html_Extractor.py
+    python benchmarks/Bench_Html_Extractor.py -n 50
+    python benchmarks/Bench_Html_Extractor.py --html data/страница.html   # разобрать свою страницу
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_PAGES_DIR = os.path.join(PROJECT_ROOT, "code_pages")
+PRODUCT_PAGE = os.path.join(CODE_PAGES_DIR, "pages", "product_page_example.html")
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "parsers"))
+from lxml import etree  # noqa: E402
+from WB_Html_Extractor import extract_prices, PageSnapshot, UNAVAILABLE_KEYWORDS, _PARSER  # noqa: E402
+
+EMPTY = {"price": None, "wallet_price": None, "old_price": None,
+         "sold_out": None, "captcha": False, "wallet_button": False}
+
+# Файл из code_pages -> поля, отличающиеся от пустого результата
+EXPECTED = {
+    "pages/product_page_example.html": {"wallet_price": 349.0, "old_price": 983.0, "wallet_button": True},
+    "elements/copy_black_price.html": {"price": 364.0},
+    "elements/sold_out_product.html": {"sold_out": "Нет в наличии"},
+    "elements/tap_find_black_price.html": {"wallet_price": 349.0, "wallet_button": True},
+    "elements/example_price_with_discount.html": {},
+    "elements/example_one_list_product.html": {},
+    "elements/products_in_list.html": {},
+    "elements/elements_in_title_product": {},
+    "elements/example_discount_wb.html": {},
+}
+
+# Селекторы Parser_WB_Search до снимка страницы (XPath-аналоги CSS), по одному поиску на каждый
+OLD_SELECTORS = [
+    "//h2[contains(@class, 'soldOutProduct')]",
+    "//button[contains(@class, 'priceBlockWalletPrice')]",
+    "//h2[contains(concat(' ', @class, ' '), ' mo-typography_color_primary ')]",
+    "//h2[contains(@class, 'mo-typography') and contains(@class, 'color_primary')]",
+    "//ins[contains(concat(' ', @class, ' '), ' priceBlockFinalPrice--iToZR ')]",
+    "//ins[contains(@class, 'priceBlockFinalPrice')]",
+    "//ins[contains(concat(' ', @class, ' '), ' mo-typography ') and contains(@class, 'priceBlockFinalPrice')]",
+    "//ins[contains(@class, 'priceBlockFinalPrice') and contains(@class, 'mo-typography')]",
+    "//ins[contains(@class, 'FinalPrice')]",
+    "//span[contains(@class, 'final-price')]",
+    "//ins[contains(@class, 'price')]",
+]
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def after_wallet_click(page_html):
+    """Страница товара в состоянии после клика: цена без кошелька появилась в блоке цены"""
+    black_price = read(os.path.join(CODE_PAGES_DIR, "elements", "copy_black_price.html")).strip()
+    marker = '<span class="mo-typography mo-typography_variant_body-strikethrough'
+    position = page_html.index(marker)
+    return page_html[:position] + black_price + page_html[position:]
+
+
+def check_fixtures():
+    """Сравнивает результат extract_prices с ожидаемым, возвращает число ошибок"""
+    cases = [(name, read(os.path.join(CODE_PAGES_DIR, name)), dict(EMPTY, **fields))
+             for name, fields in EXPECTED.items()]
+    cases.append(("pages/product_page_example.html + клик по кошельку",
+                  after_wallet_click(read(PRODUCT_PAGE)),
+                  dict(EMPTY, price=364.0, wallet_price=349.0, old_price=983.0, wallet_button=True)))
+    cases.append(("заглушка captcha", "<html><head><title>Почти готово...</title></head><body></body></html>",
+                  dict(EMPTY, captcha=True)))
+
+    print("=" * 80)
+    print("ПРОВЕРКА НА code_pages")
+    print("=" * 80)
+    errors = 0
+    for name, page_html, expected in cases:
+        result = extract_prices(page_html)
+        wrong = {key: value for key, value in result.items() if expected[key] != value}
+        if wrong:
+            errors += 1
+            print(f"  ✗ {name}")
+            for key, value in wrong.items():
+                print(f"      {key}: {value!r}, ожидалось {expected[key]!r}")
+        else:
+            found = ", ".join(f"{key}={value}" for key, value in result.items() if value) or "ничего"
+            print(f"  ✓ {name}: {found}")
+    return errors
+
+
+def old_way(page_html):
+    """Отдельный поиск на каждый селектор + два прохода page_source.lower(), как раньше"""
+    lowered = page_html.lower()
+    "captcha" in lowered
+    root = etree.fromstring(page_html, _PARSER)
+    found = [root.xpath(selector) for selector in OLD_SELECTORS]
+    lowered = page_html.lower()
+    any(keyword in lowered for keyword in UNAVAILABLE_KEYWORDS)
+    return found
+
+
+def old_checks(page_html):
+    """Captcha и ключевые слова: два полных page_source.lower(), как раньше"""
+    captcha = "captcha" in page_html.lower()
+    lowered = page_html.lower()
+    return captcha, [keyword for keyword in UNAVAILABLE_KEYWORDS if keyword in lowered]
+
+
+def snapshot_checks(page_html):
+    page = PageSnapshot(page_html)
+    return page.captcha, page.sold_out
+
+
+def measure(func, page_html, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(page_html)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка и скорость WB_Html_Extractor на code_pages")
+    parser.add_argument("-n", "--runs", type=int, default=20, help="прогонов на замер (берётся медиана)")
+    parser.add_argument("--html", metavar="FILE", help="разобрать сохранённую страницу и показать результат")
+    args = parser.parse_args()
+
+    if args.html:
+        print(extract_prices(read(args.html)))
+        return 0
+
+    errors = check_fixtures()
+
+    page_html = read(PRODUCT_PAGE)
+    parse_ms = measure(lambda text: etree.fromstring(text, _PARSER), page_html, args.runs)
+    old_ms = measure(old_way, page_html, args.runs)
+    new_ms = measure(extract_prices, page_html, args.runs)
+    old_checks_ms = measure(old_checks, page_html, args.runs)
+    new_checks_ms = measure(snapshot_checks, page_html, args.runs)
+
+    print("\n" + "=" * 80)
+    print(f"СКОРОСТЬ: product_page_example.html ({len(page_html) // 1024} КБ, медиана из {args.runs})")
+    print("=" * 80)
+    print(f"  Разбор HTML (lxml):            {parse_ms:7.1f} мс")
+    print(f"  По селектору ({len(OLD_SELECTORS)} поисков):     {old_ms:7.1f} мс")
+    print(f"  Один проход (extract_prices):  {new_ms:7.1f} мс  ({1000 / new_ms:.0f} страниц/сек)")
+    print(f"  Captcha + 'нет в наличии': два lower() {old_checks_ms:.1f} мс, "
+          f"PageSnapshot {new_checks_ms:.1f} мс (без разбора дерева)")
+    print(f"  Запросов к браузеру на товар: было до {len(OLD_SELECTORS) + 3}, "
+          f"стало 1 (2 - если нужен клик по кошельку)")
+
+    print("\n" + ("✓ Все страницы разобраны верно" if not errors else f"[!] Ошибок: {errors}"))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
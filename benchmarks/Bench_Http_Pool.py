@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+БЕНЧМАРК: ГОЛЫЕ requests.get ПРОТИВ ОБЩЕГО ПУЛА СОЕДИНЕНИЙ (WB_Http_Client)
+
+Голый requests.get открывает новое TCP+TLS соединение на каждый запрос.
+Сессия из WB_Http_Client переиспользует соединение (keep-alive),
+поэтому разница средних времён ≈ стоимость рукопожатия.
+
+ЗАПУСК:
+    python benchmarks/Bench_Http_Pool.py                 # WB API (нужен интернет)
+    python benchmarks/Bench_Http_Pool.py --url URL -n 50
+    python benchmarks/Bench_Http_Pool.py --local         # локальный сервер (без интернета, только TCP)
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "parsers"))
+from WB_Http_Client import create_session  # noqa: E402
+
+DEFAULT_URL = "https://discounts-prices-api.wildberries.ru/ping"
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """Минимальный HTTP/1.1 сервер с keep-alive"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024  # заголовки и тело уходят одним пакетом
+
+    def do_GET(self):
+        body = b'{"Status":"OK"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_local_server():
+    """Запускает локальный сервер в фоне, возвращает (server, url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/ping"
+
+
+def measure(fetch, url, count):
+    """Выполняет count запросов, возвращает список времён (мс)"""
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            fetch(url, timeout=10).content
+        except requests.RequestException as e:
+            print(f"[!] Ошибка запроса: {e}")
+            return []
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def print_stats(name, timings):
+    if not timings:
+        print(f"{name:<28} нет данных")
+        return
+    print(f"{name:<28} среднее {statistics.mean(timings):8.2f} мс | "
+          f"медиана {statistics.median(timings):8.2f} мс | всего {sum(timings):9.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пула HTTP соединений")
+    parser.add_argument("--url", default=DEFAULT_URL, help="URL для запросов")
+    parser.add_argument("-n", "--count", type=int, default=30, help="Количество запросов")
+    parser.add_argument("--local", action="store_true", help="Использовать локальный сервер")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.local:
+        server, url = start_local_server()
+
+    print("\n" + "="*80)
+    print("БЕНЧМАРК HTTP: новое соединение на запрос vs пул соединений")
+    print("="*80)
+    print(f"URL: {url}")
+    print(f"Запросов: {args.count}\n")
+
+    bare = measure(requests.get, url, args.count)
+
+    session = create_session()
+    measure(session.get, url, 1)  # прогрев: первое соединение открывается один раз
+    pooled = measure(session.get, url, args.count)
+    session.close()
+
+    print_stats("requests.get (без пула)", bare)
+    print_stats("WB_Http_Client (пул)", pooled)
+
+    if bare and pooled:
+        saved = statistics.mean(bare) - statistics.mean(pooled)
+        print(f"\nЭкономия на рукопожатии: ~{saved:.2f} мс на запрос "
+              f"({saved * args.count / 1000:.2f} сек на {args.count} запросов)")
+    print("="*80)
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+БЕНЧМАРК: ХОЛОДНЫЙ СТАРТ КАЖДОГО РЕЖИМА (python -X importtime)
+
+Для каждого режима wbparser.py (и браузерного Parser_WB_Search.py) в новом процессе
+импортируется модуль режима - ровно то, что делает wbparser.py перед запуском.
+Из вывода -X importtime считается:
+- время импортов (сумма cumulative по модулям верхнего уровня)
+- время процесса целиком за вычетом голого "python -c pass"
+- загружен ли браузерный стек (selenium / webdriver_manager / undetected_chromedriver)
+- самые тяжёлые пакеты (что стоит перенести в ленивый импорт)
+
+API-режимы (fast, all, ids, card) не должны загружать браузерный стек вовсе.
+
+ЗАПУСК:
+    python benchmarks/Bench_Startup_Importtime.py             # все режимы, 5 прогонов
+    python benchmarks/Bench_Startup_Importtime.py -n 10 --top 8
+    python benchmarks/Bench_Startup_Importtime.py --save      # дописать итог в data/startup_importtime.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARSERS_DIR = os.path.join(PROJECT_ROOT, "parsers")
+HISTORY_FILE = os.path.join(PROJECT_ROOT, "data", "startup_importtime.jsonl")
+
+sys.path.insert(0, PARSERS_DIR)
+from wbparser import MODES  # noqa: E402
+
+BROWSER_STACK = ("selenium", "webdriver_manager", "undetected_chromedriver")
+
+
+def mode_modules():
+    """[(режим, модуль)] - режимы wbparser.py плюс отдельный браузерный парсер"""
+    return [(mode, spec["module"]) for mode, spec in MODES.items()] + [("search", "Parser_WB_Search")]
+
+
+def run_python(code, importtime=False):
+    """Запускает python -c code в новом процессе, возвращает (сек, код выхода, stderr)"""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    env = dict(os.environ, PYTHONPATH=PARSERS_DIR, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=PARSERS_DIR, env=env, capture_output=True, text=True)
+    return time.perf_counter() - start, result.returncode, result.stderr
+
+
+def parse_importtime(stderr):
+    """
+    Разбирает строки "import time: self | cumulative | name"
+    Возвращает (мкс импортов верхнего уровня, {пакет: мкс самого внешнего импорта}, множество модулей)
+    """
+    total, packages, modules = 0, {}, set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        cumulative = int(parts[1])
+        modules.add(name.strip())
+        # Вложенные импорты идут с отступом после "|"
+        if len(name) - len(name.lstrip()) <= 1:
+            total += cumulative
+        package = name.strip().split(".")[0]
+        packages[package] = max(packages.get(package, 0), cumulative)
+    return total, packages, modules
+
+
+def measure_mode(module, runs):
+    """Медианы по runs прогонам: (процесс мс, импорты мс, модулей, браузерный стек, тяжёлые пакеты, ошибка)"""
+    wall_times, import_times = [], []
+    packages, modules, error = {}, set(), None
+
+    for _ in range(runs):
+        elapsed, returncode, stderr = run_python(f"import {module}", importtime=True)
+        if returncode != 0:
+            error = stderr.strip().splitlines()[-1] if stderr.strip() else f"код выхода {returncode}"
+            break
+        total, packages, modules = parse_importtime(stderr)
+        wall_times.append(elapsed * 1000)
+        import_times.append(total / 1000)
+
+    if error:
+        return None, None, 0, False, [], error
+
+    browser = any(name.split(".")[0] in BROWSER_STACK for name in modules)
+    # Сам модуль режима и служебные импорты интерпретатора не интересны
+    heaviest = sorted(((name, us) for name, us in packages.items() if name not in (module, "site", "encodings")),
+                      key=lambda item: item[1], reverse=True)
+    return (statistics.median(wall_times), statistics.median(import_times), len(modules),
+            browser, heaviest, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Холодный старт режимов парсера (-X importtime)")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="прогонов на режим (берётся медиана)")
+    parser.add_argument("--top", type=int, default=5, help="сколько самых тяжёлых пакетов показать")
+    parser.add_argument("--save", action="store_true", help=f"дописать итог в {HISTORY_FILE}")
+    args = parser.parse_args()
+
+    # Запуск интерпретатора без импортов - вычитается из времени процесса
+    baseline = statistics.median(run_python("pass")[0] * 1000 for _ in range(args.runs))
+
+    print("=" * 80)
+    print(f"ХОЛОДНЫЙ СТАРТ РЕЖИМОВ (медиана из {args.runs}, голый python: {baseline:.0f} мс)")
+    print("=" * 80)
+    print(f"{'Режим':<9}{'Модуль':<25}{'Процесс, мс':>12}{'Импорты, мс':>13}{'Модулей':>9}  Браузер")
+
+    report = {"date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "python": sys.version.split()[0],
+              "baseline_ms": round(baseline, 1), "modes": {}}
+    details = []
+    for mode, module in mode_modules():
+        wall, imports, count, browser, heaviest, error = measure_mode(module, args.runs)
+        if error:
+            print(f"{mode:<9}{module:<25}  [!] не импортируется: {error}")
+            report["modes"][mode] = {"module": module, "error": error}
+            continue
+
+        print(f"{mode:<9}{module:<25}{wall - baseline:>12.0f}{imports:>13.0f}{count:>9}  "
+              f"{'ДА' if browser else 'нет'}")
+        report["modes"][mode] = {"module": module, "process_ms": round(wall - baseline, 1),
+                                 "imports_ms": round(imports, 1), "modules": count, "browser_stack": browser}
+        details.append((mode, heaviest[:args.top]))
+
+    print("\nСамые тяжёлые пакеты (cumulative самого внешнего импорта, мс):")
+    for mode, heaviest in details:
+        print(f"  {mode}: " + ", ".join(f"{name} {us / 1000:.0f}" for name, us in heaviest))
+
+    api_with_browser = [mode for mode, data in report["modes"].items()
+                        if mode not in ("browser", "search") and data.get("browser_stack")]
+    if api_with_browser:
+        print(f"\n[!] API-режимы загружают браузерный стек: {', '.join(api_with_browser)}")
+    else:
+        print("\n✓ API-режимы не загружают selenium / webdriver_manager / undetected_chromedriver")
+
+    if args.save:
+        os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+        with open(HISTORY_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        print(f"[SAVE] Итог дописан в {HISTORY_FILE}")
+
+
+if __name__ == "__main__":
+    main()
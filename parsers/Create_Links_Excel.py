@@ -5,7 +5,8 @@
 """
 
 import os
-from openpyxl import load_workbook, Workbook
+from openpyxl import Workbook
+from WB_Input_Loader import load_input_articles
 
 # Конфигурация
 # Пути относительно корня проекта
@@ -22,27 +23,23 @@ def main():
     print("СОЗДАНИЕ EXCEL ФАЙЛА СО ССЫЛКАМИ")
     print("="*80)
     
-    # Загружаем исходный Excel
+    # Загружаем артикулы (только входной лист исходного Excel, без дублей):
+    # ссылка строится по nmID, поэтому дубли и артикулы продавца пропускаются
+    stats = {}
     try:
-        wb = load_workbook(EXCEL_FILE)
+        articles = load_input_articles(EXCEL_FILE, SHEET_INPUT, nm_ids_only=True, stats=stats)
     except Exception as e:
         print(f"\n[!] ОШИБКА открытия Excel: {e}")
         print(f"    Убедись что файл '{EXCEL_FILE}' закрыт!")
         return
     
-    ws_in = wb[SHEET_INPUT]
-    
-    # Загружаем артикулы
-    articles = []
-    for row in ws_in.iter_rows(min_row=2, max_col=1, values_only=True):
-        if row[0]:
-            articles.append(str(row[0]).strip())
-    
     print(f"\n[1/2] Найдено артикулов: {len(articles)}")
+    if len(articles) < stats["rows"]:
+        print(f"    Строк во входном листе: {stats['rows']}, пропущено дублей: {stats['duplicates']}, "
+              f"не nmID: {stats['not_nm_ids']} (для них ссылка не строится)")
     
     if len(articles) == 0:
         print("[!] Нет артикулов для обработки!")
-        wb.close()
         return
     
     # Создаём новый Excel файл со ссылками
@@ -66,7 +63,6 @@ def main():
     # Сохраняем файл
     wb_out.save(OUTPUT_EXCEL_FILE)
     wb_out.close()
-    wb.close()
     
     print(f"\n✓ Создано ссылок: {len(articles)}")
     print(f"✓ Файл сохранён: {OUTPUT_EXCEL_FILE}")
@@ -4,17 +4,17 @@
 Парсинг цен до СПП и после СПП для нескольких магазинов WB
 """
 
+import sys
 import time
 import json
-import requests
 from datetime import datetime
 from openpyxl import load_workbook
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from WB_Http_Client import http_post
+from WB_Cabinet_Routing import run_routed_for_all_cabinets
+from WB_Input_Loader import load_input_articles
+# selenium, webdriver_manager и модули браузера / сессии (WB_Html_Extractor - lxml,
+# WB_Cdp_Capture, WB_Session - aiohttp) импортируются внутри функций, где нужны:
+# API-функции этого модуля (и wbparser.py) не тянут браузерный стек при запуске
 
 # === КОНФИГУРАЦИЯ ===
 # Пути относительно корня проекта
@@ -31,6 +31,19 @@ WB_URL_TEMPLATE = "https://www.wildberries.ru/catalog/{}/detail.aspx"
 WB_API_URL = "https://discounts-prices-api.wildberries.ru/api/v2/list/goods/filter"
 
 PAGE_TIMEOUT_WB = 5
+# Любой вариант разметки цены: кошелёк (danger / accent), старый finalPrice, неавторизованная ins, "нет в наличии"
+PRICE_READY_SELECTOR_WB = ", ".join([
+    "h2.mo-typography_color_danger", "h2.mo-typography_color_accent",
+    "button[class*='priceBlockWalletPrice']", "span[class*='priceBlockWalletPrice']",
+    "h2[class*='finalPrice']", "ins[class*='priceBlockFinalPrice']", "h2[class*='soldOutProduct']",
+])
+# По чему кликать, чтобы открылось окно с ценой без кошелька
+# Цена без кошелька из JSON, который загружает страница (см. WB_Cdp_Capture) - без клика;
+# если JSON не пришёл за CDP_CAPTURE_TIMEOUT_WB сек - цена со страницы, как раньше
+USE_CDP_CAPTURE_WB = True
+CDP_CAPTURE_TIMEOUT_WB = 3
+WALLET_CLICK_SELECTOR_WB = ("button[class*='priceBlockWalletPrice'], span[class*='priceBlockWalletPrice'], "
+                            "h2.mo-typography_color_danger, h2.mo-typography_color_accent")
 PAUSE_BETWEEN = 0.5
 
 # === ФУНКЦИИ ДЛЯ РАБОТЫ С API ===
@@ -71,6 +84,8 @@ def get_wb_prices_api(articles, api_keys_list):
     """
     Получает цены до СПП для WB через API
     Обрабатывает несколько API ключей для разных кабинетов
+    Каждый артикул отправляется только кабинету-владельцу (WB_Ownership_Index),
+    артикулы без известного владельца - всем кабинетам (run_routed_for_all_cabinets)
     Возвращает словарь {артикул: цена_до_спп}
     """
     print("\n[API WB] Загрузка цен до СПП через API...")
@@ -79,26 +94,17 @@ def get_wb_prices_api(articles, api_keys_list):
         print("[!] API ключи WB не найдены!")
         return {}
     
-    prices_before_spp = {}
-    
-    # Обрабатываем каждый API ключ (каждый кабинет)
-    for idx, api_key in enumerate(api_keys_list, 1):
-        print(f"\n[API WB] Кабинет {idx}/{len(api_keys_list)}...")
+    def fetch_from_cabinet(cabinet_nm_ids, api_key, cabinet_name, idx):
+        """Запрашивает цены артикулов у одного кабинета: {nmID: цена до СПП или None} для найденных"""
+        found = {}
         
         try:
-            headers = {
-                "Authorization": api_key,
-                "Content-Type": "application/json"
-            }
-            
             # WB API позволяет запрашивать до 1000 артикулов за раз
             batch_size = 1000
             
-            for i in range(0, len(articles), batch_size):
-                batch = articles[i:i + batch_size]
-                
+            for i in range(0, len(cabinet_nm_ids), batch_size):
                 # Конвертируем артикулы в числа
-                nm_ids = [int(art) for art in batch if art.isdigit()]
+                nm_ids = [int(art) for art in cabinet_nm_ids[i:i + batch_size]]
                 
                 payload = {
                     "limit": 1000,
@@ -106,7 +112,7 @@ def get_wb_prices_api(articles, api_keys_list):
                     "nmList": nm_ids
                 }
                 
-                response = requests.post(WB_API_URL, headers=headers, json=payload, timeout=30)
+                response = http_post(WB_API_URL, api_key=api_key, json=payload, timeout=30)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -115,25 +121,28 @@ def get_wb_prices_api(articles, api_keys_list):
                     if "data" in data and "listGoods" in data["data"]:
                         for item in data["data"]["listGoods"]:
                             nm_id = str(item.get("nmID", ""))
+                            if not nm_id:
+                                continue
                             
-                            # Берем discountedPrice из sizes
+                            # Берем discountedPrice из первого размера
                             sizes = item.get("sizes", [])
-                            if sizes and len(sizes) > 0:
-                                # Берем первый размер
-                                discounted_price = sizes[0].get("discountedPrice", 0)
-                                if discounted_price:
-                                    prices_before_spp[nm_id] = float(discounted_price)
+                            discounted_price = sizes[0].get("discountedPrice", 0) if sizes else 0
+                            found[nm_id] = float(discounted_price) if discounted_price else None
                     
-                    print(f"    Найдено {len([x for x in data.get('data', {}).get('listGoods', []) if x])} товаров в этом кабинете")
+                    print(f"    {cabinet_name}: найдено {len([x for x in data.get('data', {}).get('listGoods', []) if x])} товаров")
                 else:
-                    print(f"[!] Ошибка API WB (кабинет {idx}): {response.status_code}")
+                    print(f"[!] Ошибка API WB ({cabinet_name}): {response.status_code}")
                     if response.status_code != 404:  # 404 = товары не найдены (нормально)
                         print(f"    Ответ: {response.text[:200]}")
-                
-                time.sleep(0.3)  # Пауза между запросами
         
         except Exception as e:
-            print(f"[!] Ошибка при работе с API WB (кабинет {idx}): {e}")
+            print(f"[!] Ошибка при работе с API WB ({cabinet_name}): {e}")
+        
+        return found
+    
+    all_nm_ids = [art for art in articles if art.isdigit()]
+    found = run_routed_for_all_cabinets(all_nm_ids, api_keys_list, None, fetch_from_cabinet, retry_missed=True)
+    prices_before_spp = {nm_id: price for nm_id, price in found.items() if price}
     
     print(f"\n[API WB] Итого загружено {len(prices_before_spp)} цен из всех кабинетов")
     return prices_before_spp
@@ -143,6 +152,11 @@ def get_wb_prices_api(articles, api_keys_list):
 
 def start_browser_wb(headless=False):
     """Запускает браузер для WB"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+    from WB_Cdp_Capture import enable_network_capture
+    
     options = webdriver.ChromeOptions()
     if headless:
         options.add_argument("--headless=new")
@@ -156,6 +170,8 @@ def start_browser_wb(headless=False):
         options.add_experimental_option("prefs", prefs)
     
     options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    if USE_CDP_CAPTURE_WB:
+        enable_network_capture(options)
     
     service = Service(ChromeDriverManager().install())
     driver = webdriver.Chrome(service=service, options=options)
@@ -166,137 +182,79 @@ def start_browser_wb(headless=False):
 # === ФУНКЦИИ ПАРСИНГА WB ===
 
 def parse_price_wb(driver, url):
-    """Парсит цены WB (работает с авторизованной версией страницы)"""
+    """
+    Парсит цены WB (работает с авторизованной версией страницы)
+    Цена без кошелька - из перехваченного JSON карточки (WB_Cdp_Capture), иначе
+    Selenium ждёт и кликает, а цены берутся со снимка страницы (WB_Html_Extractor)
+    Возвращает (цена без кошелька, цена с кошельком) или (None, None)
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from WB_Html_Extractor import PageSnapshot
+    from WB_Cdp_Capture import CardCapture, nm_id_from_url
+    
     try:
         driver.get(url)
-        time.sleep(1)
         
-        # ВАРИАНТ 1: Авторизованная страница с МОДАЛЬНЫМ ОКНОМ (2024)
+        # Цена без кошелька - из JSON карточки, как только страница его получила
+        card = None
+        nm_id = nm_id_from_url(url)
+        if USE_CDP_CAPTURE_WB and nm_id:
+            card = CardCapture.for_driver(driver).wait_for(nm_id, CDP_CAPTURE_TIMEOUT_WB)
+            if card and (card['sold_out'] or not card['price']):
+                card = None
+        else:
+            time.sleep(1)
+        
+        # Ждём любой вариант разметки цены (или "нет в наличии") одним селектором
         try:
-            # ВАРИАНТ 1.1: Кнопка с цветом danger (красная)
-            try:
-                # Ищем кнопку с ценой кошелька (актуальная разметка WB - красная цена)
-                wallet_button = WebDriverWait(driver, PAGE_TIMEOUT_WB).until(
-                    EC.presence_of_element_located((
-                        By.CSS_SELECTOR,
-                        "h2.mo-typography_color_danger, span.priceBlockWalletPricePointer--WG1OK, span.priceBlockWalletPrice--RJGuT, span[class*='priceBlockWalletPrice']"
-                    ))
-                )
-                
-                # Кликаем на кнопку
-                wallet_button.click()
-                time.sleep(0.7)
-                
-                # Парсим цены из модального окна
-                try:
-                    price_spp_el = WebDriverWait(driver, 6).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h2.mo-typography_color_primary"))
-                    )
-                    price_spp_text = price_spp_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                    price_spp = float(price_spp_text) if price_spp_text else None
-                    
-                    try:
-                        price_wallet_el = driver.find_element(By.CSS_SELECTOR, "h2.mo-typography_color_danger")
-                        price_wallet_text = price_wallet_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                        price_wallet = float(price_wallet_text) if price_wallet_text else None
-                    except:
-                        price_wallet = None
-                    
-                    if price_spp:
-                        return price_spp, price_wallet
-                except:
-                    pass
-            except:
-                pass
-            
-            # ВАРИАНТ 1.2: Кнопка с цветом accent (синяя/фиолетовая) - если первый вариант не сработал
+            WebDriverWait(driver, PAGE_TIMEOUT_WB).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, PRICE_READY_SELECTOR_WB))
+            )
+        except Exception:
+            return (card['price'], None) if card else (None, None)
+        
+        page = PageSnapshot.from_driver(driver)
+        
+        # Цена с кошельком видна на кнопке и без клика
+        if card:
+            return card['price'], page.wallet_price
+        
+        # Авторизованная страница: цена без кошелька - в модальном окне после клика на цену кошелька
+        if page.wallet_price and not page.price:
             try:
-                # Ищем кнопку с ценой кошелька (актуальная разметка WB - цвет accent)
-                wallet_button = WebDriverWait(driver, PAGE_TIMEOUT_WB).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "h2.mo-typography_color_accent"))
+                driver.find_element(By.CSS_SELECTOR, WALLET_CLICK_SELECTOR_WB).click()
+                WebDriverWait(driver, 6).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "h2.mo-typography_color_primary"))
                 )
-                
-                # Кликаем на кнопку
-                wallet_button.click()
-                time.sleep(0.7)
-                
-                # Парсим цены из модального окна
-                try:
-                    price_spp_el = WebDriverWait(driver, 6).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h2.mo-typography_color_primary"))
-                    )
-                    price_spp_text = price_spp_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                    price_spp = float(price_spp_text) if price_spp_text else None
-                    
-                    try:
-                        price_wallet_el = driver.find_element(By.CSS_SELECTOR, "h2.mo-typography_color_accent")
-                        price_wallet_text = price_wallet_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                        price_wallet = float(price_wallet_text) if price_wallet_text else None
-                    except:
-                        price_wallet = None
-                    
-                    if price_spp:
-                        return price_spp, price_wallet
-                except:
-                    pass
-            except:
+            except Exception:
                 pass
-            
-            # ВАРИАНТ 1.3: Пробуем старые селекторы (fallback)
-            try:
-                price_spp_el = WebDriverWait(driver, 2).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "h2.finalPrice--Q5ltH, h2[class*='finalPrice']"))
-                )
-                price_spp_text = price_spp_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                price_spp = float(price_spp_text) if price_spp_text else None
-                
-                price_wallet_el = driver.find_element(By.CSS_SELECTOR, "h2.walletPrice--RPzXi, h2[class*='walletPrice']")
-                price_wallet_text = price_wallet_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                price_wallet = float(price_wallet_text) if price_wallet_text else None
-                
-                return price_spp, price_wallet
-            except:
-                return None, None
-        except:
-            # ВАРИАНТ 2: Неавторизованная страница
-            try:
-                price_spp_el = WebDriverWait(driver, PAGE_TIMEOUT_WB).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "ins[class*='priceBlockFinalPrice']"))
-                )
-                
-                price_spp_text = price_spp_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                price_spp = float(price_spp_text) if price_spp_text else None
-                
-                try:
-                    price_wallet_el = driver.find_element(By.CSS_SELECTOR, "span[class*='priceBlockWalletPrice']")
-                    price_wallet_text = price_wallet_el.text.replace("\xa0", "").replace(" ", "").replace("₽", "").replace(",", ".")
-                    price_wallet = float(price_wallet_text) if price_wallet_text else None
-                except:
-                    price_wallet = None
-                
-                return price_spp, price_wallet
-            except:
-                return None, None
-    except:
+            page = PageSnapshot.from_driver(driver)
+        
+        if not page.price:
+            return None, None
+        return page.price, page.wallet_price
+    except Exception:
         return None, None
 
 
 # === ОСНОВНЫЕ ФУНКЦИИ ПАРСИНГА ===
 
-def parse_wb_with_auth(wb, api_keys):
-    """Парсинг WB с авторизацией"""
+def parse_wb_with_auth(wb, api_keys, articles=None, prices_before_spp_dict=None):
+    """
+    Парсинг WB с авторизацией
+    После входа сессия сохраняется (WB_Session) - следующие запуски могут обойтись без браузера
+    articles / prices_before_spp_dict - если уже известны (продолжение после истёкшей сессии)
+    """
     print("\n" + "="*70)
     print("ПАРСИНГ WB С АВТОРИЗАЦИЕЙ")
     print("="*70)
     
-    # Загрузка артикулов
-    ws_in = wb[SHEET_INPUT_WB]
+    # Загрузка артикулов (только входной лист, без дублей)
     ws_out = wb[SHEET_OUTPUT_WB]
-    
-    articles = []
-    for row in ws_in.iter_rows(min_row=2, max_col=1, values_only=True):
-        if row[0]:
-            articles.append(str(row[0]).strip())
+    if articles is None:
+        articles = load_input_articles(EXCEL_FILE, SHEET_INPUT_WB, nm_ids_only=True)
     
     total = len(articles)
     print(f"\n[1/5] Найдено артикулов: {total}")
@@ -306,7 +264,8 @@ def parse_wb_with_auth(wb, api_keys):
         return
     
     # Получаем цены до СПП через API
-    prices_before_spp_dict = get_wb_prices_api(articles, api_keys)
+    if prices_before_spp_dict is None:
+        prices_before_spp_dict = get_wb_prices_api(articles, api_keys)
     
     # Запуск браузера
     print("\n[2/5] Запуск браузера...")
@@ -335,6 +294,12 @@ def parse_wb_with_auth(wb, api_keys):
         
         if 'x_wbaas_token' in cookies_dict:
             print("    [OK] Токен найден - АВТОРИЗОВАН!")
+            # Cookies и ПВЗ - в файл: следующий запуск возьмёт цены по HTTP (режим 3)
+            try:
+                from WB_Session import export_session
+                export_session(driver, probe_url=WB_URL_TEMPLATE.format(articles[0]))
+            except Exception as e:
+                print(f"    [!] Сессию сохранить не удалось: {e}")
         else:
             print("    [WARNING] Токен не найден, продолжаем как гость...")
         
@@ -396,20 +361,87 @@ def parse_wb_with_auth(wb, api_keys):
     finally:
         driver.quit()
 
+def parse_wb_with_session(wb, api_keys):
+    """
+    Парсинг WB по сохранённой сессии: цены после СПП по HTTP пачками, без браузера
+    Нет сессии или её перестали принимать - оставшиеся артикулы идут через вход
+    в браузере (parse_wb_with_auth), сессия при этом сохраняется заново
+    Цены с кошельком по HTTP не видны - столбцы кошелька остаются пустыми
+    Возвращает False, если браузер нужен, но запуск без терминала
+    """
+    from WB_Session import load_session, fetch_prices
+    
+    print("\n" + "="*70)
+    print("ПАРСИНГ WB ПО СОХРАНЁННОЙ СЕССИИ")
+    print("="*70)
+    
+    # Загрузка артикулов (только входной лист, без дублей)
+    ws_out = wb[SHEET_OUTPUT_WB]
+    articles = load_input_articles(EXCEL_FILE, SHEET_INPUT_WB, nm_ids_only=True)
+    
+    total = len(articles)
+    print(f"\n[1/3] Найдено артикулов: {total}")
+    
+    if total == 0:
+        print("[!] Нет артикулов!")
+        return True
+    
+    # Получаем цены до СПП через API
+    prices_before_spp_dict = get_wb_prices_api(articles, api_keys)
+    
+    print("\n[2/3] Сессия...")
+    session = load_session()
+    remaining = articles
+    
+    if session:
+        print(f"    [OK] Сессия от {session['created']} (dest {session['card_params'].get('dest', '-')})")
+        print(f"\n[3/3] Цены {total} артикулов по HTTP...")
+        cards, expired = fetch_prices(articles, session)
+        
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        success = 0
+        failed = 0
+        for article in articles:
+            card = cards.get(article)
+            if card is None:
+                continue
+            price_spp = card['price'] if not card['sold_out'] else None
+            if not price_spp:
+                failed += 1
+                continue
+            price_before_spp = prices_before_spp_dict.get(article)
+            percent_spp = (1 - (price_spp / price_before_spp)) * 100 if price_before_spp else None
+            ws_out.append([timestamp, article, price_before_spp, percent_spp, price_spp, None, None])
+            success += 1
+        
+        # Сессию не приняли - оставшееся смотрим в браузере; иначе пропавшие из ответа - ошибки
+        remaining = [article for article in articles if article not in cards] if expired else []
+        failed += 0 if expired else total - len(cards)
+        print(f"    Успешно: {success} | Ошибок: {failed}" + (f" | В браузер: {len(remaining)}" if remaining else ""))
+    
+    if remaining:
+        if not sys.stdin.isatty():
+            print("\n[!] Нужен вход в браузере, а запуск без терминала - запустите режим с авторизацией вручную")
+            if len(remaining) < total:
+                wb.save(EXCEL_FILE)
+                print(f"\n[SAVE] Полученные цены сохранены в '{EXCEL_FILE}'")
+            return False
+        parse_wb_with_auth(wb, api_keys, remaining, prices_before_spp_dict)
+        return True
+    
+    wb.save(EXCEL_FILE)
+    print(f"\n[SAVE] Результаты сохранены в '{EXCEL_FILE}'")
+    return True
+
 def parse_wb_no_auth(wb, api_keys):
     """Парсинг WB без авторизации"""
     print("\n" + "="*70)
     print("ПАРСИНГ WB БЕЗ АВТОРИЗАЦИИ")
     print("="*70)
     
-    # Загрузка артикулов
-    ws_in = wb[SHEET_INPUT_WB]
+    # Загрузка артикулов (только входной лист, без дублей)
     ws_out = wb[SHEET_OUTPUT_WB]
-    
-    articles = []
-    for row in ws_in.iter_rows(min_row=2, max_col=1, values_only=True):
-        if row[0]:
-            articles.append(str(row[0]).strip())
+    articles = load_input_articles(EXCEL_FILE, SHEET_INPUT_WB, nm_ids_only=True)
     
     total = len(articles)
     print(f"\n[1/4] Найдено артикулов: {total}")
@@ -500,21 +532,27 @@ def show_menu():
     print("\nВыберите режим работы:")
     print("  1) С авторизацией (медленнее, но точнее - видны цены кошелька)")
     print("  2) Без авторизации (быстрее)")
+    print("  3) По сохранённой сессии (без браузера, быстрее всего; цены кошелька не видны)")
     print("  0) Выход")
     
-    auth_choice = input("\nВведите номер (1-2): ").strip()
+    auth_choice = input("\nВведите номер (1-3): ").strip()
     
     if auth_choice == '0':
         print("\nВыход из программы...")
         return None
     
-    if auth_choice not in ['1', '2']:
+    if auth_choice not in ['1', '2', '3']:
         print("\n[!] Неверный выбор!")
         return None
     
     return auth_choice
 
-def main():
+def main(interactive=True, auth_choice=None):
+    """
+    interactive=False - без ожидания Enter и без меню (запуск по расписанию, см. wbparser.py)
+    auth_choice: '1' - с авторизацией, '2' - без, '3' - по сохранённой сессии; None - спросить в меню
+    (без меню по умолчанию '2': авторизация в браузере требует человека)
+    """
     print("\n" + "!"*70)
     print("ВАЖНО:")
     print("  1. ОТКЛЮЧИТЕ VPN перед запуском!")
@@ -523,20 +561,22 @@ def main():
     print("  4. Артикулы WB должны быть в листе 'Данные для парсера ВБ'")
     print("!"*70)
     
-    input("\nНажмите Enter чтобы начать...")
+    if interactive:
+        input("\nНажмите Enter чтобы начать...")
     
     # Показываем меню
-    auth_choice = show_menu()
+    if auth_choice is None:
+        auth_choice = show_menu() if interactive else '2'
     
     if not auth_choice:
-        return
+        return False
     
     # Загружаем Excel
     try:
         wb = load_workbook(EXCEL_FILE)
     except Exception as e:
         print(f"\n[!] Ошибка открытия файла: {e}")
-        return
+        return False
     
     # Загружаем API ключи
     api_keys = load_api_keys(wb)
@@ -545,7 +585,10 @@ def main():
         with_auth = (auth_choice == '1')
         
         # WB
-        if with_auth:
+        if auth_choice == '3':
+            if not parse_wb_with_session(wb, api_keys):
+                return False
+        elif with_auth:
             parse_wb_with_auth(wb, api_keys)
         else:
             parse_wb_no_auth(wb, api_keys)
@@ -553,11 +596,13 @@ def main():
         print("\n" + "="*70)
         print("ВСЕ ЗАДАЧИ ВЫПОЛНЕНЫ!")
         print("="*70)
+        return True
         
     except Exception as e:
         print(f"\n[!] Ошибка: {e}")
         import traceback
         traceback.print_exc()
+        return False
     finally:
         wb.close()
         print("\n[DONE] Завершено!")
@@ -6,11 +6,14 @@
 
 import os
 import json
-import requests
 from datetime import datetime
-from openpyxl import Workbook, load_workbook
 from dotenv import load_dotenv
 import time
+from WB_Http_Client import http_post
+from WB_Content_Sync import iter_content_pages, card_summary, sync_cabinet_cards
+from WB_Output_Backends import write_results
+from WB_Price_History import record_snapshots
+from WB_Delta import compute_delta
 
 # === КОНФИГУРАЦИЯ ===
 # Пути относительно корня проекта
@@ -22,11 +25,13 @@ SHEET_OUTPUT_WB = "Парсер ВБ"
 
 # API ENDPOINTS
 WB_PRICES_API_URL = "https://discounts-prices-api.wildberries.ru/api/v2/list/goods/filter"
-WB_CONTENT_API_URL = "https://content-api.wildberries.ru/content/v2/get/cards/list"
 
 # Названия кабинетов
 CABINET_NAMES = ["COSMO", "MMA", "MAB", "MAU", "DREAMLAB", "BEAUTYLAB"]
 
+# Запрашивать у Content API только карточки, изменённые с прошлого запуска
+INCREMENTAL_CONTENT_SYNC = True
+
 # === ФУНКЦИИ ===
 
 def load_api_keys_from_env():
@@ -50,87 +55,33 @@ def load_api_keys_from_env():
     return api_keys, cabinet_info
 
 
-def get_all_products_from_cabinet(api_key, cabinet_name):
+def get_all_products_from_cabinet(api_key, cabinet_name, incremental=None):
     """
     Получает ВСЕ товары из одного кабинета
+    incremental=True - у API запрашиваются только изменённые карточки,
+    остальные берутся из локального хранилища (см. WB_Content_Sync)
     Возвращает список товаров {nmID, title, vendorCode}
     """
+    if incremental is None:
+        incremental = INCREMENTAL_CONTENT_SYNC
+    
     print(f"\n[{cabinet_name}] Загрузка всех товаров из кабинета...")
     
     products = []
-    headers = {
-        "Authorization": api_key,
-        "Content-Type": "application/json"
-    }
-    
-    cursor_updatedAt = ""
-    cursor_nmID = 0
-    page = 0
     
     try:
-        while True:
-            page += 1
-            
-            payload = {
-                "settings": {
-                    "cursor": {
-                        "limit": 100
-                    },
-                    "filter": {
-                        "withPhoto": -1
-                    }
-                }
-            }
-            
-            # Добавляем курсор для пагинации
-            if cursor_updatedAt and cursor_nmID:
-                payload["settings"]["cursor"]["updatedAt"] = cursor_updatedAt
-                payload["settings"]["cursor"]["nmID"] = cursor_nmID
-            
-            response = requests.post(WB_CONTENT_API_URL, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                cards = data.get("cards", [])
-                if not cards and "data" in data:
-                    cards = data.get("data", {}).get("cards", [])
-                
-                if not cards:
-                    break
-                
+        if incremental:
+            cards = sync_cabinet_cards(api_key, cabinet_name)
+            products = list(cards.values())
+        else:
+            for page, cards, cursor_data in iter_content_pages(api_key, cabinet_name):
                 # Добавляем товары
                 for card in cards:
-                    nm_id = str(card.get("nmID", ""))
-                    title = card.get("title") or card.get("object") or f"Товар {nm_id}"
-                    vendor_code = str(card.get("vendorCode", ""))
-                    
-                    if nm_id:
-                        products.append({
-                            "nmID": nm_id,
-                            "title": title,
-                            "vendorCode": vendor_code,
-                            "cabinet": cabinet_name
-                        })
+                    summary = card_summary(card, cabinet_name)
+                    if summary["nmID"]:
+                        products.append(summary)
                 
                 print(f"    Страница {page}: +{len(cards)} товаров (всего: {len(products)})")
-                
-                # Курсор для следующей страницы
-                cursor_data = data.get("cursor", {})
-                cursor_updatedAt = cursor_data.get("updatedAt", "")
-                cursor_nmID = cursor_data.get("nmID", 0)
-                
-                if not cursor_updatedAt or not cursor_nmID:
-                    break
-                
-                time.sleep(0.2)
-            
-            elif response.status_code == 401:
-                print(f"    [!] Ошибка 401: Неверный API ключ")
-                break
-            else:
-                print(f"    [!] Ошибка {response.status_code}: {response.text[:200]}")
-                break
         
         print(f"    ✓ Загружено {len(products)} товаров из {cabinet_name}")
         
@@ -148,10 +99,6 @@ def get_prices_for_products(products, api_key, cabinet_name):
     print(f"\n[{cabinet_name}] Загрузка цен для {len(products)} товаров...")
     
     prices_dict = {}
-    headers = {
-        "Authorization": api_key,
-        "Content-Type": "application/json"
-    }
     
     # Получаем список nmID
     nm_ids = [int(p["nmID"]) for p in products if p["nmID"].isdigit()]
@@ -173,7 +120,7 @@ def get_prices_for_products(products, api_key, cabinet_name):
                 "nmList": batch
             }
             
-            response = requests.post(WB_PRICES_API_URL, headers=headers, json=payload, timeout=30)
+            response = http_post(WB_PRICES_API_URL, api_key=api_key, json=payload, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
@@ -217,8 +164,6 @@ def get_prices_for_products(products, api_key, cabinet_name):
             
             else:
                 print(f"    [!] Ошибка {response.status_code}: {response.text[:200]}")
-            
-            time.sleep(0.3)
         
         print(f"    ✓ Загружено цен для {len(prices_dict)} товаров")
     
@@ -228,7 +173,8 @@ def get_prices_for_products(products, api_key, cabinet_name):
     return prices_dict
 
 
-def main():
+def main(interactive=True):
+    """interactive=False - без ожидания Enter (запуск по расписанию, см. wbparser.py)"""
     print("\n" + "="*80)
     print("ПАРСЕР ВСЕХ ТОВАРОВ WB ИЗ ВСЕХ КАБИНЕТОВ")
     print("="*80)
@@ -239,14 +185,15 @@ def main():
     print("\n⏱️  Примерное время: 5-10 минут для ~1000 товаров")
     print("="*80)
     
-    input("\n💡 Нажмите Enter чтобы начать...")
+    if interactive:
+        input("\n💡 Нажмите Enter чтобы начать...")
     
     # Загружаем API ключи
     api_keys, cabinet_names = load_api_keys_from_env()
     
     if not api_keys:
         print("\n[!] ОШИБКА: Не найдено API ключей в .env!")
-        return
+        return False
     
     start_time = time.time()
     
@@ -265,7 +212,7 @@ def main():
     
     if not all_products:
         print("\n[!] Не найдено ни одного товара!")
-        return
+        return False
     
     # ШАГ 2: Загружаем цены для всех товаров
     print("\n" + "="*80)
@@ -300,65 +247,77 @@ def main():
     print("="*80)
     
     try:
-        # Открываем или создаем Excel файл
-        try:
-            wb = load_workbook(EXCEL_FILE)
-            if SHEET_OUTPUT_WB not in wb.sheetnames:
-                ws = wb.create_sheet(SHEET_OUTPUT_WB)
-            else:
-                ws = wb[SHEET_OUTPUT_WB]
-        except FileNotFoundError:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = SHEET_OUTPUT_WB
-        
-        # Заголовки (если лист пустой)
-        if ws.max_row == 1:
-            ws.append(["Дата", "Кабинет", "Артикул", "Название", "Цена До СПП", "Цена После СПП", "СПП %", "Скидка %"])
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        saved_count = 0
         
+        # Сравниваем с прошлым запуском: в историю и Parquet уходят только изменения
+        snapshots = []
         for product in all_products:
-            nm_id = product["nmID"]
-            title = product["title"]
-            cabinet = product["cabinet"]
-            
-            prices = all_prices.get(nm_id, {})
-            
-            price_before = prices.get("price_before_spp", 0)
-            price_after = prices.get("price_after_spp", 0)
-            discount = prices.get("discount", 0)
-            spp = prices.get("spp", 0)
-            
-            # Считаем процент СПП
-            spp_percent_calc = None
-            if price_before and price_after and price_before > 0:
-                spp_percent_calc = ((price_before - price_after) / price_before) * 100
-            
-            new_row = [
-                timestamp,
-                cabinet,
-                nm_id,
-                title,
-                price_before if price_before else None,
-                price_after if price_after else None,
-                spp_percent_calc if spp_percent_calc else spp,
-                discount if discount else None
-            ]
-            ws.append(new_row)
-            saved_count += 1
-            
-            if saved_count % 100 == 0:
-                print(f"    Сохранено: {saved_count}/{len(all_products)}")
+            prices = all_prices.get(product["nmID"])
+            if prices:
+                snapshots.append({
+                    "nm_id": product["nmID"],
+                    "cabinet": product["cabinet"],
+                    "price": prices.get("price_original") or None,
+                    "discounted_price": prices.get("price_before_spp") or None,
+                    "club_discounted_price": prices.get("price_after_spp") or None
+                })
+        delta = compute_delta(snapshots, "all_products", [product["nmID"] for product in all_products])
+        emitted_ids = delta.emitted_ids()
+        
+        def build_rows():
+            for saved_count, product in enumerate(all_products, 1):
+                nm_id = product["nmID"]
+                title = product["title"]
+                cabinet = product["cabinet"]
+                
+                prices = all_prices.get(nm_id, {})
+                
+                price_before = prices.get("price_before_spp", 0)
+                price_after = prices.get("price_after_spp", 0)
+                discount = prices.get("discount", 0)
+                spp = prices.get("spp", 0)
+                
+                # Считаем процент СПП
+                spp_percent_calc = None
+                if price_before and price_after and price_before > 0:
+                    spp_percent_calc = ((price_before - price_after) / price_before) * 100
+                
+                yield [
+                    timestamp,
+                    cabinet,
+                    nm_id,
+                    title,
+                    price_before if price_before else None,
+                    price_after if price_after else None,
+                    spp_percent_calc if spp_percent_calc else spp,
+                    discount if discount else None
+                ]
+                
+                if saved_count % 100 == 0:
+                    print(f"    Сохранено: {saved_count}/{len(all_products)}")
         
-        wb.save(EXCEL_FILE)
+        # В Excel - текущий снимок целиком (лист перестраивается),
+        # история копится в data/price_history.sqlite
+        columns = [
+            ("Дата", "snapshot_ts", "timestamp"),
+            ("Кабинет", "cabinet", "string"),
+            ("Артикул", "nm_id", "int64"),
+            ("Название", "title", "string"),
+            ("Цена До СПП", "price_before_spp", "float64"),
+            ("Цена После СПП", "price_after_spp", "float64"),
+            ("СПП %", "spp", "float64"),
+            ("Скидка %", "discount", "float64")
+        ]
+        saved_count = write_results("all_products_prices", columns, build_rows(), EXCEL_FILE, SHEET_OUTPUT_WB,
+                                    auto_filter=False, sink_filter=lambda row: str(row[2]) in emitted_ids)
         print(f"\n✓ Сохранено {saved_count} товаров в '{EXCEL_FILE}'")
+        record_snapshots(delta.emitted, "all_products")
         
     except Exception as e:
         print(f"\n[!] Ошибка при сохранении: {e}")
         import traceback
         traceback.print_exc()
+        return False
     
     # Итоговая статистика
     elapsed = time.time() - start_time
@@ -380,6 +339,7 @@ def main():
             print(f"  {cabinet_name}: {count} товаров")
     
     print("\n[DONE] Завершено!")
+    return True
 
 
 if __name__ == "__main__":
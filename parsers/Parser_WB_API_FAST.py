@@ -6,11 +6,20 @@
 
 import os
 import json
-import requests
 from datetime import datetime, timedelta
-from openpyxl import load_workbook
 from dotenv import load_dotenv
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from WB_Cabinet_Routing import run_for_all_cabinets, run_routed_for_all_cabinets
+from WB_Content_Sync import iter_content_pages, card_summary, sync_cabinet_cards
+from WB_Card_Cache import CardCache
+from WB_Ownership_Index import get_ownership_index
+from WB_Bulk_Fetch import fetch_offset_pages, fetch_chunks_parallel
+from WB_Output_Backends import write_results
+from WB_Price_History import record_snapshots
+from WB_Delta import compute_delta
+from WB_Input_Loader import load_input_articles
 
 # === КОНФИГУРАЦИЯ ===
 # Пути относительно корня проекта
@@ -20,15 +29,24 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 EXCEL_FILE = os.path.join(DATA_DIR, "Парсер цен.xlsx")
 SHEET_INPUT_WB = "Данные для парсера ВБ"
 SHEET_OUTPUT_WB = "Парсер ВБ"
+INPUT_EXCEL_FILE = None  # Книга с артикулами, если она отличается от EXCEL_FILE (см. wbparser.py --input)
 
 # API ENDPOINTS
 WB_PRICES_API_URL = "https://discounts-prices-api.wildberries.ru/api/v2/list/goods/filter"
-WB_CONTENT_API_URL = "https://content-api.wildberries.ru/content/v2/get/cards/list"
 WB_STOCKS_API_URL = "https://seller-analytics-api.wildberries.ru/api/v2/stocks-report/products/products"
 
 # Названия кабинетов (для .env файла)
 CABINET_NAMES = ["COSMO", "MMA", "MAB", "MAU", "DREAMLAB", "BEAUTYLAB"]
 
+# Запрашивать у Content API только карточки, изменённые с прошлого запуска
+INCREMENTAL_CONTENT_SYNC = True
+
+# Брать названия/vendorCode/кабинет из локального кеша, пока они свежие (см. WB_Card_Cache)
+USE_CARD_CACHE = True
+
+# Сколько кабинетов опрашивать одновременно и маршрутизация по владельцам nmID -
+# в WB_Cabinet_Routing (MAX_CABINET_WORKERS, USE_OWNERSHIP_INDEX)
+
 # === ФУНКЦИИ ===
 
 def load_api_keys_from_env():
@@ -62,6 +80,7 @@ def get_product_info(articles, api_keys_list, cabinet_names=None):
     """
     Получает информацию о товарах через Content API
     Возвращает словарь {артикул: {название, nmID, vendorCode, cabinet}}
+    Все кабинеты опрашиваются одновременно
     """
     print("\n[API] Загрузка информации о товарах (названия, ID)...")
     
@@ -69,108 +88,109 @@ def get_product_info(articles, api_keys_list, cabinet_names=None):
         print("[!] API ключи не найдены!")
         return {}
     
-    product_info = {}
-    cabinet_map = {}  # nmID -> cabinet
+    # Конвертируем артикулы в set для поиска
+    articles_set = {str(art).strip() for art in articles}
+    
+    # Свежие записи берём из кеша, у API запрашиваем только остальные
+    cache = CardCache() if USE_CARD_CACHE else None
+    cached_info = {}
+    if cache:
+        cached_info, articles_set = cache.get_many(articles_set)
+        print(f"    [Кеш] Найдено: {len(cached_info)}, запросить у API: {len(articles_set)}")
     
-    # Пробуем каждый API ключ
-    for idx, api_key in enumerate(api_keys_list, 1):
-        cabinet_name = cabinet_names[idx-1] if cabinet_names and idx-1 < len(cabinet_names) else f"Кабинет {idx}"
-        print(f"\n[API] {cabinet_name} ({idx}/{len(api_keys_list)})...")
+    product_info = {}
+    if articles_set:
+        # Ещё не найденные артикулы - общие для всех кабинетов:
+        # как только найдены все, остальные кабинеты тоже перестают листать страницы
+        remaining = set(articles_set)
+        remaining_lock = threading.Lock()
+        
+        def fetch_cabinet(api_key, cabinet_name, idx):
+            result = get_product_info_from_cabinet(articles_set, api_key, cabinet_name, idx, len(api_keys_list),
+                                                   remaining, remaining_lock)
+            get_ownership_index().assign(result.keys(), api_key, cabinet_name)
+            return result
         
-        try:
-            headers = {
-                "Authorization": api_key,
-                "Content-Type": "application/json"
+        product_info = run_for_all_cabinets(api_keys_list, cabinet_names, fetch_cabinet)
+    
+    if cache:
+        cache.put_many(product_info.values())
+        cache.close()
+    
+    get_ownership_index().save()
+    
+    product_info.update(cached_info)
+    
+    print(f"\n[API] Итого загружено информации о {len(product_info)} товарах")
+    return product_info
+
+
+def get_product_info_from_cabinet(articles_set, api_key, cabinet_name, idx, total_cabinets,
+                                  remaining=None, remaining_lock=None):
+    """
+    Загружает информацию о товарах из ОДНОГО кабинета (Content API)
+    При INCREMENTAL_CONTENT_SYNC у API запрашиваются только изменённые карточки,
+    остальные берутся из локального хранилища (см. WB_Content_Sync)
+    remaining: ещё не найденные артикулы (nmID или vendorCode), общие для всех кабинетов;
+               страницы перестают запрашиваться, как только он опустеет
+    Возвращает словарь {nmID: {title, nmID, vendorCode, cabinet}}
+    """
+    print(f"\n[API] {cabinet_name} ({idx}/{total_cabinets})...")
+    
+    product_info = {}
+    if remaining is None:
+        remaining = set(articles_set)
+    if remaining_lock is None:
+        remaining_lock = threading.Lock()
+    
+    def add_if_requested(summary):
+        # Проверяем совпадение по nmID или vendorCode
+        nm_id = summary["nmID"]
+        vendor_code = summary["vendorCode"]
+        if nm_id and (nm_id in articles_set or vendor_code in articles_set):
+            product_info[nm_id] = {
+                "title": summary["title"],
+                "nmID": nm_id,
+                "vendorCode": vendor_code,
+                "cabinet": cabinet_name
             }
+            # Артикул мог быть задан и как nmID, и как vendorCode - снимаем оба
+            with remaining_lock:
+                remaining.discard(nm_id)
+                remaining.discard(vendor_code)
+    
+    try:
+        if INCREMENTAL_CONTENT_SYNC:
+            # Карточки хранилища и каждая новая страница сразу снимают найденное с remaining;
+            # когда все артикулы найдены (в любом кабинете) - страницы больше не запрашиваются
+            def all_found():
+                with remaining_lock:
+                    return not remaining
             
-            # Конвертируем артикулы в set для поиска
-            articles_set = {str(art).strip() for art in articles}
-            
-            # Content API: получаем список карточек с пагинацией (максимум 100 за раз)
-            cursor_updatedAt = ""
-            cursor_nmID = 0
-            total_found_this_cabinet = 0
-            page = 0
+            def add_all(summaries):
+                for summary in summaries:
+                    add_if_requested(summary)
             
-            while True:
-                page += 1
-                
-                payload = {
-                    "settings": {
-                        "cursor": {
-                            "limit": 100
-                        },
-                        "filter": {
-                            "withPhoto": -1
-                        }
-                    }
-                }
-                
-                # Добавляем курсор для пагинации (если не первая страница)
-                if cursor_updatedAt and cursor_nmID:
-                    payload["settings"]["cursor"]["updatedAt"] = cursor_updatedAt
-                    payload["settings"]["cursor"]["nmID"] = cursor_nmID
-                
-                response = requests.post(WB_CONTENT_API_URL, headers=headers, json=payload, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    cards = data.get("cards", [])
-                    if not cards and "data" in data:
-                        cards = data.get("data", {}).get("cards", [])
-                    
-                    if not cards:
-                        # Нет больше карточек
-                        break
-                    
-                    # Обрабатываем карточки
-                    for card in cards:
-                        nm_id = str(card.get("nmID", ""))
-                        vendor_code = str(card.get("vendorCode", ""))
-                        
-                        # Проверяем совпадение по nmID или vendorCode
-                        if nm_id in articles_set or vendor_code in articles_set:
-                            # Берем название (может быть в разных полях)
-                            title = card.get("title") or card.get("object") or f"Товар {nm_id}"
-                            
-                            # Используем nmID как ключ
-                            if nm_id:
-                                product_info[nm_id] = {
-                                    "title": title,
-                                    "nmID": nm_id,
-                                    "vendorCode": vendor_code,
-                                    "cabinet": cabinet_name
-                                }
-                                total_found_this_cabinet += 1
-                    
-                    # Получаем курсор для следующей страницы
-                    cursor_data = data.get("cursor", {})
-                    cursor_updatedAt = cursor_data.get("updatedAt", "")
-                    cursor_nmID = cursor_data.get("nmID", 0)
-                    
-                    # Если курсор пустой - больше страниц нет
-                    if not cursor_updatedAt or not cursor_nmID:
-                        break
-                    
-                    # Если нашли все нужные товары - можно остановиться
-                    if len([x for x in product_info if str(x) in articles_set]) >= len(articles_set):
-                        break
-                    
-                    time.sleep(0.2)  # Пауза между запросами пагинации
+            sync_cabinet_cards(api_key, cabinet_name, on_cards=add_all, stop=all_found)
+            print(f"    [{cabinet_name}] Найдено товаров: {len(product_info)}")
+            return product_info
+        
+        # Content API: получаем список карточек с пагинацией (максимум 100 за раз)
+        page = 0
+        if remaining:
+            for page, cards, cursor_data in iter_content_pages(api_key, cabinet_name):
+                for card in cards:
+                    add_if_requested(card_summary(card, cabinet_name))
                 
-                else:
-                    print(f"[!] Ошибка Content API: {response.status_code}")
-                    print(f"    {response.text[:200]}")
+                # Если нашли все нужные товары (в любом кабинете) - можно остановиться
+                if not remaining:
                     break
-            
-            print(f"    Обработано страниц: {page}, найдено товаров: {total_found_this_cabinet}")
-            time.sleep(0.3)
         
-        except Exception as e:
-            print(f"[!] Ошибка при запросе Content API (кабинет {idx}): {e}")
+        print(f"    [{cabinet_name}] Обработано страниц: {page}, найдено товаров: {len(product_info)}")
+    
+    except Exception as e:
+        print(f"[!] Ошибка при запросе Content API (кабинет {idx}): {e}")
     
-    print(f"\n[API] Итого загружено информации о {len(product_info)} товарах")
     return product_info
 
 
@@ -178,6 +198,7 @@ def get_prices_full_info(articles, api_keys_list, cabinet_names=None):
     """
     Получает ВСЕ цены через Prices API - ДО и ПОСЛЕ СПП!
     Возвращает словарь {артикул: {price_original, price_before_spp, price_after_spp, discount, spp, stocks}}
+    Все кабинеты опрашиваются одновременно
     
     Структура цен WB API:
     - price: базовая цена (без скидок)
@@ -191,100 +212,97 @@ def get_prices_full_info(articles, api_keys_list, cabinet_names=None):
         print("[!] API ключи не найдены!")
         return {}
     
-    prices_info = {}
-    debug_done = False  # Флаг для вывода DEBUG только 1 раз
+    nm_ids = [str(art).strip() for art in articles if str(art).strip().isdigit()]
+    
+    def fetch_cabinet(cabinet_nm_ids, api_key, cabinet_name, idx):
+        return get_prices_from_cabinet(cabinet_nm_ids, api_key, cabinet_name, idx, len(api_keys_list))
+    
+    prices_info = run_routed_for_all_cabinets(nm_ids, api_keys_list, cabinet_names, fetch_cabinet, retry_missed=True)
     
-    for idx, api_key in enumerate(api_keys_list, 1):
-        cabinet_name = cabinet_names[idx-1] if cabinet_names and idx-1 < len(cabinet_names) else f"Кабинет {idx}"
-        print(f"\n[API] {cabinet_name} ({idx}/{len(api_keys_list)})...")
+    print(f"\n[API] Итого загружено цен для {len(prices_info)} товаров")
+    return prices_info
+
+
+def extract_prices_goods(data):
+    """Список товаров из ответа Prices API"""
+    if "data" in data and "listGoods" in data["data"]:
+        return data["data"]["listGoods"]
+    return data.get("listGoods", [])
+
+
+def parse_prices_item(item):
+    """Цены товара из Prices API (по первому размеру) или None"""
+    # Берем данные из первого размера
+    sizes = item.get("sizes", [])
+    if not sizes:
+        return None
+    size_data = sizes[0]
+    
+    # Все данные из Prices API
+    price_original = size_data.get("price", 0)  # price
+    price_discounted = size_data.get("discountedPrice", 0)  # discountedPrice
+    price_club = size_data.get("clubDiscountedPrice", 0)  # clubDiscountedPrice
+    tech_size_name = size_data.get("techSizeName", "")  # techSizeName
+    
+    # Проценты скидок
+    discount_percent = item.get("discount", 0)  # discount
+    club_discount_percent = item.get("clubDiscount", 0)  # clubDiscount
+    
+    # Если нет цены после скидок, используем базовую
+    if not price_discounted and price_original:
+        price_discounted = price_original
+    
+    # Если нет клубной цены, используем цену после скидок
+    if not price_club and price_discounted:
+        price_club = price_discounted
+    
+    return {
+        "price": float(price_original) if price_original else 0,
+        "discountedPrice": float(price_discounted) if price_discounted else 0,
+        "clubDiscountedPrice": float(price_club) if price_club else 0,
+        "techSizeName": tech_size_name,
+        "discount": float(discount_percent) if discount_percent else 0,
+        "clubDiscount": float(club_discount_percent) if club_discount_percent else 0
+    }
+
+
+def get_prices_from_cabinet(articles, api_key, cabinet_name, idx, total_cabinets):
+    """
+    Загружает цены из ОДНОГО кабинета (Prices API)
+    Артикулы режутся на куски по 1000, каждый кусок запрашивается постранично,
+    куски идут параллельно (см. WB_Bulk_Fetch)
+    Возвращает словарь {nmID: {price, discountedPrice, clubDiscountedPrice, ...}}
+    """
+    print(f"\n[API] {cabinet_name} ({idx}/{total_cabinets})...")
+    
+    nm_ids = [int(art) for art in articles if str(art).isdigit()]
+    
+    def fetch_chunk(chunk, chunk_no):
+        # Правильный формат для Prices API - nmList, а не filterNmID!
+        goods_list, response = fetch_offset_pages(WB_PRICES_API_URL, api_key, {"nmList": chunk},
+                                                  extract_prices_goods, max_items=len(chunk))
+        if response is not None and response.status_code != 200:
+            print(f"[!] Ошибка Prices API ({cabinet_name}): {response.status_code}")
+            print(f"    {response.text[:200]}")
         
-        try:
-            headers = {
-                "Authorization": api_key,
-                "Content-Type": "application/json"
-            }
-            
-            # Обрабатываем батчами по 1000
-            batch_size = 1000
-            
-            for i in range(0, len(articles), batch_size):
-                batch = articles[i:i + batch_size]
-                nm_ids = [int(art) for art in batch if str(art).isdigit()]
-                
-                if not nm_ids:
-                    continue
-                
-                # Правильный формат для Prices API
-                payload = {
-                    "limit": 1000,
-                    "offset": 0,
-                    "nmList": nm_ids  # ВАЖНО: nmList а не filterNmID!
-                }
-                
-                response = requests.post(WB_PRICES_API_URL, headers=headers, json=payload, timeout=30)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Парсим товары
-                    goods_list = []
-                    if "data" in data and "listGoods" in data["data"]:
-                        goods_list = data["data"]["listGoods"]
-                    elif "listGoods" in data:
-                        goods_list = data["listGoods"]
-                    
-                    
-                    # Обрабатываем товары
-                    for item in goods_list:
-                        nm_id = str(item.get("nmID", ""))
-                        
-                        # Берем данные из первого размера
-                        sizes = item.get("sizes", [])
-                        if sizes and len(sizes) > 0:
-                            size_data = sizes[0]
-                            
-                            # Все данные из Prices API
-                            price_original = size_data.get("price", 0)  # price
-                            price_discounted = size_data.get("discountedPrice", 0)  # discountedPrice
-                            price_club = size_data.get("clubDiscountedPrice", 0)  # clubDiscountedPrice
-                            tech_size_name = size_data.get("techSizeName", "")  # techSizeName
-                            
-                            # Проценты скидок
-                            discount_percent = item.get("discount", 0)  # discount
-                            club_discount_percent = item.get("clubDiscount", 0)  # clubDiscount
-                            
-                            # Если нет цены после скидок, используем базовую
-                            if not price_discounted and price_original:
-                                price_discounted = price_original
-                            
-                            # Если нет клубной цены, используем цену после скидок
-                            if not price_club and price_discounted:
-                                price_club = price_discounted
-                            
-                            if nm_id:
-                                prices_info[nm_id] = {
-                                    "price": float(price_original) if price_original else 0,
-                                    "discountedPrice": float(price_discounted) if price_discounted else 0,
-                                    "clubDiscountedPrice": float(price_club) if price_club else 0,
-                                    "techSizeName": tech_size_name,
-                                    "discount": float(discount_percent) if discount_percent else 0,
-                                    "clubDiscount": float(club_discount_percent) if club_discount_percent else 0
-                                }
-                    
-                    print(f"    Батч {i//batch_size + 1}: загружено цен для {len(goods_list)} товаров")
-                
-                else:
-                    print(f"[!] Ошибка Prices API: {response.status_code}")
-                    print(f"    {response.text[:200]}")
-                
-                time.sleep(0.3)
+        chunk_info = {}
+        for item in goods_list:
+            nm_id = str(item.get("nmID", ""))
+            item_prices = parse_prices_item(item)
+            if nm_id and item_prices:
+                chunk_info[nm_id] = item_prices
         
-        except Exception as e:
-            print(f"[!] Ошибка при запросе Prices API (кабинет {idx}): {e}")
-            import traceback
-            traceback.print_exc()
+        print(f"    [{cabinet_name}] Батч {chunk_no}: загружено цен для {len(goods_list)} товаров")
+        return chunk_info
+    
+    prices_info = {}
+    try:
+        prices_info = fetch_chunks_parallel(nm_ids, fetch_chunk)
+    except Exception as e:
+        print(f"[!] Ошибка при запросе Prices API (кабинет {idx}): {e}")
+        import traceback
+        traceback.print_exc()
     
-    print(f"\n[API] Итого загружено цен для {len(prices_info)} товаров")
     return prices_info
 
 
@@ -292,6 +310,7 @@ def get_stocks_info(api_keys_list, cabinet_names=None, articles=None):
     """
     Получает остатки товаров через /api/v2/stocks-report/products/products
     Возвращает словарь {nmID: {stockCount, minPrice, maxPrice}}
+    Все кабинеты опрашиваются одновременно
     """
     print("\n[API] Загрузка остатков через Stocks API...")
     
@@ -299,87 +318,152 @@ def get_stocks_info(api_keys_list, cabinet_names=None, articles=None):
         print("[!] API ключи не найдены!")
         return {}
     
-    stocks_info = {}
-    
     # Формируем список nmIDs для фильтрации
     nm_ids = [int(art) for art in articles if str(art).isdigit()] if articles else []
     
-    for idx, api_key in enumerate(api_keys_list, 1):
-        cabinet_name = cabinet_names[idx-1] if cabinet_names and idx-1 < len(cabinet_names) else f"Кабинет {idx}"
-        print(f"\n[API] {cabinet_name} ({idx}/{len(api_keys_list)})...")
+    if nm_ids:
+        # Остатки возвращаются не для всех артикулов, поэтому отсутствие в ответе
+        # не повод искать артикул в других кабинетах
+        def fetch_cabinet(cabinet_nm_ids, api_key, cabinet_name, idx):
+            return get_stocks_from_cabinet(cabinet_nm_ids, api_key, cabinet_name, idx, len(api_keys_list))
         
-        try:
-            headers = {
-                "Authorization": api_key,
-                "Content-Type": "application/json"
-            }
-            
-            # Минимальный payload - только nmIDs для фильтрации
-            payload = {}
-            if nm_ids:
-                payload["nmIDs"] = nm_ids[:1000]  # Ограничение 1000
-            
-            response = requests.post(WB_STOCKS_API_URL, headers=headers, json=payload, timeout=60)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Парсим товары
-                products = []
-                if isinstance(data, list):
-                    products = data
-                elif isinstance(data, dict):
-                    products = data.get("products", []) or data.get("data", [])
-                
-                for product in products:
-                    nm_id = str(product.get("nmID", "") or product.get("nmId", ""))
-                    
-                    if nm_id:
-                        stocks_info[nm_id] = {
-                            "stockCount": product.get("stockCount", 0) or 0,
-                            "minPrice": product.get("minPrice", 0) or 0,
-                            "maxPrice": product.get("maxPrice", 0) or 0
-                        }
-                
-                print(f"    Загружено остатков для {len(products)} товаров")
-            
-            elif response.status_code == 401:
-                print(f"    [!] Ошибка 401: Неверный API ключ")
-            elif response.status_code == 400:
-                error_text = response.text[:500]
-                print(f"[!] Ошибка 400: {error_text}")
-                # Пробуем без фильтра
-                if nm_ids:
-                    print(f"    Пробуем запрос без фильтра nmIDs...")
-                    response2 = requests.post(WB_STOCKS_API_URL, headers=headers, json={}, timeout=60)
-                    if response2.status_code == 200:
-                        data = response2.json()
-                        products = data if isinstance(data, list) else data.get("products", [])
-                        for product in products:
-                            nm_id = str(product.get("nmID", "") or product.get("nmId", ""))
-                            if nm_id:
-                                stocks_info[nm_id] = {
-                                    "stockCount": product.get("stockCount", 0) or 0,
-                                    "minPrice": product.get("minPrice", 0) or 0,
-                                    "maxPrice": product.get("maxPrice", 0) or 0
-                                }
-                        print(f"    Загружено остатков для {len(products)} товаров")
-            else:
-                print(f"[!] Ошибка Stocks API: {response.status_code}")
-                print(f"    {response.text[:300]}")
-            
-            time.sleep(0.3)
+        stocks_info = run_routed_for_all_cabinets(nm_ids, api_keys_list, cabinet_names, fetch_cabinet)
+    else:
+        def fetch_cabinet(api_key, cabinet_name, idx):
+            return get_stocks_from_cabinet(nm_ids, api_key, cabinet_name, idx, len(api_keys_list))
         
-        except Exception as e:
-            print(f"[!] Ошибка при запросе Stocks API ({cabinet_name}): {e}")
+        stocks_info = run_for_all_cabinets(api_keys_list, cabinet_names, fetch_cabinet)
     
     print(f"\n[API] Итого загружено остатков для {len(stocks_info)} товаров")
     return stocks_info
 
 
+def extract_stocks_products(data):
+    """Список товаров из ответа Stocks API"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        return data.get("products", []) or data.get("data", [])
+    return []
+
+
+def parse_stocks_products(products):
+    """{nmID: {stockCount, minPrice, maxPrice}} из списка товаров Stocks API"""
+    stocks_info = {}
+    for product in products:
+        nm_id = str(product.get("nmID", "") or product.get("nmId", ""))
+        
+        if nm_id:
+            stocks_info[nm_id] = {
+                "stockCount": product.get("stockCount", 0) or 0,
+                "minPrice": product.get("minPrice", 0) or 0,
+                "maxPrice": product.get("maxPrice", 0) or 0
+            }
+    return stocks_info
+
+
+def get_stocks_from_cabinet(nm_ids, api_key, cabinet_name, idx, total_cabinets):
+    """
+    Загружает остатки из ОДНОГО кабинета (Stocks API)
+    nm_ids режутся на куски по 1000 (лимит фильтра), куски идут параллельно постранично;
+    пустой nm_ids - все остатки кабинета постранично
+    Возвращает словарь {nmID: {stockCount, minPrice, maxPrice}}
+    """
+    print(f"\n[API] {cabinet_name} ({idx}/{total_cabinets})...")
+    
+    stocks_info = {}
+    filter_rejected = []  # Ответ 400 на фильтр nmIDs - нужен запрос без фильтра
+    
+    def fetch_all_stocks():
+        products, response = fetch_offset_pages(WB_STOCKS_API_URL, api_key, {}, extract_stocks_products, timeout=60)
+        if response is not None and response.status_code != 200:
+            print(f"[!] Ошибка Stocks API ({cabinet_name}): {response.status_code}")
+            print(f"    {response.text[:300]}")
+        print(f"    [{cabinet_name}] Загружено остатков для {len(products)} товаров")
+        return parse_stocks_products(products)
+    
+    def fetch_chunk(chunk, chunk_no):
+        # Минимальный payload - только nmIDs для фильтрации
+        products, response = fetch_offset_pages(WB_STOCKS_API_URL, api_key, {"nmIDs": chunk},
+                                                extract_stocks_products, max_items=len(chunk), timeout=60)
+        if response is not None and response.status_code == 401:
+            print(f"    [!] Ошибка 401 ({cabinet_name}): Неверный API ключ")
+        elif response is not None and response.status_code == 400:
+            print(f"[!] Ошибка 400 ({cabinet_name}): {response.text[:500]}")
+            filter_rejected.append(chunk_no)
+        elif response is not None and response.status_code != 200:
+            print(f"[!] Ошибка Stocks API ({cabinet_name}): {response.status_code}")
+            print(f"    {response.text[:300]}")
+        
+        print(f"    [{cabinet_name}] Кусок {chunk_no}: загружено остатков для {len(products)} товаров")
+        return parse_stocks_products(products)
+    
+    try:
+        if not nm_ids:
+            return fetch_all_stocks()
+        
+        stocks_info = fetch_chunks_parallel(nm_ids, fetch_chunk)
+        
+        # Пробуем без фильтра (один раз на кабинет, а не на каждый кусок)
+        if filter_rejected:
+            print(f"    [{cabinet_name}] Пробуем запрос без фильтра nmIDs...")
+            stocks_info.update(fetch_all_stocks())
+    
+    except Exception as e:
+        print(f"[!] Ошибка при запросе Stocks API ({cabinet_name}): {e}")
+    
+    return stocks_info
+
+
+
+
+def run_api_phases_parallel(articles, api_keys, cabinet_names=None):
+    """
+    Запускает этапы Content API, Prices API и Stocks API одновременно
+    Результаты объединяются на шаге сохранения, поэтому общее время
+    равно времени самого долгого этапа, а не сумме всех трёх
+    Возвращает (product_info_dict, prices_dict, stocks_dict)
+    """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        content_future = executor.submit(get_product_info, articles, api_keys, cabinet_names)
+        prices_future = executor.submit(get_prices_full_info, articles, api_keys, cabinet_names)
+        stocks_future = executor.submit(get_stocks_info, api_keys, cabinet_names, articles)
+        
+        phase_results = []
+        for phase_name, future in (("Content API", content_future), ("Prices API", prices_future), ("Stocks API", stocks_future)):
+            try:
+                phase_results.append(future.result())
+            except Exception as e:
+                print(f"[!] Ошибка этапа {phase_name}: {e}")
+                phase_results.append({})
+    
+    return tuple(phase_results)
+
+
+def build_price_snapshots(articles, product_info_dict, prices_dict, stocks_dict):
+    """Снимки цен и остатков для истории (только артикулы, по которым получена цена)"""
+    snapshots = []
+    for article in articles:
+        prices = prices_dict.get(article, {})
+        price_base = prices.get("price", 0)
+        price_discounted = prices.get("discountedPrice", 0)
+        price_club = prices.get("clubDiscountedPrice", 0)
+        if not (price_base or price_discounted or price_club):
+            continue
+        
+        info = product_info_dict.get(article, {})
+        snapshots.append({
+            "nm_id": info.get("nmID", article),
+            "cabinet": info.get("cabinet", "Неизвестно"),
+            "price": price_base or None,
+            "discounted_price": price_discounted or None,
+            "club_discounted_price": price_club or None,
+            "stock_count": stocks_dict.get(article, {}).get("stockCount", 0) or 0
+        })
+    return snapshots
 
 
-def parse_wb_fast_api(wb, api_keys, cabinet_names=None):
+def parse_wb_fast_api(api_keys, cabinet_names=None):
     """
     БЫСТРЫЙ парсинг WB - ТОЛЬКО через API!
     Получает: название, nmID, цену до СПП, цену после СПП
@@ -388,15 +472,8 @@ def parse_wb_fast_api(wb, api_keys, cabinet_names=None):
     print("БЫСТРЫЙ ПАРСИНГ WB - ТОЛЬКО API (БЕЗ БРАУЗЕРА!)")
     print("="*80)
     
-    # Загрузка артикулов
-    ws_in = wb[SHEET_INPUT_WB]
-    ws_out = wb[SHEET_OUTPUT_WB]
-    
-    articles = []
-    for row in ws_in.iter_rows(min_row=2, max_col=1, values_only=True):
-        if row[0]:
-            article = str(row[0]).strip()
-            articles.append(article)
+    # Загрузка артикулов (только входной лист, без дублей)
+    articles = load_input_articles(INPUT_EXCEL_FILE or EXCEL_FILE, SHEET_INPUT_WB)
     
     total = len(articles)
     print(f"\n[1/6] Найдено артикулов: {total}")
@@ -407,121 +484,116 @@ def parse_wb_fast_api(wb, api_keys, cabinet_names=None):
     
     start_time = time.time()
     
-    # Шаг 1: Получаем информацию о товарах (названия)
+    # Шаги 1-3 выполняются ОДНОВРЕМЕННО: Prices и Stocks нужен только список
+    # артикулов из листа, от результатов Content API они не зависят
     print("\n[2/6] Получение информации о товарах через Content API...")
-    product_info_dict = get_product_info(articles, api_keys, cabinet_names)
-    
-    
-    # Шаг 2: Получаем цены (до и после СПП)
-    print("\n[3/6] Получение цен через Prices API...")
-    prices_dict = get_prices_full_info(articles, api_keys, cabinet_names)
+    print("[3/6] Получение цен через Prices API...")
+    print("[4/6] Получение остатков через Stocks API...")
+    print("    (все три этапа выполняются параллельно)")
+    product_info_dict, prices_dict, stocks_dict = run_api_phases_parallel(articles, api_keys, cabinet_names)
     
     
-    # Шаг 3: Получаем остатки через Stocks API
-    print("\n[4/6] Получение остатков через Stocks API...")
-    stocks_dict = get_stocks_info(api_keys, cabinet_names, articles)
-    
-    
-    # Шаг 4: Очищаем старые данные и обновляем заголовки
-    print(f"\n[5/6] Очистка старых записей...")
-    
-    # Удаляем ВСЕ строки (включая заголовки) для обновления структуры
-    if ws_out.max_row >= 1:
-        ws_out.delete_rows(1, ws_out.max_row)
-        print(f"    ✓ Удалены старые данные и заголовки")
-    
-    # Создаем новые заголовки с названиями полей из API
-    ws_out.append([
-        "Дата", 
-        "Кабинет (cabinet)", 
-        "nmID", 
-        "Название (title)",
-        "Размер (techSizeName)",
-        "price", 
-        "discountedPrice", 
-        "clubDiscountedPrice",
-        "discount %",
-        "clubDiscount %",
-        "stockCount",
-        "minPrice",
-        "maxPrice"
-    ])
-    
-    # Включаем автофильтр на заголовки
-    ws_out.auto_filter.ref = ws_out.dimensions
-    
-    # Шаг 5: Объединяем данные и сохраняем
+    # Шаг 4-5: Объединяем данные и перестраиваем лист результатов
+    # (лист пишется заново потоково, старые данные и заголовки заменяются целиком)
+    print(f"\n[5/6] Объединение данных...")
     print(f"\n[6/6] Сохранение результатов...")
     print("="*80)
     
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    success = 0
-    failed = 0
+    # Столбцы: заголовок Excel (названия полей из API), поле и тип Parquet
+    columns = [
+        ("Дата", "snapshot_ts", "timestamp"),
+        ("Кабинет (cabinet)", "cabinet", "string"),
+        ("nmID", "nm_id", "int64"),
+        ("Название (title)", "title", "string"),
+        ("Размер (techSizeName)", "tech_size_name", "string"),
+        ("price", "price", "float64"),
+        ("discountedPrice", "discounted_price", "float64"),
+        ("clubDiscountedPrice", "club_discounted_price", "float64"),
+        ("discount %", "discount", "float64"),
+        ("clubDiscount %", "club_discount", "float64"),
+        ("stockCount", "stock_count", "int64"),
+        ("minPrice", "min_price", "float64"),
+        ("maxPrice", "max_price", "float64")
+    ]
     
-    for i, article in enumerate(articles, 1):
-        # Получаем данные
-        info = product_info_dict.get(article, {})
-        prices = prices_dict.get(article, {})
-        stocks_data = stocks_dict.get(article, {})
-        
-        title = info.get("title", "Не найдено")
-        nm_id = info.get("nmID", article)
-        cabinet = info.get("cabinet", "Неизвестно")
-        
-        # Все данные из Prices API
-        price_base = prices.get("price", 0)  # price
-        price_discounted = prices.get("discountedPrice", 0)  # discountedPrice
-        price_club = prices.get("clubDiscountedPrice", 0)  # clubDiscountedPrice
-        tech_size_name = prices.get("techSizeName", "")  # techSizeName
-        discount_percent = prices.get("discount", 0)  # discount
-        club_discount_percent = prices.get("clubDiscount", 0)  # clubDiscount
-        
-        # Остатки и цены из Stocks API
-        stock_count = stocks_data.get("stockCount", 0)
-        min_price = stocks_data.get("minPrice", 0)
-        max_price = stocks_data.get("maxPrice", 0)
-        
-        # Прогресс каждые 50 товаров
-        if i % 50 == 0:
-            print(f"[{i}/{total}] Обработано товаров...")
-        
-        if price_base or price_discounted or price_club:
-            # Сохраняем все данные
-            new_row = [
-                timestamp,
-                cabinet,
-                nm_id,
-                title,
-                tech_size_name if tech_size_name else "",
-                price_base if price_base else None,
-                price_discounted if price_discounted else None,
-                price_club if price_club else None,
-                discount_percent if discount_percent else None,
-                club_discount_percent if club_discount_percent else None,
-                stock_count if stock_count else 0,
-                min_price if min_price else None,
-                max_price if max_price else None
-            ]
-            ws_out.append(new_row)
-            success += 1
-        else:
-            failed += 1
-            new_row = [
-                timestamp,
-                cabinet,
-                nm_id,
-                title,
-                "",
-                None,
-                None,
-                None,
-                None,
-                None,
-                0,
-                None,
-                None
-            ]
-            ws_out.append(new_row)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    counters = {"success": 0, "failed": 0}
+    
+    # Сравниваем с прошлым запуском: в историю и Parquet уходят только изменения
+    snapshots = build_price_snapshots(articles, product_info_dict, prices_dict, stocks_dict)
+    delta = compute_delta(snapshots, "prices_api", articles)
+    emitted_ids = delta.emitted_ids()
+    
+    def build_rows():
+        for i, article in enumerate(articles, 1):
+            # Получаем данные
+            info = product_info_dict.get(article, {})
+            prices = prices_dict.get(article, {})
+            stocks_data = stocks_dict.get(article, {})
+            
+            title = info.get("title", "Не найдено")
+            nm_id = info.get("nmID", article)
+            cabinet = info.get("cabinet", "Неизвестно")
+            
+            # Все данные из Prices API
+            price_base = prices.get("price", 0)  # price
+            price_discounted = prices.get("discountedPrice", 0)  # discountedPrice
+            price_club = prices.get("clubDiscountedPrice", 0)  # clubDiscountedPrice
+            tech_size_name = prices.get("techSizeName", "")  # techSizeName
+            discount_percent = prices.get("discount", 0)  # discount
+            club_discount_percent = prices.get("clubDiscount", 0)  # clubDiscount
+            
+            # Остатки и цены из Stocks API
+            stock_count = stocks_data.get("stockCount", 0)
+            min_price = stocks_data.get("minPrice", 0)
+            max_price = stocks_data.get("maxPrice", 0)
+            
+            # Прогресс каждые 50 товаров
+            if i % 50 == 0:
+                print(f"[{i}/{total}] Обработано товаров...")
+            
+            if price_base or price_discounted or price_club:
+                # Сохраняем все данные
+                counters["success"] += 1
+                yield [
+                    timestamp,
+                    cabinet,
+                    nm_id,
+                    title,
+                    tech_size_name if tech_size_name else "",
+                    price_base if price_base else None,
+                    price_discounted if price_discounted else None,
+                    price_club if price_club else None,
+                    discount_percent if discount_percent else None,
+                    club_discount_percent if club_discount_percent else None,
+                    stock_count if stock_count else 0,
+                    min_price if min_price else None,
+                    max_price if max_price else None
+                ]
+            else:
+                counters["failed"] += 1
+                yield [
+                    timestamp,
+                    cabinet,
+                    nm_id,
+                    title,
+                    "",
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    0,
+                    None,
+                    None
+                ]
+    
+    # В Excel - текущий снимок целиком, история копится в data/price_history.sqlite
+    write_results("fast_prices", columns, build_rows(), EXCEL_FILE, SHEET_OUTPUT_WB,
+                  sink_filter=lambda row: str(row[2]) in emitted_ids)
+    record_snapshots(delta.emitted, "prices_api")
+    success = counters["success"]
+    failed = counters["failed"]
     
     # Итоги
     elapsed = time.time() - start_time
@@ -535,11 +607,11 @@ def parse_wb_fast_api(wb, api_keys, cabinet_names=None):
     print(f"Скорость: {total/elapsed:.1f} артикулов/сек")
     print(f"{'='*80}")
     
-    wb.save(EXCEL_FILE)
     print(f"\n[SAVE] ✓ Результаты сохранены в '{EXCEL_FILE}'")
 
 
-def main():
+def main(interactive=True):
+    """interactive=False - без ожидания Enter (запуск по расписанию, см. wbparser.py)"""
     print("\n" + "!"*80)
     print("БЫСТРЫЙ ПАРСЕР WB - ТОЛЬКО API")
     print("!"*80)
@@ -554,7 +626,8 @@ def main():
     print("  3. Артикулы в листе 'Данные для парсера ВБ' (столбец A)")
     print("!"*80)
     
-    input("\n💡 Нажмите Enter чтобы начать...")
+    if interactive:
+        input("\n💡 Нажмите Enter чтобы начать...")
     
     # Загружаем API ключи из .env
     api_keys, cabinet_names = load_api_keys_from_env()
@@ -568,31 +641,30 @@ def main():
         print("    MAU=ваш_api_ключ_4")
         print("    DREAMLAB=ваш_api_ключ_5")
         print("    BEAUTYLAB=ваш_api_ключ_6")
-        return
+        return False
     
-    # Загружаем Excel
-    try:
-        wb = load_workbook(EXCEL_FILE)
-    except Exception as e:
-        print(f"\n[!] Ошибка открытия файла '{EXCEL_FILE}': {e}")
+    input_file = INPUT_EXCEL_FILE or EXCEL_FILE
+    if not os.path.exists(input_file):
+        print(f"\n[!] Ошибка открытия файла '{input_file}': файл не найден")
         print("    Убедитесь что файл существует и закрыт!")
-        return
+        return False
     
     try:
         # Быстрый парсинг через API
-        parse_wb_fast_api(wb, api_keys, cabinet_names)
+        parse_wb_fast_api(api_keys, cabinet_names)
         
         print("\n" + "="*80)
         print("✓ ВСЕ ЗАДАЧИ ВЫПОЛНЕНЫ УСПЕШНО!")
         print("="*80)
+        return True
         
     except Exception as e:
         print(f"\n[!] ОШИБКА: {e}")
         import traceback
         traceback.print_exc()
+        return False
     
     finally:
-        wb.close()
         print("\n[DONE] Завершено!")
 
 
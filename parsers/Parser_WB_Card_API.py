@@ -5,11 +5,13 @@
 """
 
 import os
-import requests
 import json
-import time
-from openpyxl import load_workbook
 from datetime import datetime
+from WB_Basket_Fetcher import fetch_cards
+from WB_Output_Backends import write_results
+from WB_Price_History import record_snapshots
+from WB_Delta import compute_delta
+from WB_Input_Loader import load_input_articles
 
 # Конфигурация
 # Пути относительно корня проекта
@@ -19,54 +21,17 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 EXCEL_FILE = os.path.join(DATA_DIR, "Парсер цен.xlsx")
 SHEET_INPUT = "Данные для парсера ВБ"
 SHEET_OUTPUT = "Результаты парсинга ВБ"
+INPUT_EXCEL_FILE = None  # Книга с артикулами, если она отличается от EXCEL_FILE (см. wbparser.py --input)
 
 # WB Basket API - более надёжный способ получить данные товаров
-def get_basket_number(nm_id):
-    """Определяет номер корзины для артикула"""
-    vol = nm_id // 100000
-    part = nm_id // 1000
-    return vol, part
-
 def get_wb_card_data(nm_ids, spp=30):
     """
-    Получает данные через Basket API (по одному товару)
+    Получает данные через Basket API (все товары одновременно, asyncio)
     
     URL формат: https://basket-XX.wbbasket.ru/vol{vol}/part{part}/{nmID}/info/ru/card.json
+    Лимит одновременных запросов к каждой корзине - в WB_Basket_Fetcher
     """
-    
-    results = {}
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'application/json',
-        'Accept-Language': 'ru-RU,ru;q=0.9'
-    }
-    
-    for nm_id in nm_ids:
-        try:
-            vol, part = get_basket_number(int(nm_id))
-            
-            # Определяем номер корзины (01-20)
-            basket_num = str((vol % 20) + 1).zfill(2)
-            
-            url = f"https://basket-{basket_num}.wbbasket.ru/vol{vol}/part{part}/{nm_id}/info/ru/card.json"
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                parsed = parse_basket_response(data, nm_id)
-                if parsed:
-                    results[str(nm_id)] = parsed
-            else:
-                print(f"  [{nm_id}] Ошибка {response.status_code}")
-            
-            time.sleep(0.1)  # Пауза между запросами
-        
-        except Exception as e:
-            print(f"  [{nm_id}] Ошибка: {e}")
-    
-    return results
+    return fetch_cards(nm_ids, parse_func=parse_basket_response)
 
 
 def parse_basket_response(data, nm_id):
@@ -159,101 +124,89 @@ def main():
     print("ПАРСЕР ЦЕН WB - ЧЕРЕЗ CARD API")
     print("="*80)
     
-    # Загружаем Excel
-    wb = load_workbook(EXCEL_FILE)
-    ws_in = wb[SHEET_INPUT]
-    ws_out = wb[SHEET_OUTPUT]
-    
-    # Загружаем артикулы
-    articles = []
-    for row in ws_in.iter_rows(min_row=2, max_col=1, values_only=True):
-        if row[0]:
-            articles.append(str(row[0]).strip())
+    # Загружаем артикулы (только входной лист, без дублей)
+    articles = load_input_articles(INPUT_EXCEL_FILE or EXCEL_FILE, SHEET_INPUT, nm_ids_only=True)
     
     print(f"\n[1/3] Найдено артикулов: {len(articles)}")
     
-    # Парсим партиями по 100
-    batch_size = 100
-    all_results = {}
-    
     print(f"\n[2/3] Парсинг через Card API...")
     
-    for i in range(0, len(articles), batch_size):
-        batch = articles[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        total_batches = (len(articles) + batch_size - 1) // batch_size
-        
-        print(f"  Батч {batch_num}/{total_batches}: {len(batch)} артикулов...")
-        
-        batch_results = get_wb_card_data(batch)
-        all_results.update(batch_results)
-        
-        print(f"    Получено: {len(batch_results)} товаров")
-        
-        time.sleep(0.5)  # Пауза между запросами
+    # Все артикулы загружаются одновременно (с лимитом на каждую корзину)
+    all_results = get_wb_card_data(articles)
     
-    # Сохраняем результаты
-    print(f"\n[3/3] Сохранение в Excel...")
+    print(f"    Получено: {len(all_results)} товаров")
     
-    # Очищаем старые данные
-    if ws_out.max_row >= 1:
-        ws_out.delete_rows(1, ws_out.max_row)
+    # Сохраняем результаты (лист перестраивается целиком, старые данные заменяются)
+    print(f"\n[3/3] Сохранение в Excel...")
     
-    # Заголовки
-    ws_out.append([
-        "Дата",
-        "nmID",
-        "Название (name)",
-        "Размер (techSizeName)",
-        "price",
-        "discountedPrice",
-        "clubDiscountedPrice",
-        "discount %",
-        "clubDiscount %",
-        "stockCount"
-    ])
+    # Столбцы: заголовок Excel, поле и тип Parquet
+    columns = [
+        ("Дата", "snapshot_ts", "timestamp"),
+        ("nmID", "nm_id", "int64"),
+        ("Название (name)", "name", "string"),
+        ("Размер (techSizeName)", "tech_size_name", "string"),
+        ("price", "price", "float64"),
+        ("discountedPrice", "discounted_price", "float64"),
+        ("clubDiscountedPrice", "club_discounted_price", "float64"),
+        ("discount %", "discount", "float64"),
+        ("clubDiscount %", "club_discount", "float64"),
+        ("stockCount", "stock_count", "int64")
+    ]
     
     # Данные
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    success = 0
-    failed = 0
-    
-    for article in articles:
-        data = all_results.get(article, {})
-        
-        if data:
-            ws_out.append([
-                timestamp,
-                article,
-                data.get('name', ''),
-                data.get('techSizeName', ''),
-                data.get('price', None),
-                data.get('discountedPrice', None),
-                data.get('clubDiscountedPrice', None),
-                data.get('discount', None),
-                data.get('clubDiscount', None),
-                data.get('stockCount', 0)
-            ])
-            success += 1
-        else:
-            ws_out.append([
-                timestamp,
-                article,
-                'Не найдено',
-                '',
-                None,
-                None,
-                None,
-                None,
-                None,
-                0
-            ])
-            failed += 1
-    
-    # Автофильтр
-    ws_out.auto_filter.ref = ws_out.dimensions
-    
-    wb.save(EXCEL_FILE)
+    counters = {"success": 0, "failed": 0}
+    
+    # Сравниваем с прошлым запуском: в историю и Parquet уходят только изменения
+    snapshots = [{
+        "nm_id": article,
+        "price": all_results[article].get('price'),
+        "discounted_price": all_results[article].get('discountedPrice'),
+        "club_discounted_price": all_results[article].get('clubDiscountedPrice'),
+        "stock_count": all_results[article].get('stockCount', 0)
+    } for article in articles if all_results.get(article)]
+    delta = compute_delta(snapshots, "card_api", articles)
+    emitted_ids = delta.emitted_ids()
+    
+    def build_rows():
+        for article in articles:
+            data = all_results.get(article, {})
+            
+            if data:
+                counters["success"] += 1
+                yield [
+                    timestamp,
+                    article,
+                    data.get('name', ''),
+                    data.get('techSizeName', ''),
+                    data.get('price', None),
+                    data.get('discountedPrice', None),
+                    data.get('clubDiscountedPrice', None),
+                    data.get('discount', None),
+                    data.get('clubDiscount', None),
+                    data.get('stockCount', 0)
+                ]
+            else:
+                counters["failed"] += 1
+                yield [
+                    timestamp,
+                    article,
+                    'Не найдено',
+                    '',
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    0
+                ]
+    
+    # В Excel - текущий снимок целиком, история копится в data/price_history.sqlite
+    write_results("card_prices", columns, build_rows(), EXCEL_FILE, SHEET_OUTPUT,
+                  sink_filter=lambda row: str(row[1]) in emitted_ids)
+    record_snapshots(delta.emitted, "card_api")
+    success = counters["success"]
+    failed = counters["failed"]
     
     print(f"\n{'='*80}")
     print(f"ГОТОВО!")
@@ -261,6 +214,7 @@ def main():
     print(f"Найдено: {success}")
     print(f"Не найдено: {failed}")
     print(f"{'='*80}\n")
+    return True
 
 
 if __name__ == "__main__":
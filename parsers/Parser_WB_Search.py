@@ -10,6 +10,8 @@
 3. Запустите: python Parser_WB_Search.py
 4. Парсер читает ссылки из файла links_to_products.xlsx
 5. Результаты сохраняются в prices_results.xlsx
+6. Запуск прервался (падение, разорванная сессия браузера) - python Parser_WB_Search.py --resume
+   продолжит с места остановки: готовые товары берутся из журнала data/search_progress.jsonl
 
 РЕЖИМЫ РАБОТЫ:
 - Обычный режим (USE_REMOTE_CHROME = False): запускает браузер с вашим профилем
@@ -24,24 +26,14 @@
 import os
 import time
 import random
-import re
 import subprocess
 import shutil
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
 from openpyxl import load_workbook, Workbook
-from selenium.common.exceptions import InvalidSessionIdException
-import requests
-import undetected_chromedriver as uc
+from WB_Html_Extractor import PageSnapshot
+from WB_Cdp_Capture import CardCapture, enable_network_capture
+from WB_Progress_Journal import ProgressJournal
+# selenium, webdriver_manager и undetected_chromedriver импортируются внутри функций
+# браузера - модуль можно импортировать (и проверять настройки) без браузерного стека
 
 # Конфигурация
 # Пути относительно корня проекта
@@ -87,12 +79,71 @@ MANUAL_LOGIN_TIMEOUT = 120  # Таймаут ожидания авторизац
 SAVE_INTERMEDIATE_RESULTS = True  # Сохранять результаты каждые N товаров
 SAVE_EVERY_N_PRODUCTS = 10  # Сохранять каждые 10 товаров (0 = только в конце)
 
+# Журнал прогресса: каждый готовый товар сразу пишется на диск (см. WB_Progress_Journal)
+# python Parser_WB_Search.py --resume - продолжить прерванный запуск, пропустив готовые товары
+PROGRESS_JOURNAL_FILE = os.path.join(DATA_DIR, "search_progress.jsonl")
+
 # Параллельная обработка товаров
 PARALLEL_TABS = 10  # Количество параллельных вкладок
 DELAY_BETWEEN_BATCHES = (0.3, 0.7)  # Задержка между пакетами (мин, макс) в секундах
 TEST_MODE = True  # True = тест на 50 товарах, False = все товары
 TEST_PRODUCTS_COUNT = 50  # Количество товаров для тестирования
 
+# Готовность страницы: ждём первый появившийся маркер (цена / "нет в наличии" / кошелёк)
+# по одному комбинированному набору селекторов вместо sleep и ожидания каждого селектора
+PAGE_READY_TIMEOUT = 8       # Максимум ждать маркер на странице (сек)
+WALLET_PRICE_TIMEOUT = 1.5   # Сколько ждать цену кошелька после клика (сек)
+READY_POLL_INTERVAL = 0.1    # Как часто проверять страницу (сек)
+
+SOLD_OUT_SELECTOR = "h2[class*='soldOutProduct']"
+WALLET_BUTTON_SELECTOR = "button[class*='priceBlockWalletPrice']"
+# Финальная цена после клика на кошелёк
+WALLET_PRICE_SELECTORS = [
+    "h2.mo-typography_color_primary",
+    "h2[class*='mo-typography'][class*='color_primary']",
+]
+# Все селекторы цены в порядке приоритета
+PRICE_SELECTORS = WALLET_PRICE_SELECTORS + [
+    "ins.priceBlockFinalPrice--iToZR",
+    "ins[class*='priceBlockFinalPrice']",
+    "ins.mo-typography[class*='priceBlockFinalPrice']",
+    "ins[class*='priceBlockFinalPrice'][class*='mo-typography']",
+    "ins[class*='FinalPrice']",
+    "span[class*='final-price']",
+    "ins[class*='price']",
+]
+
+# Проверка страницы за один запрос к браузеру: [вид, элемент, текст] или null
+PAGE_STATE_SCRIPT = """
+var s = arguments[0];
+if (document.title.indexOf('Почти готово') !== -1) return ['captcha', null, ''];
+var el = document.querySelector(s.sold_out);
+if (el) return ['sold_out', el, el.textContent];
+if (s.wallet) {
+    el = document.querySelector(s.wallet);
+    if (el) return ['wallet', el, el.textContent];
+}
+for (var i = 0; i < s.prices.length; i++) {
+    el = document.querySelector(s.prices[i]);
+    if (el && /\\d/.test(el.textContent)) return ['price', el, el.textContent];
+}
+return null;
+"""
+
+PARSE_LATENCIES = []  # Время разбора каждого товара (сек) - для статистики в конце
+PARSE_ERROR = -1      # Разбор не удался (ошибка / цена не появилась): не окончательный ответ, повторить
+
+# Цены из JSON, который загружает сама страница (card.wb.ru/cards/.../detail, см. WB_Cdp_Capture):
+# без клика на кошелёк и без селекторов; если JSON не пришёл - цена со страницы, как раньше
+USE_CDP_CAPTURE = True
+CDP_CAPTURE_TIMEOUT = 3  # Сколько ждать JSON карточки (сек)
+
+# Пул браузеров: несколько независимых Chrome, у каждого своя копия профиля (см. WB_Browser_Pool)
+# Работает только с Chrome и USE_TEMP_PROFILE; иначе - вкладки одного браузера (PARALLEL_TABS)
+USE_BROWSER_POOL = True
+BROWSER_WORKERS = 0  # Сколько браузеров, 0 = половина ядер (WB_Browser_Pool.DEFAULT_WORKERS)
+POOL_PROFILE_DIR = os.path.join(PROJECT_ROOT, "chrome_parser_profiles")  # Профили воркеров: worker_0, worker_1, ...
+
 
 def check_chrome_running():
     """Проверяет, запущен ли Chrome"""
@@ -279,18 +330,39 @@ def cleanup_profile_locks(profile_path):
     return cleaned
 
 
-def setup_browser_driver():
+def uc_chrome_options():
+    """Новые настройки для uc.Chrome (один объект настроек нельзя передать дважды)"""
+    import undetected_chromedriver as uc
+    
+    options = uc.ChromeOptions()
+    if USE_CDP_CAPTURE:
+        enable_network_capture(options)
+    return options
+
+
+def setup_browser_driver(profile_dir=None, allow_remote=True):
     """
     Настраивает браузер (Chrome или Edge)
     Автоматически определяет режим работы
+    profile_dir: профиль парсера (по умолчанию TEMP_PROFILE_DIR)
+    allow_remote=False - не подключаться к уже запущенному браузеру (пул браузеров)
     """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.edge.service import Service as EdgeService
+    from selenium.webdriver.edge.options import Options as EdgeOptions
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+    import undetected_chromedriver as uc
+    
+    profile_dir = profile_dir or TEMP_PROFILE_DIR
+    
     print(f"\n{'='*60}")
     print(f"[ДИАГНОСТИКА] Настройка браузера {BROWSER_TYPE.upper()}")
     print(f"{'='*60}")
     
     # Автоматическое определение режима
     auto_remote = False
-    if not USE_REMOTE_CHROME:
+    if not USE_REMOTE_CHROME and allow_remote:
         print(f"[ЛОГ] USE_REMOTE_CHROME = {USE_REMOTE_CHROME}")
         # Проверяем, доступен ли remote Chrome
         print(f"[ЛОГ] Проверка доступности remote Chrome на порту {CHROME_DEBUG_PORT}...")
@@ -300,7 +372,7 @@ def setup_browser_driver():
         else:
             print(f"[ЛОГ] Remote Chrome недоступен")
     
-    if USE_REMOTE_CHROME or auto_remote:
+    if (USE_REMOTE_CHROME and allow_remote) or auto_remote:
         # Подключение к уже запущенному браузеру
         print(f"[ЛОГ] Режим: Remote подключение")
         if BROWSER_TYPE == 'edge':
@@ -309,6 +381,8 @@ def setup_browser_driver():
             options = ChromeOptions()
         
         options.add_experimental_option("debuggerAddress", f"127.0.0.1:{CHROME_DEBUG_PORT}")
+        if USE_CDP_CAPTURE:
+            enable_network_capture(options, BROWSER_TYPE)
         print(f"    [Режим] Подключение к {BROWSER_TYPE.upper()} (port {CHROME_DEBUG_PORT})")
         
         try:
@@ -451,6 +525,8 @@ def setup_browser_driver():
         
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
+        if USE_CDP_CAPTURE:
+            enable_network_capture(options, BROWSER_TYPE)
         
         # Логируем все аргументы
         print(f"[ЛОГ] Аргументы командной строки Chrome:")
@@ -479,7 +555,7 @@ def setup_browser_driver():
                 # Копируем данные из Profile 4 если нужно
                 if COPY_PROFILE_DATA and USE_TEMP_PROFILE:
                     source_profile_path = os.path.join(CHROME_USER_DATA_DIR, SOURCE_PROFILE_FOR_COPY)
-                    target_profile_path = TEMP_PROFILE_DIR
+                    target_profile_path = profile_dir
                     
                     print(f"[ЛОГ] Будет создан профиль парсера с данными из '{SOURCE_PROFILE_FOR_COPY}'")
                     
@@ -488,14 +564,14 @@ def setup_browser_driver():
                         copy_profile_data(source_profile_path, target_profile_path)
                         # Очищаем lock-файлы в профиле парсера
                         print(f"[ЛОГ] Очистка lock-файлов в профиле парсера...")
-                        cleanup_profile_locks(TEMP_PROFILE_DIR)
+                        cleanup_profile_locks(profile_dir)
                         time.sleep(1)  # Небольшая задержка после копирования
                     else:
                         print(f"[!] Профиль '{SOURCE_PROFILE_FOR_COPY}' не найден, запускаю без копирования")
                 
                 if USE_TEMP_PROFILE:
                     mode_text = "headless (фоновый)" if HEADLESS_MODE else "видимый"
-                    print(f"[ЛОГ] Запуск Chrome с профилем: {TEMP_PROFILE_DIR}...")
+                    print(f"[ЛОГ] Запуск Chrome с профилем: {profile_dir}...")
                     print(f"[ЛОГ] Режим: {mode_text}")
                     
                     # Для headless режима используем use_subprocess=True для стабильности
@@ -511,7 +587,8 @@ def setup_browser_driver():
                     
                     try:
                         driver = uc.Chrome(
-                            user_data_dir=TEMP_PROFILE_DIR,
+                            options=uc_chrome_options(),
+                            user_data_dir=profile_dir,
                             headless=HEADLESS_MODE,
                             use_subprocess=use_subprocess,
                             version_main=143
@@ -524,12 +601,13 @@ def setup_browser_driver():
                         # Если ошибка связана с подключением, пробуем еще раз с задержкой
                         if "cannot connect" in error_msg.lower() or "not reachable" in error_msg.lower():
                             print(f"[ЛОГ] Ошибка подключения. Очищаю lock-файлы и пробую еще раз...")
-                            cleanup_profile_locks(TEMP_PROFILE_DIR)
+                            cleanup_profile_locks(profile_dir)
                             time.sleep(3)
                             
                             try:
                                 driver = uc.Chrome(
-                                    user_data_dir=TEMP_PROFILE_DIR,
+                                    options=uc_chrome_options(),
+                                    user_data_dir=profile_dir,
                                     headless=HEADLESS_MODE,
                                     use_subprocess=True,  # Всегда True для повторной попытки
                                     version_main=143
@@ -542,7 +620,8 @@ def setup_browser_driver():
                         elif not use_subprocess:
                             print(f"[ЛОГ] Пробую с use_subprocess=True...")
                             driver = uc.Chrome(
-                                user_data_dir=TEMP_PROFILE_DIR,
+                                options=uc_chrome_options(),
+                                user_data_dir=profile_dir,
                                 headless=HEADLESS_MODE,
                                 use_subprocess=True,
                                 version_main=143
@@ -560,6 +639,7 @@ def setup_browser_driver():
                     
                     try:
                         driver = uc.Chrome(
+                            options=uc_chrome_options(),
                             headless=HEADLESS_MODE,
                             use_subprocess=use_subprocess,
                             version_main=143
@@ -571,6 +651,7 @@ def setup_browser_driver():
                         if not use_subprocess:
                             print(f"[ЛОГ] Пробую с use_subprocess=True...")
                             driver = uc.Chrome(
+                                options=uc_chrome_options(),
                                 headless=HEADLESS_MODE,
                                 use_subprocess=True,
                                 version_main=143
@@ -619,107 +700,106 @@ def human_delay(min_sec=1, max_sec=3):
     time.sleep(delay)
 
 
+def wait_for_page_state(driver, timeout=None, wallet=True, prices=None):
+    """
+    Ждёт, пока на странице появится что-то из: "нет в наличии", кнопка кошелька, цена
+    Одна проверка = один execute_script с комбинированным набором селекторов (каждые
+    READY_POLL_INTERVAL сек), поэтому ожидание заканчивается сразу, как только маркер
+    появился, а не после перебора селекторов с таймаутом на каждый
+    Возвращает [вид, элемент, текст] (вид: captcha / sold_out / wallet / price) или None по таймауту
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    
+    selectors = {
+        "sold_out": SOLD_OUT_SELECTOR,
+        "wallet": WALLET_BUTTON_SELECTOR if wallet else None,
+        "prices": prices or PRICE_SELECTORS
+    }
+    try:
+        return WebDriverWait(driver, PAGE_READY_TIMEOUT if timeout is None else timeout,
+                             poll_frequency=READY_POLL_INTERVAL).until(
+            lambda d: d.execute_script(PAGE_STATE_SCRIPT, selectors)
+        )
+    except TimeoutException:
+        return None
+
+
 def parse_price_from_current_page(driver, article):
     """
     Парсит цену с текущей открытой страницы товара
     НЕ открывает и НЕ закрывает вкладки - это делает вызывающая функция
-    Возвращает цену или 0 если товара нет в наличии
+    Сначала - JSON карточки, перехваченный из сети (USE_CDP_CAPTURE), иначе - страница
+    Возвращает цену или 0 если товара нет в наличии (None - captcha, нужна повторная попытка;
+    PARSE_ERROR - цена не найдена или ошибка разбора, тоже повторить - это не "недоступен")
+    Разорванная сессия браузера (InvalidSessionIdException) пробрасывается - это не цена 0
+    Время разбора каждого товара копится в PARSE_LATENCIES
     """
+    from selenium.common.exceptions import InvalidSessionIdException
+    
+    start = time.perf_counter()
     try:
-        # Проверяем на captcha
-        if "Почти готово" in driver.title or "captcha" in driver.page_source.lower():
-            print(f"  [{article}] ⚠ Captcha обнаружена!")
-            return None  # None = нужна повторная попытка
-        
-        # КРИТИЧНО: Проверяем наличие элемента "Нет в наличии"
-        try:
-            sold_out_element = driver.find_element(By.CSS_SELECTOR, "h2[class*='soldOutProduct']")
-            print(f"  [{article}] ⚠ Товар недоступен: {sold_out_element.text}")
-            return 0
-        except:
-            pass  # Элемент не найден - товар в наличии
+        # Цена из JSON карточки, который загрузила страница (без клика и селекторов)
+        if USE_CDP_CAPTURE:
+            card = CardCapture.for_driver(driver).wait_for(article, CDP_CAPTURE_TIMEOUT)
+            if card:
+                if card['sold_out'] or not card['price']:
+                    print(f"  [{article}] ⚠ Товар недоступен (нет остатков в JSON карточки)")
+                    return 0
+                return int(card['price'])
         
-        # Дополнительная проверка по ключевым словам
-        page_text = driver.page_source.lower()
-        unavailable_keywords = ['нет в наличии', 'товар недоступен', 'недоступен для заказа', 'закончился', 'распродан']
+        state = wait_for_page_state(driver)
         
-        for keyword in unavailable_keywords:
-            if keyword in page_text:
-                print(f"  [{article}] ⚠ Товар недоступен: '{keyword}'")
-                return 0
-        
-        # Кликаем на кнопку кошелька (если есть)
-        try:
-            wallet_button = WebDriverWait(driver, 1.5).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "button[class*='priceBlockWalletPrice']"))
-            )
-            wallet_button.click()
-            time.sleep(0.3)  # Ждем появления финальной цены
-        except:
-            pass  # Кнопки кошелька нет - это нормально
-        
-        # Ищем элемент с финальной ценой
-        price_selectors = [
-            (By.CSS_SELECTOR, "h2.mo-typography_color_primary"),
-            (By.CSS_SELECTOR, "h2[class*='mo-typography'][class*='color_primary']"),
-            (By.CSS_SELECTOR, "ins.priceBlockFinalPrice--iToZR"),
-            (By.CSS_SELECTOR, "ins[class*='priceBlockFinalPrice']"),
-            (By.CSS_SELECTOR, "ins.mo-typography[class*='priceBlockFinalPrice']"),
-            (By.CSS_SELECTOR, "ins[class*='priceBlockFinalPrice'][class*='mo-typography']"),
-            (By.CSS_SELECTOR, "ins[class*='FinalPrice']"),
-            (By.CSS_SELECTOR, "span[class*='final-price']"),
-            (By.CSS_SELECTOR, "ins[class*='price']"),
-        ]
-        
-        price = None
-        for by, selector in price_selectors:
+        # Кликаем на кнопку кошелька (если есть) и ждём цену без кошелька
+        if state and state[0] == 'wallet':
             try:
-                price_elem = WebDriverWait(driver, 3).until(
-                    EC.presence_of_element_located((by, selector))
-                )
-                price_text = price_elem.text.strip()
-                price_num = re.sub(r'[^\d]', '', price_text)
-                if price_num:
-                    price = int(price_num)
-                    break
-            except:
-                continue
+                state[1].click()
+                wait_for_page_state(driver, WALLET_PRICE_TIMEOUT, wallet=False, prices=WALLET_PRICE_SELECTORS)
+            except Exception:
+                pass
         
-        if not price:
-            # Если цена не найдена, подождем еще и попробуем снова
-            print(f"  [{article}] ⚠ Цена не найдена с первой попытки, жду еще 1 секунду...")
-            time.sleep(1)
-            
-            # Повторная попытка найти цену
-            for by, selector in price_selectors:
-                try:
-                    price_elem = driver.find_element(by, selector)
-                    price_text = price_elem.text.strip()
-                    price_num = re.sub(r'[^\d]', '', price_text)
-                    if price_num:
-                        price = int(price_num)
-                        print(f"  [{article}] ✓ Цена найдена со второй попытки: {price} ₽")
-                        break
-                except:
-                    continue
+        # Captcha, "нет в наличии" и цены - с одного снимка страницы (WB_Html_Extractor)
+        page = PageSnapshot.from_driver(driver)
         
-        if not price:
-            print(f"  [{article}] ✗ Цена не найдена даже после повторной попытки")
+        if (state and state[0] == 'captcha') or page.captcha:
+            print(f"  [{article}] ⚠ Captcha обнаружена!")
+            return None  # None = нужна повторная попытка
+        
+        # КРИТИЧНО: элемент "Нет в наличии" или ключевые слова на странице
+        sold_out = page.sold_out
+        if sold_out:
+            print(f"  [{article}] ⚠ Товар недоступен: {sold_out}")
             return 0
         
-        return price
+        if not page.price:
+            print(f"  [{article}] ✗ Цена не найдена за {PAGE_READY_TIMEOUT} сек")
+            return PARSE_ERROR
+        
+        return int(page.price)
     
+    except InvalidSessionIdException:
+        raise
     except Exception as e:
         print(f"  [{article}] ✗ Ошибка парсинга: {e}")
-        return 0
+        return PARSE_ERROR
+    
+    finally:
+        PARSE_LATENCIES.append(time.perf_counter() - start)
 
 
-def process_products_parallel(driver, products):
+def process_products_parallel(driver, products, journal=None, previous=None):
     """
     Обрабатывает товары параллельно по PARALLEL_TABS штук
+    journal - ProgressJournal: готовые товары пишутся в него сразу
+    previous - результаты из журнала (--resume), попадают в промежуточные сохранения
+    Разорванная сессия браузера прерывает обработку (продолжить - --resume)
     Возвращает список результатов
     """
+    from selenium.common.exceptions import InvalidSessionIdException
+    
     results = []
+    previous = previous or []
+    saved_count = 0
     main_window = driver.window_handles[0]
     total = len(products)
     
@@ -744,35 +824,40 @@ def process_products_parallel(driver, products):
             driver.execute_script("window.open(arguments[0], '_blank');", product['url'])
             time.sleep(0.3)  # Минимальная задержка между открытием вкладок
         
-        # ФАЗА 2: Ждем загрузки всех вкладок
-        print(f"\n[2/4] Жду полной загрузки страниц...")
+        # ФАЗА 2: Страницы грузятся параллельно, готовность каждой проверяется при разборе
+        print(f"\n[2/4] Вкладки загружаются...")
         tabs = driver.window_handles[1:]  # Все вкладки кроме главной
         
-        # Ждем 2 секунды - минимум для загрузки страниц
-        time.sleep(2)
-        
-        print(f"  ✓ Все {len(tabs)} вкладок загружены")
-        
-        # ФАЗА 3: Парсим цены из всех вкладок
+        # ФАЗА 3: Парсим цены из всех вкладок (ждём только пока не появится цена / "нет в наличии")
         print(f"\n[3/4] Парсинг цен...")
         for idx, (tab_handle, product) in enumerate(zip(tabs, batch)):
             try:
                 driver.switch_to.window(tab_handle)
                 price = parse_price_from_current_page(driver, product['article'])
                 
-                # Если captcha - пропускаем
+                # Captcha или ошибка разбора - цена 0, но в журнал не пишем:
+                # при --resume товар обработается заново
                 if price is None:
-                    price = 0
+                    status = "captcha"
+                elif price == PARSE_ERROR:
+                    status = "ошибка"
+                else:
+                    status = f"{price} ₽" if price > 0 else "недоступен"
+                final = price is not None and price != PARSE_ERROR
                 
                 results.append({
                     'url': product['url'],
                     'article': product['article'],
-                    'price': price
+                    'price': price if final else 0
                 })
+                if journal and final:
+                    journal.record(results[-1])
                 
-                status = f"{price} ₽" if price > 0 else "недоступен" if price == 0 else "ошибка"
                 print(f"  [{batch_start + idx + 1}/{total}] {product['article']}: {status}")
             
+            except InvalidSessionIdException:
+                print(f"  [{batch_start + idx + 1}/{total}] {product['article']}: ✗ Сессия браузера разорвана")
+                raise
             except Exception as e:
                 print(f"  [{batch_start + idx + 1}/{total}] {product['article']}: ✗ ошибка - {e}")
                 results.append({
@@ -793,10 +878,12 @@ def process_products_parallel(driver, products):
         # Возвращаемся на главную вкладку
         driver.switch_to.window(main_window)
         
-        # Промежуточное сохранение
-        if SAVE_INTERMEDIATE_RESULTS and len(results) % SAVE_EVERY_N_PRODUCTS == 0:
-            print(f"\n💾 Промежуточное сохранение ({len(results)} товаров)...")
-            if save_results_to_excel(results, OUTPUT_EXCEL_FILE):
+        # Промежуточное сохранение (каждые SAVE_EVERY_N_PRODUCTS, при любом размере пакета)
+        if SAVE_INTERMEDIATE_RESULTS and SAVE_EVERY_N_PRODUCTS and \
+                len(results) - saved_count >= SAVE_EVERY_N_PRODUCTS:
+            saved_count = len(results)
+            print(f"\n💾 Промежуточное сохранение ({len(previous) + len(results)} товаров)...")
+            if save_results_to_excel(previous + results, OUTPUT_EXCEL_FILE):
                 print(f"✓ Сохранено")
         
         # Задержка между пакетами
@@ -805,14 +892,69 @@ def process_products_parallel(driver, products):
             print(f"\n⏸ Пауза {delay:.1f}с перед следующим пакетом...\n")
             time.sleep(delay)
     
+    print_latency_stats("Разбор страницы", PARSE_LATENCIES)
+    if USE_CDP_CAPTURE:
+        CardCapture.for_driver(driver).report()
     return results
 
 
+def print_latency_stats(title, latencies):
+    """Медиана / p95 / максимум времени на товар"""
+    from WB_Browser_Pool import latency_summary
+    summary = latency_summary(latencies)
+    if summary:
+        print(f"\n    [{title}] {len(latencies)} товаров: медиана {summary[0]:.2f} сек, "
+              f"p95 {summary[1]:.2f} сек, макс {summary[2]:.2f} сек")
+
+
+def setup_worker_driver(worker_id):
+    """Браузер воркера пула: свой профиль (копия SOURCE_PROFILE_FOR_COPY), без remote"""
+    return setup_browser_driver(os.path.join(POOL_PROFILE_DIR, f"worker_{worker_id}"), allow_remote=False)
+
+
+def browser_pool_supported():
+    """Пул возможен, если каждый воркер может запустить свой Chrome со своим профилем"""
+    return USE_BROWSER_POOL and BROWSER_TYPE == 'chrome' and USE_TEMP_PROFILE and not USE_REMOTE_CHROME
+
+
+def process_products_pool(products, journal=None, previous=None):
+    """
+    Обрабатывает товары пулом независимых браузеров (процессов)
+    journal / previous - как в process_products_parallel
+    Возвращает список результатов в порядке products
+    """
+    from WB_Browser_Pool import run_browser_pool, DEFAULT_WORKERS
+    
+    workers = min(BROWSER_WORKERS or DEFAULT_WORKERS, len(products))
+    print(f"\n{'='*80}")
+    print(f"ПУЛ БРАУЗЕРОВ: {workers} процессов, профили в {POOL_PROFILE_DIR}")
+    print(f"{'='*80}\n")
+    
+    previous = previous or []
+    
+    def checkpoint(results):
+        print(f"\n💾 Промежуточное сохранение ({len(previous) + len(results)} товаров)...")
+        if save_results_to_excel(previous + results, OUTPUT_EXCEL_FILE):
+            print(f"✓ Сохранено")
+    
+    return run_browser_pool(
+        products, setup_worker_driver, parse_price_from_current_page, workers,
+        on_checkpoint=checkpoint if SAVE_INTERMEDIATE_RESULTS else None,
+        checkpoint_every=SAVE_EVERY_N_PRODUCTS,
+        on_result=journal.record if journal else None
+    )
+
+
 def get_price_from_product_page(driver, product_url, article):
     """
     Открывает карточку товара по ссылке и извлекает цену
     Возвращает цену или 0 если товара нет в наличии
     """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import InvalidSessionIdException
+    
     try:
         print(f"\n[{article}] Открываю карточку в новой вкладке...")
         print(f"  URL: {product_url}")
@@ -825,95 +967,42 @@ def get_price_from_product_page(driver, product_url, article):
         
         human_delay(2, 4)
         
-        # Проверяем на captcha
-        if "Почти готово" in driver.title or "captcha" in driver.page_source.lower():
+        # Captcha, "нет в наличии" и цены - с одного снимка страницы (WB_Html_Extractor)
+        page = PageSnapshot.from_driver(driver)
+        
+        # Проверяем на captcha (заголовок "Почти готово" - тоже по снимку)
+        if page.captcha:
             print(f"  ⚠ Captcha! Жду 10 сек...")
             time.sleep(10)
             driver.get(product_url)
             human_delay(2, 4)
+            page = PageSnapshot.from_driver(driver)
         
-        # КРИТИЧНО: Проверяем наличие элемента "Нет в наличии"
-        # <h2 class="... soldOutProduct--vCzrv">Нет в наличии</h2>
-        try:
-            sold_out_element = driver.find_element(By.CSS_SELECTOR, "h2[class*='soldOutProduct']")
-            print(f"  ⚠ Товар недоступен: найден элемент 'soldOutProduct' - {sold_out_element.text}")
+        # КРИТИЧНО: элемент "Нет в наличии" (soldOutProduct) или ключевые слова на странице
+        sold_out = page.sold_out
+        if sold_out:
+            print(f"  ⚠ Товар недоступен: {sold_out}")
             # Закрываем вкладку и пропускаем товар
             driver.close()
             driver.switch_to.window(driver.window_handles[0])
             return 0
-        except:
-            pass  # Элемент не найден - товар в наличии
-        
-        # Дополнительная проверка по ключевым словам (fallback)
-        page_text = driver.page_source.lower()
-        unavailable_keywords = [
-            'нет в наличии',
-            'товар недоступен',
-            'недоступен для заказа',
-            'закончился',
-            'распродан'
-        ]
-        
-        is_unavailable = False
-        for keyword in unavailable_keywords:
-            if keyword in page_text:
-                is_unavailable = True
-                print(f"  ⚠ Товар недоступен: найдено '{keyword}'")
-                break
-        
-        if is_unavailable:
-            # Закрываем вкладку если товар недоступен
-            driver.close()
-            driver.switch_to.window(driver.window_handles[0])
-            return 0
         
-        # НОВАЯ ЛОГИКА: Сначала кликаем на кнопку кошелька (если есть)
-        # Это открывает финальную цену с учетом всех скидок
-        try:
-            # Ищем кнопку с кошельком (класс priceBlockWalletPrice)
-            wallet_button = WebDriverWait(driver, 3).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "button[class*='priceBlockWalletPrice']"))
-            )
-            print(f"  ⚠ Найдена кнопка кошелька, кликаю...")
-            wallet_button.click()
-            human_delay(1, 2)  # Ждем появления финальной цены
-        except:
-            # Кнопки кошелька нет - это нормально, продолжаем
-            print(f"  ℹ Кнопка кошелька не найдена, ищу обычную цену")
-        
-        # Ищем элемент с финальной ценой
-        # Приоритет 1: h2 с классом mo-typography_color_primary (появляется после клика на кошелек)
-        # Приоритет 2: ins.priceBlockFinalPrice (обычная цена)
-        price_selectors = [
-            # Финальная цена после клика на кошелек
-            (By.CSS_SELECTOR, "h2.mo-typography_color_primary"),
-            (By.CSS_SELECTOR, "h2[class*='mo-typography'][class*='color_primary']"),
-            # Обычная цена
-            (By.CSS_SELECTOR, "ins.priceBlockFinalPrice--iToZR"),
-            (By.CSS_SELECTOR, "ins[class*='priceBlockFinalPrice']"),
-            (By.CSS_SELECTOR, "ins.mo-typography[class*='priceBlockFinalPrice']"),
-            (By.CSS_SELECTOR, "ins[class*='priceBlockFinalPrice'][class*='mo-typography']"),
-            # Fallback селекторы
-            (By.CSS_SELECTOR, "ins[class*='FinalPrice']"),
-            (By.CSS_SELECTOR, "span[class*='final-price']"),
-            (By.CSS_SELECTOR, "ins[class*='price']"),
-        ]
-        
-        price = None
-        for by, selector in price_selectors:
+        # Цена без кошелька появляется после клика на кнопку кошелька
+        if page.wallet_button and not page.price:
             try:
-                price_elem = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((by, selector))
+                print(f"  ⚠ Найдена кнопка кошелька, кликаю...")
+                driver.find_element(By.CSS_SELECTOR, WALLET_BUTTON_SELECTOR).click()
+                WebDriverWait(driver, 3).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ", ".join(WALLET_PRICE_SELECTORS)))
                 )
-                price_text = price_elem.text.strip()
-                # Извлекаем число (убираем все нецифровые символы, включая nbsp)
-                price_num = re.sub(r'[^\d]', '', price_text)
-                if price_num:
-                    price = int(price_num)
-                    print(f"  ✓ Цена найдена: {price} ₽ (селектор: {selector})")
-                    break
-            except:
-                continue
+            except Exception:
+                print(f"  ℹ Цена после клика не появилась, ищу обычную цену")
+            page = PageSnapshot.from_driver(driver)
+        
+        price = int(page.price) if page.price else None
+        if price:
+            print(f"  ✓ Цена найдена: {price} ₽" + (f" (с кошельком {page.wallet_price:.0f} ₽)"
+                                                    if page.wallet_price else ""))
         
         if not price:
             print(f"  ⚠ Цена не найдена - возможно товар недоступен")
@@ -977,7 +1066,32 @@ def save_results_to_excel(results, output_file):
         return False
 
 
-def main():
+def save_results_to_parquet(results):
+    """Сохраняет снимок цен в Parquet (data/parquet/search_prices), если формат включён"""
+    if not results:
+        return
+    try:
+        from datetime import datetime
+        from WB_Output_Backends import write_results, get_output_backends
+        
+        if "parquet" not in get_output_backends():
+            return
+        
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        columns = [
+            ("Дата", "snapshot_ts", "timestamp"),
+            ("ссылка на товар", "url", "string"),
+            ("артикул", "nm_id", "int64"),
+            ("цена", "price", "float64")
+        ]
+        rows = ([timestamp, result['url'], result['article'], result['price'] or None] for result in results)
+        write_results("search_prices", columns, rows, backends=["parquet"])
+    except Exception as e:
+        print(f"\n[!] ОШИБКА при сохранении в Parquet: {e}")
+
+
+def main(resume=False):
+    """resume=True - пропустить товары из журнала прогресса прошлого (прерванного) запуска"""
     print("\n" + "="*80)
     print("ПАРСЕР ЦЕН WB - ПРОСТОЙ ПАРСЕР")
     print("="*80)
@@ -1001,7 +1115,7 @@ def main():
     
     # Загружаем Excel со ссылками
     try:
-        wb = load_workbook(LINKS_EXCEL_FILE)
+        wb = load_workbook(LINKS_EXCEL_FILE, read_only=True)
     except Exception as e:
         print(f"\n[!] ОШИБКА открытия Excel: {e}")
         print(f"    Убедись что файл '{LINKS_EXCEL_FILE}' закрыт!")
@@ -1032,56 +1146,73 @@ def main():
         products = products[:TEST_PRODUCTS_COUNT]
         print(f"⚠️  ТЕСТОВЫЙ РЕЖИМ: обработка первых {len(products)} товаров")
     
-    # Запускаем Chrome
-    print(f"\n[2/3] Запуск Chrome...")
+    # Журнал прогресса: готовые товары пишутся сразу, с --resume они пропускаются
+    journal = ProgressJournal(PROGRESS_JOURNAL_FILE)
+    done = journal.load() if resume else {}
+    previous = [done[product['article']] for product in products if product['article'] in done]
+    todo = [product for product in products if product['article'] not in done]
+    if resume:
+        print(f"\n↻ ПРОДОЛЖЕНИЕ: готово по журналу {len(previous)}, осталось {len(todo)}")
+    journal.open(resume)
     
     driver = None
     results = []  # Инициализируем результаты вне try, чтобы сохранить в finally
     try:
-        driver = setup_browser_driver()
+        if not todo:
+            print(f"\n✓ Все товары уже есть в журнале - парсить нечего")
+        elif browser_pool_supported():
+            # Независимые браузеры: каждый со своим профилем, товары из общей очереди
+            print(f"\n[2/3] Запуск пула браузеров...")
+            print(f"\n[3/3] Парсинг цен...")
+            results = process_products_pool(todo, journal, previous)
+        else:
+            # Запускаем Chrome
+            print(f"\n[2/3] Запуск Chrome...")
+            
+            driver = setup_browser_driver()
         
-        if not driver:
-            print("\n[!] Не удалось запустить Chrome!")
-            if USE_REMOTE_CHROME:
-                print(f"\n💡 Убедись что Chrome запущен через START_CHROME_DEBUG.bat")
-            wb.close()
-            return
+            if not driver:
+                print("\n[!] Не удалось запустить Chrome!")
+                if USE_REMOTE_CHROME:
+                    print(f"\n💡 Убедись что Chrome запущен через START_CHROME_DEBUG.bat")
+                wb.close()
+                return
         
-        print("    ✓ Chrome запущен")
+            print("    ✓ Chrome запущен")
         
-        # Пауза для ручной авторизации (только в видимом режиме)
-        if WAIT_FOR_MANUAL_LOGIN and not HEADLESS_MODE:
-            print(f"\n{'='*80}")
-            print("⏸  ПАУЗА ДЛЯ АВТОРИЗАЦИИ")
-            print(f"{'='*80}")
-            print(f"\n📋 ИНСТРУКЦИЯ:")
-            print(f"   1. В открывшемся Chrome зайдите на сайт WB")
-            print(f"   2. Авторизуйтесь в своем аккаунте")
-            print(f"   3. Установите правильный адрес доставки")
-            print(f"   4. После этого вернитесь сюда и нажмите ENTER")
-            print(f"\n⏱  Таймаут: {MANUAL_LOGIN_TIMEOUT} секунд")
-            print(f"   (или нажмите ENTER когда будете готовы)")
-            print(f"\n{'='*80}\n")
-        elif WAIT_FOR_MANUAL_LOGIN and HEADLESS_MODE:
-            print(f"\n⚠️  ВНИМАНИЕ: Headless режим активен!")
-            print(f"   Авторизация через браузер невозможна (браузер не виден).")
-            print(f"   Убедитесь, что профиль уже авторизован или используйте видимый режим для первой авторизации.\n")
-            # В headless режиме просто проверяем, что профиль работает
-            try:
-                print(f"[ЛОГ] Проверяю доступность WB...")
-                driver.get("https://www.wildberries.ru/")
-                time.sleep(2)
-                print(f"[ЛОГ] ✓ WB доступен, продолжаю парсинг...")
-            except Exception as e:
-                print(f"\n[!] Ошибка при проверке WB: {e}")
-                print(f"    Продолжаю парсинг...")
+            # Пауза для ручной авторизации (только в видимом режиме)
+            if WAIT_FOR_MANUAL_LOGIN and not HEADLESS_MODE:
+                print(f"\n{'='*80}")
+                print("⏸  ПАУЗА ДЛЯ АВТОРИЗАЦИИ")
+                print(f"{'='*80}")
+                print(f"\n📋 ИНСТРУКЦИЯ:")
+                print(f"   1. В открывшемся Chrome зайдите на сайт WB")
+                print(f"   2. Авторизуйтесь в своем аккаунте")
+                print(f"   3. Установите правильный адрес доставки")
+                print(f"   4. После этого вернитесь сюда и нажмите ENTER")
+                print(f"\n⏱  Таймаут: {MANUAL_LOGIN_TIMEOUT} секунд")
+                print(f"   (или нажмите ENTER когда будете готовы)")
+                print(f"\n{'='*80}\n")
+            elif WAIT_FOR_MANUAL_LOGIN and HEADLESS_MODE:
+                print(f"\n⚠️  ВНИМАНИЕ: Headless режим активен!")
+                print(f"   Авторизация через браузер невозможна (браузер не виден).")
+                print(f"   Убедитесь, что профиль уже авторизован или используйте видимый режим для первой авторизации.\n")
+                # В headless режиме просто проверяем, что профиль работает
+                try:
+                    print(f"[ЛОГ] Проверяю доступность WB...")
+                    driver.get("https://www.wildberries.ru/")
+                    time.sleep(2)
+                    print(f"[ЛОГ] ✓ WB доступен, продолжаю парсинг...")
+                except Exception as e:
+                    print(f"\n[!] Ошибка при проверке WB: {e}")
+                    print(f"    Продолжаю парсинг...")
         
-        # Парсим товары (параллельно)
-        print(f"\n[3/3] Парсинг цен...")
-        print("="*80)
+            # Парсим товары (параллельно)
+            print(f"\n[3/3] Парсинг цен...")
+            print("="*80)
         
-        # Используем параллельную обработку
-        results = process_products_parallel(driver, products)
+            # Используем параллельную обработку
+            results = process_products_parallel(driver, todo, journal, previous)
         
     except Exception as e:
         print(f"\n[!] КРИТИЧЕСКАЯ ОШИБКА: {e}")
@@ -1094,10 +1225,26 @@ def main():
         print("ФИНАЛЬНОЕ СОХРАНЕНИЕ РЕЗУЛЬТАТОВ")
         print(f"{'='*80}")
         
+        # Итог - из журнала (готовые товары, в т.ч. прошлых запусков) и этого запуска
+        # (captcha / ошибки - цена 0); после падения results пуст, но журнал всё помнит
+        journal.close()
+        finished = journal.load()
+        current = {result['article']: result for result in results}
+        results = [finished.get(product['article']) or current[product['article']] for product in products
+                   if product['article'] in finished or product['article'] in current]
+        
         if save_results_to_excel(results, OUTPUT_EXCEL_FILE):
             print(f"\n✓ Сохранено: {len(results)} товаров")
             print(f"✓ Файл: {OUTPUT_EXCEL_FILE}")
         
+        pending = len(products) - len(finished)
+        if pending:
+            print(f"\n⚠️  Без окончательной цены: {pending} (captcha / ошибки / не дошла очередь)")
+            print(f"   Продолжить: python Parser_WB_Search.py --resume")
+        
+        # Снимок цен для аналитики (Excel уже записан выше)
+        save_results_to_parquet(results)
+        
         if driver:
             print(f"\n[Закрываю Chrome через 5 секунд...]")
             time.sleep(5)
@@ -1111,4 +1258,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Цены WB со страниц товаров (браузер)")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"продолжить прерванный запуск: пропустить товары из {PROGRESS_JOURNAL_FILE}")
+    main(resume=parser.parse_args().resume)
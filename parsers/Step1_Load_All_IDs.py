@@ -5,10 +5,10 @@
 """
 
 import os
-import requests
 from openpyxl import load_workbook, Workbook
 from dotenv import load_dotenv
 import time
+from WB_Content_Sync import iter_content_pages, sync_cabinet_cards
 
 # === КОНФИГУРАЦИЯ ===
 # Пути относительно корня проекта
@@ -18,9 +18,11 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 EXCEL_FILE = os.path.join(DATA_DIR, "Парсер цен.xlsx")
 SHEET_INPUT_WB = "Данные для парсера ВБ"
 
-WB_CONTENT_API_URL = "https://content-api.wildberries.ru/content/v2/get/cards/list"
 CABINET_NAMES = ["COSMO", "MMA", "MAB", "MAU", "DREAMLAB", "BEAUTYLAB"]
 
+# Запрашивать у Content API только карточки, изменённые с прошлого запуска
+INCREMENTAL_CONTENT_SYNC = True
+
 # === ФУНКЦИИ ===
 
 def load_api_keys_from_env():
@@ -44,51 +46,24 @@ def load_api_keys_from_env():
     return api_keys, cabinet_info
 
 
-def get_all_nmids_from_cabinet(api_key, cabinet_name):
-    """Получает ВСЕ nmID из одного кабинета"""
+def get_all_nmids_from_cabinet(api_key, cabinet_name, incremental=None):
+    """
+    Получает ВСЕ nmID из одного кабинета
+    incremental=True - у API запрашиваются только изменённые карточки (см. WB_Content_Sync)
+    """
+    if incremental is None:
+        incremental = INCREMENTAL_CONTENT_SYNC
+    
     print(f"\n[{cabinet_name}] Загрузка артикулов...")
     
     nm_ids = []
-    headers = {
-        "Authorization": api_key,
-        "Content-Type": "application/json"
-    }
-    
-    cursor_updatedAt = ""
-    cursor_nmID = 0
-    page = 0
     
     try:
-        while True:
-            page += 1
-            
-            payload = {
-                "settings": {
-                    "cursor": {
-                        "limit": 100
-                    },
-                    "filter": {
-                        "withPhoto": -1
-                    }
-                }
-            }
-            
-            if cursor_updatedAt and cursor_nmID:
-                payload["settings"]["cursor"]["updatedAt"] = cursor_updatedAt
-                payload["settings"]["cursor"]["nmID"] = cursor_nmID
-            
-            response = requests.post(WB_CONTENT_API_URL, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                cards = data.get("cards", [])
-                if not cards and "data" in data:
-                    cards = data.get("data", {}).get("cards", [])
-                
-                if not cards:
-                    break
-                
+        if incremental:
+            cards = sync_cabinet_cards(api_key, cabinet_name)
+            nm_ids = [nm_id for nm_id in cards if nm_id.isdigit()]
+        else:
+            for page, cards, cursor_data in iter_content_pages(api_key, cabinet_name):
                 # Собираем nmID
                 for card in cards:
                     nm_id = str(card.get("nmID", ""))
@@ -96,23 +71,6 @@ def get_all_nmids_from_cabinet(api_key, cabinet_name):
                         nm_ids.append(nm_id)
                 
                 print(f"    Страница {page}: +{len(cards)} товаров (всего: {len(nm_ids)})")
-                
-                # Курсор
-                cursor_data = data.get("cursor", {})
-                cursor_updatedAt = cursor_data.get("updatedAt", "")
-                cursor_nmID = cursor_data.get("nmID", 0)
-                
-                if not cursor_updatedAt or not cursor_nmID:
-                    break
-                
-                time.sleep(0.2)
-            
-            elif response.status_code == 401:
-                print(f"    [!] Ошибка 401: Неверный API ключ")
-                break
-            else:
-                print(f"    [!] Ошибка {response.status_code}")
-                break
         
         print(f"    ✓ Загружено {len(nm_ids)} артикулов из {cabinet_name}")
         
@@ -122,7 +80,8 @@ def get_all_nmids_from_cabinet(api_key, cabinet_name):
     return nm_ids
 
 
-def main():
+def main(interactive=True):
+    """interactive=False - без ожидания Enter (запуск по расписанию, см. wbparser.py)"""
     print("\n" + "="*80)
     print("ШАГ 1: ЗАГРУЗКА ВСЕХ АРТИКУЛОВ ИЗ КАБИНЕТОВ")
     print("="*80)
@@ -133,14 +92,15 @@ def main():
     print("\n💡 После этого можете запустить Parser_WB_API_FAST.py")
     print("="*80)
     
-    input("\n💡 Нажмите Enter чтобы начать...")
+    if interactive:
+        input("\n💡 Нажмите Enter чтобы начать...")
     
     # Загружаем API ключи
     api_keys, cabinet_names = load_api_keys_from_env()
     
     if not api_keys:
         print("\n[!] ОШИБКА: Не найдено API ключей!")
-        return
+        return False
     
     start_time = time.time()
     
@@ -166,7 +126,7 @@ def main():
     
     if not unique_nm_ids:
         print("\n[!] Не найдено ни одного артикула!")
-        return
+        return False
     
     # Записываем в Excel
     print("\n" + "="*80)
@@ -206,7 +166,7 @@ def main():
         print(f"\n[!] Ошибка при сохранении: {e}")
         import traceback
         traceback.print_exc()
-        return
+        return False
     
     # Итоги
     elapsed = time.time() - start_time
@@ -235,6 +195,7 @@ def main():
     print("="*80)
     
     print("\n[DONE] Завершено!")
+    return True
 
 
 if __name__ == "__main__":
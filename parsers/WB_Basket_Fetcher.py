@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+АСИНХРОННАЯ ЗАГРУЗКА card.json С CDN basket-XX.wbbasket.ru
+Все запросы идут одновременно (asyncio + aiohttp), но к каждому хосту
+basket-XX открыто не больше MAX_CONCURRENCY_PER_HOST запросов.
+10 000+ артикулов загружаются за секунды вместо десятков минут.
+Корзина определяется по карте диапазонов vol (WB_Basket_Shards),
+при промахе остальные корзины опрашиваются параллельно.
+
+URL формат: https://basket-XX.wbbasket.ru/vol{vol}/part{part}/{nmID}/info/ru/card.json
+"""
+
+import time
+import asyncio
+import aiohttp
+
+from WB_Basket_Shards import BasketShardMap, basket_from_table
+
+# === КОНФИГУРАЦИЯ ===
+BASKET_URL_TEMPLATE = "https://basket-{basket}.wbbasket.ru/vol{vol}/part{part}/{nm_id}/info/ru/card.json"
+
+MAX_CONCURRENCY_PER_HOST = 20   # Одновременных запросов к одному basket-XX
+MAX_CONCURRENCY_TOTAL = 200     # Одновременных запросов всего
+REQUEST_TIMEOUT = 10            # Таймаут одного запроса (секунды)
+MAX_RETRIES = 3                 # Повторы при 429/5xx и сетевых ошибках
+PROGRESS_EVERY = 500            # Выводить прогресс каждые N товаров
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'ru-RU,ru;q=0.9'
+}
+
+
+def get_basket_number(nm_id):
+    """Определяет vol и part для артикула"""
+    vol = nm_id // 100000
+    part = nm_id // 1000
+    return vol, part
+
+
+def guess_basket_host(nm_id):
+    """Номер корзины по таблице диапазонов vol (без выученной карты)"""
+    vol = get_basket_number(nm_id)[0]
+    return basket_from_table(vol)
+
+
+def build_card_url(nm_id, basket, url_template=BASKET_URL_TEMPLATE):
+    vol, part = get_basket_number(nm_id)
+    return url_template.format(basket=basket, vol=vol, part=part, nm_id=nm_id)
+
+
+async def _request_card(session, host_semaphores, nm_id, basket, url_template):
+    """
+    Запрашивает card.json артикула из конкретной корзины
+    Возвращает (status, data); status 0 - сетевая ошибка
+    """
+    url = build_card_url(nm_id, basket, url_template)
+    semaphore = host_semaphores.setdefault(basket, asyncio.Semaphore(MAX_CONCURRENCY_PER_HOST))
+    status = 0
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                async with session.get(url) as response:
+                    status = response.status
+                    if status == 200:
+                        return status, await response.json(content_type=None)
+                    retry_after = response.headers.get("Retry-After", "")
+
+            if status == 429 or status >= 500:
+                wait = float(retry_after) if retry_after.replace(".", "", 1).isdigit() else 0.5 * attempt
+                await asyncio.sleep(wait)
+                continue
+
+            return status, None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == MAX_RETRIES:
+                print(f"  [{nm_id}] Ошибка: {e!r}")
+                return 0, None
+            await asyncio.sleep(0.5 * attempt)
+
+    return status, None
+
+
+async def _probe_baskets(session, host_semaphores, shard_map, nm_id, missed_basket, url_template):
+    """
+    Опрашивает все остальные корзины параллельно, первая ответившая 200 - правильная
+    Возвращает (basket, data) или (None, None)
+    """
+    vol, part = get_basket_number(nm_id)
+
+    async def try_basket(basket):
+        status, data = await _request_card(session, host_semaphores, nm_id, basket, url_template)
+        return basket, data if status == 200 else None
+
+    tasks = [asyncio.ensure_future(try_basket(basket))
+             for basket in shard_map.probe_candidates(vol, missed_basket)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            basket, data = await task
+            if data is not None:
+                shard_map.learn(vol, basket)
+                return basket, data
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return None, None
+
+
+async def _fetch_card(session, host_semaphores, shard_map, probes, nm_id, url_template):
+    """
+    Загружает card.json одного артикула
+    Возвращает (nm_id, data) или (nm_id, None) если не удалось
+    """
+    vol, part = get_basket_number(nm_id)
+    basket = shard_map.resolve(vol)
+
+    status, data = await _request_card(session, host_semaphores, nm_id, basket, url_template)
+    if status == 200:
+        shard_map.learn(vol, basket)
+        return nm_id, data
+
+    if status != 404:
+        print(f"  [{nm_id}] Ошибка {status} (basket-{basket})")
+        return nm_id, None
+
+    # Промах по корзине: перебираем остальные, но только один раз на vol -
+    # остальные артикулы этого vol ждут результат первого перебора
+    probe = probes.get(vol)
+    if probe is None:
+        probe = asyncio.ensure_future(
+            _probe_baskets(session, host_semaphores, shard_map, nm_id, basket, url_template)
+        )
+        probes[vol] = (nm_id, probe)
+        found_basket, data = await probe
+        if data is None:
+            print(f"  [{nm_id}] Не найден ни в одной корзине (vol {vol})")
+        return nm_id, data
+
+    probe_nm_id, probe = probe
+    found_basket, data = await probe
+    if found_basket:
+        status, data = await _request_card(session, host_semaphores, nm_id, found_basket, url_template)
+        return nm_id, data if status == 200 else None
+
+    # Первый артикул vol не нашёлся нигде (например, удалён) - перебираем для этого сами
+    found_basket, data = await _probe_baskets(session, host_semaphores, shard_map, nm_id, basket, url_template)
+    if data is None:
+        print(f"  [{nm_id}] Не найден ни в одной корзине (vol {vol})")
+    return nm_id, data
+
+
+async def fetch_cards_async(nm_ids, parse_func=None, url_template=BASKET_URL_TEMPLATE, shard_map=None):
+    """
+    Загружает card.json для всех артикулов одновременно
+    parse_func(data, nm_id) -> dict или None: обработка ответа (по умолчанию - сырой JSON)
+    shard_map: карта корзин (по умолчанию - data/basket_shards.json, сохраняется после загрузки)
+    Возвращает словарь {nmID (str): результат}
+    """
+    results = {}
+    nm_ids = [int(nm_id) for nm_id in nm_ids if str(nm_id).strip().isdigit()]
+    if not nm_ids:
+        return results
+
+    own_shard_map = shard_map is None
+    if own_shard_map:
+        shard_map = BasketShardMap.load()
+
+    # Общий лимит держит коннектор, лимит на каждый basket-XX - семафоры
+    host_semaphores = {}
+    probes = {}  # vol -> (nm_id, задача перебора корзин)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY_TOTAL)
+    # Таймаут на сокет, а не на весь запрос: ожидание свободного соединения в очереди не считается
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT)
+
+    async with aiohttp.ClientSession(headers=HEADERS, connector=connector, timeout=timeout) as session:
+        tasks = [
+            _fetch_card(session, host_semaphores, shard_map, probes, nm_id, url_template)
+            for nm_id in nm_ids
+        ]
+
+        done = 0
+        for task in asyncio.as_completed(tasks):
+            nm_id, data = await task
+            done += 1
+
+            if data is not None:
+                parsed = parse_func(data, nm_id) if parse_func else data
+                if parsed:
+                    results[str(nm_id)] = parsed
+
+            if done % PROGRESS_EVERY == 0:
+                print(f"  Загружено: {done}/{len(nm_ids)}")
+
+    if probes:
+        print(f"  [Basket] Перебор корзин выполнен для {len(probes)} vol")
+
+    if own_shard_map:
+        shard_map.save()
+
+    return results
+
+
+def fetch_cards(nm_ids, parse_func=None, url_template=BASKET_URL_TEMPLATE, shard_map=None):
+    """Синхронная обёртка над fetch_cards_async (для обычных скриптов)"""
+    start_time = time.time()
+    results = asyncio.run(fetch_cards_async(nm_ids, parse_func, url_template, shard_map))
+    elapsed = time.time() - start_time
+    print(f"  [Basket] Получено {len(results)}/{len(nm_ids)} карточек за {elapsed:.1f} сек")
+    return results
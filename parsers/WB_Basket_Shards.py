@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+КАРТА КОРЗИН basket-XX.wbbasket.ru ПО vol АРТИКУЛА
+WB раскладывает карточки по корзинам диапазонами vol (nmID // 100000),
+а не по остатку от деления. Формула (vol % 20) + 1 промахивается
+для большинства новых артикулов.
+
+Как определяется корзина:
+1. Выученная карта (data/basket_shards.json) - точное совпадение vol
+2. Выученная карта - соседние выученные vol слева и справа в одной корзине
+   (значит и всё между ними лежит там же)
+3. Стартовая таблица диапазонов BASKET_VOL_RANGES
+
+Если корзина не угадала (404), WB_Basket_Fetcher опрашивает остальные корзины
+параллельно и запоминает найденную. Карта сохраняется на диск, поэтому
+при следующих запусках тот же vol уже не перебирается.
+"""
+
+import os
+import json
+import bisect
+import threading
+
+# === КОНФИГУРАЦИЯ ===
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+SHARD_MAP_FILE = os.path.join(DATA_DIR, "basket_shards.json")
+
+MAX_BASKET_HOST = 40  # Сколько корзин перебирать при промахе (basket-01 ... basket-40)
+
+# Стартовая таблица: (последний vol диапазона, корзина)
+BASKET_VOL_RANGES = [
+    (143, "01"), (287, "02"), (431, "03"), (719, "04"), (1007, "05"),
+    (1061, "06"), (1115, "07"), (1169, "08"), (1313, "09"), (1601, "10"),
+    (1655, "11"), (1919, "12"), (2045, "13"), (2189, "14"), (2405, "15"),
+    (2621, "16"), (2837, "17"), (3053, "18"), (3269, "19"), (3485, "20"),
+    (3701, "21"), (3917, "22"), (4133, "23"), (4349, "24"), (4565, "25"),
+    (4877, "26"), (5189, "27"), (5501, "28"), (5813, "29"), (6125, "30"),
+    (6437, "31"), (6749, "32"), (7061, "33"), (7373, "34"), (7685, "35"),
+    (7997, "36"), (8309, "37"),
+]
+_RANGE_BOUNDS = [bound for bound, _ in BASKET_VOL_RANGES]
+
+
+def basket_from_table(vol):
+    """Корзина по стартовой таблице диапазонов (для vol за пределами - последняя известная)"""
+    idx = bisect.bisect_left(_RANGE_BOUNDS, vol)
+    if idx >= len(BASKET_VOL_RANGES):
+        return BASKET_VOL_RANGES[-1][1]
+    return BASKET_VOL_RANGES[idx][1]
+
+
+class BasketShardMap:
+    """Выученная карта vol -> корзина (потокобезопасная, сохраняется в JSON)"""
+
+    def __init__(self, path=SHARD_MAP_FILE):
+        self.path = path
+        self.learned = {}      # vol -> "NN"
+        self.sorted_vols = []  # отсортированные ключи learned (для поиска соседей)
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=SHARD_MAP_FILE):
+        shard_map = cls(path)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                shard_map.learned = {int(vol): basket for vol, basket in data.get("vols", {}).items()}
+                shard_map.sorted_vols = sorted(shard_map.learned)
+            except (OSError, ValueError) as e:
+                print(f"[!] Не удалось прочитать карту корзин '{path}': {e}")
+        return shard_map
+
+    def save(self):
+        """Сохраняет карту на диск (только если были новые данные)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"vols": {str(vol): self.learned[vol] for vol in self.sorted_vols}}
+            self.dirty = False
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def resolve(self, vol):
+        """Возвращает корзину для vol (выученную, выведенную из соседей или по таблице)"""
+        with self.lock:
+            if vol in self.learned:
+                return self.learned[vol]
+
+            idx = bisect.bisect_left(self.sorted_vols, vol)
+            if 0 < idx < len(self.sorted_vols):
+                left = self.learned[self.sorted_vols[idx - 1]]
+                right = self.learned[self.sorted_vols[idx]]
+                if left == right:
+                    return left
+
+        return basket_from_table(vol)
+
+    def learn(self, vol, basket):
+        """Запоминает корзину для vol (после успешного ответа CDN)"""
+        with self.lock:
+            if self.learned.get(vol) == basket:
+                return
+            if vol not in self.learned:
+                bisect.insort(self.sorted_vols, vol)
+            self.learned[vol] = basket
+            self.dirty = True
+
+    def probe_candidates(self, vol, exclude):
+        """Остальные корзины для перебора - ближайшие к ожидаемой первыми"""
+        expected = int(exclude)
+        hosts = [n for n in range(1, MAX_BASKET_HOST + 1) if n != expected]
+        hosts.sort(key=lambda n: abs(n - expected))
+        return [str(n).zfill(2) for n in hosts]
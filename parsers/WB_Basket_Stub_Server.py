@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+ЛОКАЛЬНАЯ ЗАГЛУШКА CDN basket-XX.wbbasket.ru (для проверки без интернета)
+Отдаёт card.json по тем же путям, что и настоящий CDN:
+    http://127.0.0.1:PORT/basket-XX/vol{vol}/part{part}/{nmID}/info/ru/card.json
+
+Номер корзины в пути сверяется с ожидаемым: запрос не в ту корзину получает 404,
+как и на настоящем CDN.
+
+ЗАПУСК ПРОВЕРКИ:
+    python parsers/WB_Basket_Stub_Server.py            # 10 000 карточек, задержка 20 мс
+    python parsers/WB_Basket_Stub_Server.py 50000 50   # 50 000 карточек, задержка 50 мс
+"""
+
+import os
+import sys
+import time
+import tempfile
+import random
+import asyncio
+from aiohttp import web
+
+import WB_Basket_Fetcher
+from WB_Basket_Fetcher import fetch_cards_async, get_basket_number, guess_basket_host
+from WB_Basket_Shards import BasketShardMap, MAX_BASKET_HOST
+
+STUB_URL_TEMPLATE = "http://127.0.0.1:{port}/basket-{{basket}}/vol{{vol}}/part{{part}}/{{nm_id}}/info/ru/card.json"
+
+
+def make_fake_card(nm_id):
+    """Карточка в формате Basket API со случайными ценами (в копейках)"""
+    price = random.randint(100, 5000) * 100
+    return {
+        "nm_id": nm_id,
+        "name": f"Тестовый товар {nm_id}",
+        "priceU": price,
+        "salePriceU": int(price * 0.7),
+        "sale": 30,
+        "extended": {"basicSale": 20, "clientSale": 10, "basicPriceU": price},
+        "sizes": [{"origName": "0", "stocks": [{"qty": random.randint(0, 50)}]}]
+    }
+
+
+def create_stub_app(cards, latency_ms=0, basket_for=guess_basket_host, stats=None):
+    """
+    cards: словарь {nmID (int): card.json}
+    latency_ms: искусственная задержка ответа (имитация сети)
+    basket_for(nm_id) -> номер корзины, в которой "лежит" карточка
+    stats: словарь, в котором считаются запросы (requests) и промахи мимо корзины (misses)
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("requests", 0)
+    stats.setdefault("misses", 0)
+
+    async def handle_card(request):
+        nm_id = int(request.match_info["nm_id"])
+        vol, part = get_basket_number(nm_id)
+        stats["requests"] += 1
+
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+        if (nm_id not in cards
+                or request.match_info["basket"] != basket_for(nm_id)
+                or int(request.match_info["vol"]) != vol
+                or int(request.match_info["part"]) != part):
+            stats["misses"] += 1
+            return web.Response(status=404)
+
+        return web.json_response(cards[nm_id])
+
+    app = web.Application()
+    app.router.add_get("/basket-{basket}/vol{vol}/part{part}/{nm_id}/info/ru/card.json", handle_card)
+    return app
+
+
+async def start_stub_server(cards, latency_ms=0, basket_for=guess_basket_host, stats=None):
+    """Запускает заглушку на свободном порту, возвращает (runner, url_template)"""
+    runner = web.AppRunner(create_stub_app(cards, latency_ms, basket_for, stats))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, STUB_URL_TEMPLATE.format(port=port)
+
+
+def shifted_layout(nm_id):
+    """Раскладка, где часть vol лежит не там, где говорит таблица (проверка перебора корзин)"""
+    vol, part = get_basket_number(nm_id)
+    basket = int(guess_basket_host(nm_id))
+    if vol % 7 == 0:
+        basket = basket % MAX_BASKET_HOST + 1
+    return str(basket).zfill(2)
+
+
+async def _timed_fetch(nm_ids, url_template, shard_map):
+    start_time = time.time()
+    results = await fetch_cards_async(nm_ids, url_template=url_template, shard_map=shard_map)
+    return results, time.time() - start_time
+
+
+async def _self_check(count, latency_ms):
+    nm_ids = random.sample(range(10_000_000, 600_000_000), count)
+    cards = {nm_id: make_fake_card(nm_id) for nm_id in nm_ids}
+    ok = True
+
+    # 1. Все карточки лежат там, где говорит таблица диапазонов
+    runner, url_template = await start_stub_server(cards, latency_ms)
+    try:
+        shard_map = BasketShardMap(os.path.join(tempfile.mkdtemp(), "shards.json"))
+        results, elapsed = await _timed_fetch(nm_ids, url_template, shard_map)
+    finally:
+        await runner.cleanup()
+
+    print(f"Карточек: {count} | задержка ответа: {latency_ms} мс")
+    print(f"Получено: {len(results)} за {elapsed:.2f} сек ({len(results) / elapsed:.0f} карточек/сек)")
+    serial_estimate = count * (latency_ms / 1000 + 0.1)
+    print(f"Последовательно с паузой 0.1 сек было бы: ~{serial_estimate / 60:.1f} мин")
+    ok = ok and len(results) == count
+
+    # 2. Часть vol лежит в других корзинах: первый запуск перебирает и запоминает,
+    #    второй (с картой, прочитанной с диска) попадает сразу - без единого промаха
+    print("\nРаскладка со смещёнными корзинами:")
+    stats = {}
+    runner, url_template = await start_stub_server(cards, latency_ms, basket_for=shifted_layout, stats=stats)
+    try:
+        shard_map_path = os.path.join(tempfile.mkdtemp(), "shards.json")
+        shard_map = BasketShardMap(shard_map_path)
+        results, elapsed = await _timed_fetch(nm_ids, url_template, shard_map)
+        shard_map.save()
+        print(f"  Запуск 1: получено {len(results)} за {elapsed:.2f} сек, выучено vol: {len(shard_map.learned)}, "
+              f"запросов {stats['requests']}, промахов {stats['misses']}")
+        ok = ok and len(results) == count
+
+        stats["requests"] = stats["misses"] = 0
+        results, elapsed = await _timed_fetch(nm_ids, url_template, BasketShardMap.load(shard_map_path))
+        print(f"  Запуск 2: получено {len(results)} за {elapsed:.2f} сек, "
+              f"запросов {stats['requests']}, промахов {stats['misses']}")
+        ok = ok and len(results) == count
+        if stats["misses"] or stats["requests"] != count:
+            print(f"  ✗ Запуск 2 перебирал корзины: ожидалось {count} запросов без промахов")
+            ok = False
+    finally:
+        await runner.cleanup()
+
+    return ok
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    latency_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print("\n" + "="*80)
+    print("ПРОВЕРКА АСИНХРОННОЙ ЗАГРУЗКИ НА ЛОКАЛЬНОЙ ЗАГЛУШКЕ CDN")
+    print("="*80)
+    print(f"Лимит на корзину: {WB_Basket_Fetcher.MAX_CONCURRENCY_PER_HOST}, "
+          f"всего: {WB_Basket_Fetcher.MAX_CONCURRENCY_TOTAL}")
+
+    ok = asyncio.run(_self_check(count, latency_ms))
+    print("✓ Все карточки получены, с выученной картой - без перебора корзин" if ok
+          else "✗ Проверка не пройдена (см. выше)")
+    print("="*80)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
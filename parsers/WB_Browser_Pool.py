@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+ПУЛ БРАУЗЕРОВ: N НЕЗАВИСИМЫХ ПРОЦЕССОВ ВМЕСТО ВКЛАДОК ОДНОГО ДРАЙВЕРА
+Во вкладках одного драйвера параллельна только загрузка страниц: разбор идёт
+по очереди через switch_to.window. Здесь каждый воркер - отдельный процесс
+со своим браузером (и своим профилем), поэтому и загрузка, и разбор страниц
+идут параллельно и масштабируются по ядрам.
+
+- задания (товары) лежат в общей очереди, свободный воркер берёт следующее
+- captcha: воркер возвращает товар в очередь (его возьмёт другой воркер) и сам
+  уходит на паузу CAPTCHA_BACKOFF_BASE * 2^(n-1) сек (не больше CAPTCHA_BACKOFF_MAX);
+  после успешной страницы пауза сбрасывается
+- ошибка разбора (parse_page вернул отрицательное число): товар возвращается
+  в очередь без паузы воркера
+- разорванная сессия: товар возвращается в очередь, браузер воркера перезапускается
+- упавший процесс: его товар отдаётся другим воркерам
+- время на товар (загрузка + разбор) меряется в воркере, в конце - медиана / p95
+
+parse_page(driver, article) возвращает цену, 0 (нет в наличии), None (captcha)
+или отрицательное число (ошибка разбора). Окончательный ответ - только цена или 0.
+
+driver_factory(worker_id) и parse_page(driver, article) должны быть функциями
+верхнего уровня модуля: на Windows процессы запускаются через spawn и получают
+их по имени (настройки модуля берутся из кода, а не из родительского процесса).
+"""
+
+import os
+import time
+import random
+import multiprocessing
+from multiprocessing.connection import wait
+
+# === КОНФИГУРАЦИЯ ===
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # Браузер сам занимает несколько процессов
+STARTUP_STAGGER = 2.0          # Пауза между запусками браузеров (сек) - драйвер патчится по очереди
+CAPTCHA_BACKOFF_BASE = 10      # Первая пауза воркера после captcha (сек)
+CAPTCHA_BACKOFF_MAX = 300      # Максимальная пауза (сек)
+MAX_ATTEMPTS = 3               # Попыток на товар (captcha / ошибки), потом цена 0
+PAGE_DELAY = (0.3, 0.7)        # Пауза воркера между страницами (мин, макс)
+
+
+def _captcha_backoff(strikes):
+    delay = min(CAPTCHA_BACKOFF_MAX, CAPTCHA_BACKOFF_BASE * 2 ** (strikes - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _start_driver(worker_id, driver_factory, conn):
+    try:
+        driver = driver_factory(worker_id)
+        if driver:
+            return driver
+        error = "браузер не запустился"
+    except Exception as e:
+        error = str(e)
+    conn.send(("dead", error))
+    return None
+
+
+def _browser_worker(worker_id, driver_factory, parse_page, task_queue, conn):
+    """
+    Процесс-воркер: свой браузер, задания из общей очереди
+    Итоги - в свой канал conn (send синхронный: если процесс упадёт,
+    главный процесс всё равно знает, какое задание он взял)
+    """
+    time.sleep(worker_id * STARTUP_STAGGER)
+    driver = _start_driver(worker_id, driver_factory, conn)
+    if not driver:
+        return
+    conn.send(("ready", None))
+
+    strikes = 0
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            index, product, attempts = task
+            conn.send(("take", task))
+            start = time.perf_counter()
+            try:
+                driver.get(product['url'])
+                price = parse_page(driver, product['article'])
+            except Exception as e:
+                # Чаще всего - разорванная сессия: отдаём товар другим и перезапускаем браузер
+                print(f"  [Воркер {worker_id}] {product['article']}: ✗ {e} - перезапуск браузера")
+                conn.send(("retry", task))
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                driver = _start_driver(worker_id, driver_factory, conn)
+                if not driver:
+                    return
+                continue
+
+            if price is None:
+                strikes += 1
+                delay = _captcha_backoff(strikes)
+                print(f"  [Воркер {worker_id}] Captcha #{strikes} подряд - пауза {delay:.0f} сек")
+                conn.send(("retry", task))
+                time.sleep(delay)
+                continue
+
+            if price < 0:
+                print(f"  [Воркер {worker_id}] {product['article']}: ✗ ошибка разбора - товар вернётся в очередь")
+                conn.send(("retry", task))
+                continue
+
+            strikes = 0
+            conn.send(("done", (index, product, price, time.perf_counter() - start)))
+            time.sleep(random.uniform(*PAGE_DELAY))
+    finally:
+        if driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        conn.close()
+
+
+def latency_summary(latencies):
+    """(медиана, p95, максимум) времени на товар в сек, None если замеров нет"""
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return ordered[len(ordered) // 2], p95, ordered[-1]
+
+
+def run_browser_pool(products, driver_factory, parse_page, workers=None,
+                     on_checkpoint=None, checkpoint_every=0, on_result=None):
+    """
+    Обрабатывает товары [{url, article}] пулом из workers браузеров
+    on_checkpoint(results) вызывается каждые checkpoint_every готовых товаров
+    on_result(result) - для каждого товара с окончательным ответом браузера (цена или 0)
+    (не для пропущенных после MAX_ATTEMPTS неудач - captcha / ошибок разбора)
+    Возвращает [{url, article, price}] в исходном порядке
+    (если все браузеры упали - необработанные товары с ценой 0)
+    """
+    total = len(products)
+    workers = max(1, min(workers or DEFAULT_WORKERS, total or 1))
+
+    task_queue = multiprocessing.Queue()
+    for index, product in enumerate(products):
+        task_queue.put((index, product, 0))
+
+    processes, connections = [], []
+    for worker_id in range(workers):
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_browser_worker,
+                                          args=(worker_id, driver_factory, parse_page, task_queue, writer),
+                                          daemon=True)
+        process.start()
+        writer.close()  # В главном процессе пишущий конец не нужен
+        processes.append(process)
+        connections.append(reader)
+
+    results = {}
+    latencies = []
+    in_flight = {}  # worker_id -> задание, которое он сейчас обрабатывает
+    alive = set(range(workers))
+    start_time = time.time()
+
+    def finish(index, product, price):
+        results[index] = {'url': product['url'], 'article': product['article'], 'price': price}
+        done = len(results)
+        status = f"{price} ₽" if price > 0 else "недоступен"
+        print(f"  [{done}/{total}] {product['article']}: {status}")
+        if on_checkpoint and checkpoint_every and done % checkpoint_every == 0:
+            on_checkpoint([results[i] for i in sorted(results)])
+
+    def handle(worker_id, kind, payload):
+        if kind == "ready":
+            print(f"    ✓ Воркер {worker_id}: браузер запущен")
+        elif kind == "take":
+            in_flight[worker_id] = payload
+        elif kind == "done":
+            in_flight.pop(worker_id, None)
+            index, product, price, elapsed = payload
+            latencies.append(elapsed)
+            if index not in results:
+                finish(index, product, price)
+                if on_result:
+                    on_result(results[index])
+        elif kind == "retry":
+            in_flight.pop(worker_id, None)
+            index, product, attempts = payload
+            if attempts + 1 >= MAX_ATTEMPTS:
+                print(f"  [{product['article']}] ✗ {MAX_ATTEMPTS} неудачных попыток - пропускаю")
+                finish(index, product, 0)
+            else:
+                task_queue.put((index, product, attempts + 1))
+        elif kind == "dead":
+            print(f"    [!] Воркер {worker_id}: {payload}")
+
+    def retire(worker_id):
+        """Воркер остановился: дочитываем его канал, его задание возвращается в очередь"""
+        alive.discard(worker_id)
+        connection = connections[worker_id]
+        try:
+            while connection.poll():
+                handle(worker_id, *connection.recv())
+        except (EOFError, OSError):
+            pass
+        task = in_flight.pop(worker_id, None)
+        if task and task[0] not in results:
+            task_queue.put(task)
+
+    try:
+        while len(results) < total and alive:
+            # Ждём сообщения от воркеров или завершения любого из процессов
+            waitables = {}
+            for worker_id in alive:
+                waitables[connections[worker_id]] = worker_id
+                waitables[processes[worker_id].sentinel] = worker_id
+            for ready in wait(list(waitables)):
+                worker_id = waitables[ready]
+                if worker_id not in alive:
+                    continue
+                if ready is connections[worker_id]:
+                    try:
+                        handle(worker_id, *ready.recv())
+                        continue
+                    except (EOFError, OSError):
+                        pass  # Канал закрыт - процесс завершается
+                processes[worker_id].join(timeout=5)
+                if processes[worker_id].exitcode not in (0, None):
+                    print(f"    [!] Воркер {worker_id} завершился (код {processes[worker_id].exitcode})")
+                retire(worker_id)
+    finally:
+        for _ in processes:
+            task_queue.put(None)
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        for connection in connections:
+            connection.close()
+
+    if len(results) < total:
+        print(f"    [!] Все браузеры остановились, не обработано: {total - len(results)}")
+        for index, product in enumerate(products):
+            if index not in results:
+                results[index] = {'url': product['url'], 'article': product['article'], 'price': 0}
+
+    elapsed = time.time() - start_time
+    print(f"\n    [Пул] {total} товаров за {elapsed:.1f} сек ({workers} браузеров, "
+          f"{total / elapsed if elapsed else 0:.2f} товаров/сек)")
+    summary = latency_summary(latencies)
+    if summary:
+        print(f"    [Пул] Время на товар: медиана {summary[0]:.2f} сек, p95 {summary[1]:.2f} сек, "
+              f"макс {summary[2]:.2f} сек")
+    return [results[i] for i in range(total)]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+ПАКЕТНАЯ ЗАГРУЗКА ИЗ API С ПАГИНАЦИЕЙ (Prices API, Stocks API)
+- список nmID режется на куски по CHUNK_SIZE (лимит фильтра API)
+- каждый кусок запрашивается постранично (limit/offset), пока страницы не кончатся
+- куски одного кабинета идут параллельно в BULK_MAX_WORKERS потоков,
+  скорость держит ограничитель WB_Rate_Limiter внутри http_post
+
+Раньше Stocks API получал только первые 1000 nmID, а Prices API - одну
+страницу на батч: длинные списки артикулов молча обрезались.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from WB_Http_Client import http_post
+
+# === КОНФИГУРАЦИЯ ===
+CHUNK_SIZE = 1000          # nmID в одном фильтре (лимит Prices/Stocks API)
+PAGE_LIMIT = 1000          # Записей на страницу
+MAX_PAGES = 500            # Защита от бесконечного цикла, если API игнорирует offset
+BULK_MAX_WORKERS = 4       # Параллельных кусков на один кабинет
+
+
+def fetch_offset_pages(url, api_key, payload, extract_items, limit=PAGE_LIMIT, max_items=None, timeout=30):
+    """
+    Постранично запрашивает url: payload + limit/offset
+    extract_items(data) -> список записей страницы
+    max_items: больше записей быть не может (например, размер фильтра nmID) - лишнюю страницу не запрашиваем
+    Возвращает (все записи, последний ответ) - по ответу вызывающий код разбирает ошибки
+    """
+    items = []
+    response = None
+
+    for page in range(MAX_PAGES):
+        page_payload = dict(payload, limit=limit, offset=page * limit)
+        response = http_post(url, api_key=api_key, json=page_payload, timeout=timeout)
+
+        if response.status_code != 200:
+            return items, response
+
+        page_items = extract_items(response.json())
+        items.extend(page_items)
+
+        # Неполная страница - последняя
+        if len(page_items) < limit or (max_items is not None and len(items) >= max_items):
+            break
+
+    return items, response
+
+
+def fetch_chunks_parallel(nm_ids, fetch_chunk, chunk_size=CHUNK_SIZE, max_workers=BULK_MAX_WORKERS):
+    """
+    Режет nm_ids на куски и вызывает fetch_chunk(кусок, номер_куска) параллельно
+    fetch_chunk возвращает словарь, результаты объединяются в порядке кусков
+    """
+    chunks = [nm_ids[i:i + chunk_size] for i in range(0, len(nm_ids), chunk_size)]
+    merged = {}
+    if not chunks:
+        return merged
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        futures = [executor.submit(fetch_chunk, chunk, chunk_no) for chunk_no, chunk in enumerate(chunks, 1)]
+        for chunk_no, future in enumerate(futures, 1):
+            try:
+                merged.update(future.result())
+            except Exception as e:
+                print(f"[!] Ошибка в куске {chunk_no}/{len(chunks)}: {e}")
+
+    return merged
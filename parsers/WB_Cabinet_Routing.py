@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+ЗАПРОСЫ КО ВСЕМ КАБИНЕТАМ: ПАРАЛЛЕЛЬНО И ПО ВЛАДЕЛЬЦАМ nmID
+Общее для парсеров, которые ходят в API продавца по нескольким ключам
+(Parser_WB_API_FAST, Parser_UNIFIED):
+- run_for_all_cabinets - fetch_func для всех кабинетов одновременно
+- run_routed_for_all_cabinets - каждый nmID только кабинету-владельцу
+  (индекс WB_Ownership_Index), неизвестные - всем кабинетам
+
+Модуль лёгкий (без Excel / Parquet / истории цен), чтобы браузерный
+парсер не тянул цепочку импортов быстрого парсера.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from WB_Ownership_Index import get_ownership_index
+
+# === КОНФИГУРАЦИЯ ===
+# Сколько кабинетов опрашивать одновременно (у каждого свой ключ и свой лимит API)
+MAX_CABINET_WORKERS = 6
+
+# Отправлять nmID в Prices/Stocks API только кабинету-владельцу (см. WB_Ownership_Index)
+USE_OWNERSHIP_INDEX = True
+
+# nmID, который не вернул ни владелец, ни остальные кабинеты, столько дней
+# не рассылается остальным повторно (только владельцу) - иначе товар, которого
+# нет в Prices API, каждый день стоил бы запросов ко всем кабинетам
+MISSED_RETRY_DAYS = 7
+
+
+def run_for_all_cabinets(api_keys_list, cabinet_names, fetch_func):
+    """
+    Запускает fetch_func(api_key, cabinet_name, idx) для всех кабинетов ОДНОВРЕМЕННО
+    
+    У каждого кабинета свой API ключ и свой лимит запросов, поэтому паузы
+    внутри одного кабинета не задерживают остальные. Время выполнения
+    близко к времени самого медленного кабинета, а не к сумме всех.
+    
+    Результаты объединяются в порядке кабинетов (как при последовательном обходе)
+    """
+    jobs = []
+    for idx, api_key in enumerate(api_keys_list, 1):
+        cabinet_name = cabinet_names[idx-1] if cabinet_names and idx-1 < len(cabinet_names) else f"Кабинет {idx}"
+        jobs.append((idx, api_key, cabinet_name))
+    
+    merged = {}
+    if not jobs:
+        return merged
+    
+    with ThreadPoolExecutor(max_workers=min(MAX_CABINET_WORKERS, len(jobs))) as executor:
+        futures = [executor.submit(fetch_func, api_key, cabinet_name, idx) for idx, api_key, cabinet_name in jobs]
+        
+        for (idx, api_key, cabinet_name), future in zip(jobs, futures):
+            try:
+                merged.update(future.result())
+            except Exception as e:
+                print(f"[!] Ошибка в потоке кабинета {cabinet_name}: {e}")
+    
+    return merged
+
+
+def run_routed_for_all_cabinets(nm_ids, api_keys_list, cabinet_names, fetch_func, retry_missed=False):
+    """
+    Как run_for_all_cabinets, но каждый nmID отправляется только кабинету-владельцу
+    (индекс WB_Ownership_Index). Артикулы без известного владельца - всем кабинетам.
+    fetch_func(nm_ids_кабинета, api_key, cabinet_name, idx) -> {nmID: ...}
+    
+    Владельцы пополняются из ответов. Названия кабинетов пишутся в индекс, только если
+    переданы cabinet_names - иначе там остаются настоящие (COSMO, MMA...), а не "Кабинет N".
+    
+    retry_missed=True - артикулы, которые владелец не вернул (переехали в другой кабинет),
+    повторно отправляются остальным кабинетам; владелец меняется, только если артикул
+    вернул другой кабинет (иначе остаётся прежним: чаще всего у товара просто нет цены,
+    а не сменился кабинет). Не вернул никто - артикул MISSED_RETRY_DAYS дней повторно
+    не рассылается
+    """
+    index = get_ownership_index()
+    if USE_OWNERSHIP_INDEX:
+        routed, unknown = index.route(nm_ids, api_keys_list)
+    else:
+        routed, unknown = {}, list(nm_ids)
+    
+    sent = len(unknown) * len(api_keys_list) + sum(len(ids) for ids in routed.values())
+    print(f"    [Владельцы] Известно: {len(nm_ids) - len(unknown)}, неизвестно: {len(unknown)} "
+          f"(артикулов в запросах: {sent} вместо {len(nm_ids) * len(api_keys_list)})")
+    
+    def owner_label(cabinet_name):
+        return cabinet_name if cabinet_names else None
+    
+    def fetch_routed(api_key, cabinet_name, idx):
+        cabinet_nm_ids = routed.get(api_key, []) + unknown
+        if not cabinet_nm_ids:
+            return {}
+        result = fetch_func(cabinet_nm_ids, api_key, cabinet_name, idx)
+        index.assign(result.keys(), api_key, owner_label(cabinet_name))
+        return result
+    
+    results = run_for_all_cabinets(api_keys_list, cabinet_names, fetch_routed)
+    
+    if retry_missed and len(api_keys_list) > 1:
+        missed = {api_key: [nm_id for nm_id in ids if str(nm_id) not in results]
+                  for api_key, ids in routed.items()}
+        skipped = index.recently_missing([nm_id for ids in missed.values() for nm_id in ids], MISSED_RETRY_DAYS)
+        if skipped:
+            print(f"    [Владельцы] {len(skipped)} артикулов не нашлись ни в одном кабинете за последние "
+                  f"{MISSED_RETRY_DAYS} дн. - остальным кабинетам не рассылаются")
+            missed = {api_key: [nm_id for nm_id in ids if str(nm_id) not in skipped]
+                      for api_key, ids in missed.items()}
+        missed_count = sum(len(ids) for ids in missed.values())
+        if missed_count:
+            print(f"    [Владельцы] {missed_count} артикулов не найдены у владельца - запрашиваем у остальных кабинетов")
+            
+            def fetch_missed(api_key, cabinet_name, idx):
+                others_nm_ids = [nm_id for owner_key, ids in missed.items() if owner_key != api_key for nm_id in ids]
+                if not others_nm_ids:
+                    return {}
+                result = fetch_func(others_nm_ids, api_key, cabinet_name, idx)
+                index.assign(result.keys(), api_key, owner_label(cabinet_name))
+                return result
+            
+            results.update(run_for_all_cabinets(api_keys_list, cabinet_names, fetch_missed))
+            index.mark_missing(nm_id for ids in missed.values() for nm_id in ids if str(nm_id) not in results)
+    
+    index.save()
+    return results
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+ЛОКАЛЬНЫЙ КЕШ МЕТАДАННЫХ КАРТОЧЕК (название, vendorCode, кабинет)
+Эти данные почти не меняются, поэтому фаза Content API быстрого парсера
+берёт их из кеша, а у API запрашивает только отсутствующие и устаревшие.
+
+Хранилище - SQLite (data/card_cache.sqlite):
+- TTL: запись старше CARD_CACHE_TTL_DAYS считается устаревшей
+- LRU: при превышении CARD_CACHE_MAX_ENTRIES удаляются давно не запрошенные записи
+- явная инвалидация: всё, отдельные nmID или весь кабинет
+
+ОБСЛУЖИВАНИЕ:
+    python parsers/WB_Card_Cache.py                  # статистика
+    python parsers/WB_Card_Cache.py clear            # очистить весь кеш
+    python parsers/WB_Card_Cache.py clear 123 456    # удалить отдельные nmID
+    python parsers/WB_Card_Cache.py clear-cabinet MMA
+"""
+
+import os
+import sys
+import time
+import sqlite3
+
+# === КОНФИГУРАЦИЯ ===
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+CARD_CACHE_FILE = os.path.join(DATA_DIR, "card_cache.sqlite")
+
+CARD_CACHE_TTL_DAYS = 7            # Через сколько дней запись считается устаревшей
+CARD_CACHE_MAX_ENTRIES = 200_000   # Больше - вытесняются давно не запрошенные записи
+SQL_BATCH = 500                    # Параметров в одном запросе IN (...) (лимит SQLite - 999)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class CardCache:
+    """Кеш {nmID: {title, nmID, vendorCode, cabinet}} с TTL и вытеснением LRU"""
+
+    def __init__(self, path=CARD_CACHE_FILE, ttl_days=CARD_CACHE_TTL_DAYS, max_entries=CARD_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.max_entries = max_entries
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cards (
+                nm_id TEXT PRIMARY KEY,
+                title TEXT,
+                vendor_code TEXT,
+                cabinet TEXT,
+                fetched_at REAL,
+                accessed_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_vendor_code ON cards (vendor_code)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_accessed_at ON cards (accessed_at)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get_many(self, articles):
+        """
+        Ищет артикулы (nmID или vendorCode) среди СВЕЖИХ записей
+        Возвращает (найдено {nmID: info}, set ненайденных артикулов)
+        """
+        articles = {str(art).strip() for art in articles}
+        fresh_after = time.time() - self.ttl_seconds
+        found = {}
+        matched = set()
+
+        keys = list(articles)
+        for column in ("nm_id", "vendor_code"):
+            for chunk in _chunks(keys, SQL_BATCH):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT nm_id, title, vendor_code, cabinet FROM cards "
+                    f"WHERE {column} IN ({placeholders}) AND fetched_at >= ?",
+                    chunk + [fresh_after]
+                ).fetchall()
+                for nm_id, title, vendor_code, cabinet in rows:
+                    found[nm_id] = {"title": title, "nmID": nm_id, "vendorCode": vendor_code, "cabinet": cabinet}
+                    matched.add(nm_id if column == "nm_id" else vendor_code)
+            keys = [art for art in keys if art not in matched]
+
+        # Отмечаем обращение (для вытеснения LRU)
+        now = time.time()
+        for chunk in _chunks(list(found), SQL_BATCH):
+            placeholders = ",".join("?" * len(chunk))
+            self.conn.execute(f"UPDATE cards SET accessed_at = ? WHERE nm_id IN ({placeholders})", [now] + chunk)
+        self.conn.commit()
+
+        return found, articles - matched
+
+    def put_many(self, infos):
+        """Сохраняет записи {title, nmID, vendorCode, cabinet} и вытесняет лишние"""
+        now = time.time()
+        rows = [
+            (str(info["nmID"]), info.get("title", ""), str(info.get("vendorCode", "")), info.get("cabinet", ""), now, now)
+            for info in infos if info.get("nmID")
+        ]
+        if rows:
+            self.conn.executemany("INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Удаляет давно не запрошенные записи сверх CARD_CACHE_MAX_ENTRIES"""
+        count = self.conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM cards WHERE nm_id IN (SELECT nm_id FROM cards ORDER BY accessed_at LIMIT ?)",
+            (excess,)
+        )
+        self.conn.commit()
+        return excess
+
+    def invalidate(self, nm_ids=None, cabinet=None):
+        """
+        Явная инвалидация: без аргументов - весь кеш,
+        nm_ids - отдельные артикулы, cabinet - все карточки кабинета
+        Возвращает число удалённых записей
+        """
+        if nm_ids is None and cabinet is None:
+            deleted = self.conn.execute("DELETE FROM cards").rowcount
+        elif cabinet is not None:
+            deleted = self.conn.execute("DELETE FROM cards WHERE cabinet = ?", (cabinet,)).rowcount
+        else:
+            deleted = 0
+            for chunk in _chunks([str(nm_id) for nm_id in nm_ids], SQL_BATCH):
+                placeholders = ",".join("?" * len(chunk))
+                deleted += self.conn.execute(f"DELETE FROM cards WHERE nm_id IN ({placeholders})", chunk).rowcount
+        self.conn.commit()
+        return deleted
+
+    def stats(self):
+        """(всего записей, из них свежих)"""
+        total = self.conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        fresh = self.conn.execute(
+            "SELECT COUNT(*) FROM cards WHERE fetched_at >= ?", (time.time() - self.ttl_seconds,)
+        ).fetchone()[0]
+        return total, fresh
+
+
+def main():
+    cache = CardCache()
+    try:
+        command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+        if command == "clear":
+            deleted = cache.invalidate(sys.argv[2:] or None)
+            print(f"✓ Удалено записей: {deleted}")
+        elif command == "clear-cabinet" and len(sys.argv) > 2:
+            deleted = cache.invalidate(cabinet=sys.argv[2])
+            print(f"✓ Удалено записей кабинета {sys.argv[2]}: {deleted}")
+        else:
+            total, fresh = cache.stats()
+            print(f"Кеш карточек: {cache.path}")
+            print(f"  Записей: {total}, свежих (моложе {CARD_CACHE_TTL_DAYS} дн.): {fresh}")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
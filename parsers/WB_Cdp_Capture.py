@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+ЦЕНЫ ИЗ JSON СТРАНИЦЫ: ПЕРЕХВАТ card.wb.ru/cards/.../detail ЧЕРЕЗ СОБЫТИЯ CDP
+Страница товара сама запрашивает card.wb.ru/cards/v4/detail?...&spp=..&nm=ID -
+с dest и СПП текущего (авторизованного) покупателя. Ответ ловится событиями
+Network.* Chrome DevTools Protocol (performance-лог chromedriver), тело берётся
+командой Network.getResponseBody - без клика на кошелёк и перебора селекторов:
+цена готова, как только страница получила JSON.
+
+- браузер запускается с enable_network_capture(options) - включает performance-лог
+  только с сетевыми событиями
+- CardCapture.for_driver(driver).wait_for(nm_id, timeout) - цены товара или None
+  (JSON не пришёл за timeout, лог недоступен) - тогда цена берётся со страницы, как раньше
+- тело ответа читается только для товара текущей вкладки (getResponseBody работает
+  в активной вкладке), события остальных вкладок ждут своей очереди
+
+В JSON цены в копейках (sizes[].price: basic - до скидок, product - со скидкой
+продавца и СПП). Скидка WB кошелька в JSON не входит - её показывает только страница.
+"""
+
+import re
+import json
+import time
+import base64
+
+CARD_URL_RE = re.compile(r"/cards/(?:v\d+/)?detail\b")
+NM_PARAM_RE = re.compile(r"[?&]nm=([\d;]+)")
+NM_IN_PRODUCT_URL_RE = re.compile(r"/catalog/(\d+)/")
+
+POLL_INTERVAL = 0.1  # Как часто читать performance-лог (сек)
+
+
+def enable_network_capture(options, browser="chrome"):
+    """Включает в настройках браузера performance-лог с сетевыми событиями (до запуска драйвера)"""
+    prefix = "ms" if browser == "edge" else "goog"
+    options.set_capability(f"{prefix}:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return options
+
+
+def nm_id_from_url(url):
+    """nmID из ссылки вида .../catalog/12345/detail.aspx (None, если не нашёлся)"""
+    match = NM_IN_PRODUCT_URL_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+def _kopecks(value):
+    return round(value / 100, 2) if value else None
+
+
+def parse_card_detail(data):
+    """
+    Разбирает ответ cards/.../detail (v4: products, v1/v2: data.products)
+    Возвращает {nm_id: {price, basic_price, sold_out}}; цены в рублях
+    """
+    products = data.get("products") or (data.get("data") or {}).get("products") or []
+    result = {}
+    for product in products:
+        nm_id = str(product.get("id", ""))
+        if not nm_id:
+            continue
+
+        price = basic = None
+        quantity = product.get("totalQuantity")
+        stocks_known = quantity is not None
+        for size in product.get("sizes") or []:
+            size_price = size.get("price") or {}
+            if price is None and size_price.get("product"):
+                price, basic = size_price.get("product"), size_price.get("basic")
+            if not stocks_known and "stocks" in size:
+                quantity = (quantity or 0) + sum(stock.get("qty", 0) for stock in size["stocks"])
+        if price is None and product.get("salePriceU"):
+            # Старый формат: цены на уровне товара
+            price, basic = product.get("salePriceU"), product.get("priceU")
+
+        result[nm_id] = {
+            "price": _kopecks(price),
+            "basic_price": _kopecks(basic),
+            "sold_out": quantity == 0 or price is None,
+        }
+    return result
+
+
+class CardCapture:
+    """Перехваченные ответы cards/.../detail одного драйвера"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.enabled = True
+        self.requests = {}  # requestId -> [nmID] (ответ получен, тело ещё грузится)
+        self.ready = {}     # nmID -> requestId (тело можно читать)
+        self.cards = {}     # nmID -> цены из уже прочитанного тела (в ответе бывает несколько nm)
+        self.card_url = None  # Последний URL запроса карточки (dest, spp покупателя - см. WB_Session)
+        self.captured = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def for_driver(cls, driver):
+        """Один перехватчик на драйвер (события из лога читаются один раз)"""
+        capture = getattr(driver, "_wb_card_capture", None)
+        if capture is None:
+            capture = cls(driver)
+            driver._wb_card_capture = capture
+        return capture
+
+    def poll(self):
+        """Забирает накопившиеся события из performance-лога"""
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception as e:
+            # Браузер запущен без performance-лога (или драйвер его не поддерживает)
+            print(f"    [!] Перехват JSON недоступен, цены со страницы: {e}")
+            self.enabled = False
+            return
+
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params") or {}
+            request_id = params.get("requestId")
+            if method == "Network.responseReceived":
+                url = (params.get("response") or {}).get("url", "")
+                if CARD_URL_RE.search(url):
+                    self.card_url = url
+                    match = NM_PARAM_RE.search(url)
+                    if match:
+                        self.requests[request_id] = [nm for nm in match.group(1).split(";") if nm]
+            elif method == "Network.loadingFinished" and request_id in self.requests:
+                for nm_id in self.requests.pop(request_id):
+                    self.ready[nm_id] = request_id
+            elif method == "Network.loadingFailed":
+                self.requests.pop(request_id, None)
+
+    def _read(self, nm_id):
+        """Тело ответа для nmID (вкладка товара должна быть активной)"""
+        request_id = self.ready.pop(nm_id)
+        try:
+            response = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            body = response.get("body", "")
+            if response.get("base64Encoded"):
+                body = base64.b64decode(body).decode("utf-8")
+            cards = parse_card_detail(json.loads(body))
+        except Exception:
+            # Вкладка закрыта / страница ушла дальше - тело уже недоступно
+            return None
+        for other_id in cards:
+            if self.ready.get(other_id) == request_id:
+                del self.ready[other_id]
+                self.cards[other_id] = cards[other_id]
+        return cards.get(nm_id)
+
+    def wait_for(self, nm_id, timeout):
+        """
+        Ждёт JSON карточки nm_id не дольше timeout сек
+        Возвращает {price, basic_price, sold_out} или None (тогда цена - со страницы)
+        """
+        nm_id = str(nm_id)
+        deadline = time.monotonic() + timeout
+        while self.enabled:
+            if nm_id in self.cards:
+                self.captured += 1
+                return self.cards.pop(nm_id)
+            self.poll()
+            if nm_id in self.ready:
+                card = self._read(nm_id)
+                if card:
+                    self.captured += 1
+                    return card
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+        self.fallbacks += 1
+        return None
+
+    def report(self):
+        total = self.captured + self.fallbacks
+        if total:
+            print(f"    [JSON] Цены из перехваченного JSON: {self.captured} из {total}, "
+                  f"со страницы: {self.fallbacks}")
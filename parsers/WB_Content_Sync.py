@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+ИНКРЕМЕНТАЛЬНАЯ СИНХРОНИЗАЦИЯ КАРТОЧЕК CONTENT API
+Вместо полного обхода cards/list с пустого курсора на каждом запуске:
+- карточки кабинета хранятся локально (data/content_sync/<КАБИНЕТ>.json)
+- вместе с ними сохраняется курсор последней страницы (updatedAt + nmID)
+- следующий запуск запрашивает карточки по возрастанию updatedAt начиная с курсора,
+  т.е. ТОЛЬКО изменённые с прошлого раза
+
+Ежедневный запуск по большому каталогу - несколько запросов вместо тысяч.
+Курсор сохраняется каждые CHECKPOINT_EVERY_PAGES страниц, поэтому прерванная
+синхронизация продолжается почти с места остановки.
+
+Удалённые карточки, карточки в корзине и переехавшие в другой кабинет по курсору
+не видны - поэтому раз в FULL_RESYNC_DAYS дней (или с --full-resync в wbparser.py)
+каталог проходится целиком и хранилище ЗАМЕНЯЕТСЯ результатом полного обхода.
+Если полный обход оборвался ошибкой API, старое хранилище остаётся (дополняется
+найденным), полный обход повторится при следующем запуске.
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+from WB_Http_Client import http_post
+from WB_Ownership_Index import get_ownership_index
+
+# === КОНФИГУРАЦИЯ ===
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+CONTENT_SYNC_DIR = os.path.join(DATA_DIR, "content_sync")
+
+WB_CONTENT_API_URL = "https://content-api.wildberries.ru/content/v2/get/cards/list"
+CONTENT_PAGE_LIMIT = 100  # Максимум карточек на страницу Content API
+CHECKPOINT_EVERY_PAGES = 20  # Как часто сохранять курсор во время длинной синхронизации
+FULL_RESYNC_DAYS = 7  # Полный обход (с удалением пропавших карточек) не реже раза в N дней
+FORCE_FULL_RESYNC = False  # True - полный обход на этом запуске (wbparser.py --full-resync)
+
+
+def iter_content_pages(api_key, cabinet_name, cursor=None, ascending=None, status=None):
+    """
+    Постранично обходит cards/list одного кабинета
+    cursor: {"updatedAt": ..., "nmID": ...} - начать после этой карточки
+    ascending: True - по возрастанию updatedAt (для инкрементальной синхронизации),
+               None - сортировка API по умолчанию
+    status: словарь, в который при ошибке API пишется status["error"] (код ответа)
+    Выдаёт (номер_страницы, карточки, курсор_страницы)
+    При ошибке API печатает её и завершает обход
+    """
+    cursor_updatedAt = (cursor or {}).get("updatedAt", "")
+    cursor_nmID = (cursor or {}).get("nmID", 0)
+    page = 0
+
+    while True:
+        page += 1
+
+        payload = {
+            "settings": {
+                "cursor": {
+                    "limit": CONTENT_PAGE_LIMIT
+                },
+                "filter": {
+                    "withPhoto": -1
+                }
+            }
+        }
+
+        if ascending is not None:
+            payload["settings"]["sort"] = {"ascending": ascending}
+
+        # Добавляем курсор для пагинации (если не первая страница)
+        if cursor_updatedAt and cursor_nmID:
+            payload["settings"]["cursor"]["updatedAt"] = cursor_updatedAt
+            payload["settings"]["cursor"]["nmID"] = cursor_nmID
+
+        response = http_post(WB_CONTENT_API_URL, api_key=api_key, json=payload, timeout=30)
+
+        if response.status_code != 200 and status is not None:
+            status["error"] = response.status_code
+        if response.status_code == 401:
+            print(f"    [!] Ошибка 401 ({cabinet_name}): Неверный API ключ")
+            return
+        if response.status_code != 200:
+            print(f"    [!] Ошибка Content API ({cabinet_name}): {response.status_code}")
+            print(f"    {response.text[:200]}")
+            return
+
+        data = response.json()
+
+        cards = data.get("cards", [])
+        if not cards and "data" in data:
+            cards = data.get("data", {}).get("cards", [])
+
+        if not cards:
+            # Нет больше карточек
+            return
+
+        cursor_data = data.get("cursor", {})
+        yield page, cards, cursor_data
+
+        # Курсор для следующей страницы
+        cursor_updatedAt = cursor_data.get("updatedAt", "")
+        cursor_nmID = cursor_data.get("nmID", 0)
+
+        # Если курсор пустой или страница неполная - больше страниц нет
+        if not cursor_updatedAt or not cursor_nmID or len(cards) < CONTENT_PAGE_LIMIT:
+            return
+
+
+def card_summary(card, cabinet_name):
+    """Краткие данные карточки, которые нужны парсерам"""
+    nm_id = str(card.get("nmID", ""))
+    return {
+        "nmID": nm_id,
+        "title": card.get("title") or card.get("object") or f"Товар {nm_id}",
+        "vendorCode": str(card.get("vendorCode", "")),
+        "cabinet": cabinet_name,
+        "updatedAt": card.get("updatedAt", "")
+    }
+
+
+def _state_path(cabinet_name):
+    return os.path.join(CONTENT_SYNC_DIR, f"{cabinet_name}.json")
+
+
+def load_sync_state(cabinet_name):
+    """Читает сохранённые карточки и курсор кабинета (пустое состояние, если файла нет)"""
+    path = _state_path(cabinet_name)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"    [!] Не удалось прочитать '{path}': {e} - будет полная синхронизация")
+    return {"cursor": {}, "cards": {}, "synced_at": "", "full_synced_at": ""}
+
+
+def full_resync_due(state):
+    """Пора ли пройти каталог целиком (полного обхода не было или он старше FULL_RESYNC_DAYS)"""
+    if FORCE_FULL_RESYNC or not state.get("full_synced_at"):
+        return True
+    try:
+        last_full = datetime.strptime(state["full_synced_at"], "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return True
+    return datetime.now() - last_full > timedelta(days=FULL_RESYNC_DAYS)
+
+
+def save_sync_state(cabinet_name, state):
+    """Атомарно сохраняет состояние кабинета"""
+    os.makedirs(CONTENT_SYNC_DIR, exist_ok=True)
+    path = _state_path(cabinet_name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def sync_cabinet_cards(api_key, cabinet_name, full=None, on_cards=None, stop=None):
+    """
+    Синхронизирует карточки кабинета с локальным хранилищем
+    full=True - игнорировать сохранённый курсор, пройти весь каталог заново и заменить хранилище
+    full=None - полный обход, если он положен по FULL_RESYNC_DAYS / FORCE_FULL_RESYNC
+    on_cards(summaries) - вызывается с карточками хранилища (кроме полного обхода) и с каждой страницей
+    stop() -> True - дальше страницы не запрашивать (курсор сохраняется на последней полученной,
+                     следующий запуск продолжит с неё); полный обход не останавливается
+    Возвращает словарь {nmID: {nmID, title, vendorCode, cabinet, updatedAt}} - ВСЕ карточки кабинета
+    """
+    previous = load_sync_state(cabinet_name)
+    if full is None:
+        full = full_resync_due(previous)
+    state = {"cursor": {}, "cards": {}, "synced_at": "", "full_synced_at": previous.get("full_synced_at", "")} \
+        if full else previous
+    cursor = state.get("cursor") or None
+    cards_store = state.setdefault("cards", {})
+
+    mode = "полная" if not cursor else f"с {cursor.get('updatedAt', '')}"
+    print(f"    [{cabinet_name}] Синхронизация карточек ({mode}), в хранилище: "
+          f"{len(previous.get('cards', {}))}")
+
+    if on_cards and not full:
+        on_cards(list(cards_store.values()))
+    stop = stop if not full else None
+
+    changed = 0
+    pages = 0
+    status = {}
+    pages_iter = iter_content_pages(api_key, cabinet_name, cursor, ascending=True, status=status)
+    if stop and stop():
+        print(f"    [{cabinet_name}] Все артикулы уже найдены - запросы к API пропущены")
+        pages_iter = ()
+    for page, cards, cursor_data in pages_iter:
+        pages = page
+        summaries = []
+        for card in cards:
+            summary = card_summary(card, cabinet_name)
+            if summary["nmID"]:
+                cards_store[summary["nmID"]] = summary
+                summaries.append(summary)
+                changed += 1
+        if on_cards:
+            on_cards(summaries)
+
+        if cursor_data.get("updatedAt") and cursor_data.get("nmID"):
+            state["cursor"] = {"updatedAt": cursor_data["updatedAt"], "nmID": cursor_data["nmID"]}
+        state["synced_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        # Полный обход до конца не сохраняется: недообойдённый каталог не должен заменить хранилище
+        if not full and page % CHECKPOINT_EVERY_PAGES == 0:
+            save_sync_state(cabinet_name, state)
+
+        if stop and stop():
+            print(f"    [{cabinet_name}] Все артикулы найдены - дальше страницы не запрашиваются")
+            break
+
+    ownership = get_ownership_index()
+    removed = []
+    if full and status.get("error"):
+        # Полный обход оборвался - старое хранилище остаётся, найденное в него добавляется
+        print(f"    [{cabinet_name}] [!] Полный обход не завершён - хранилище не заменяется")
+        merged = previous.setdefault("cards", {})
+        merged.update(cards_store)
+        state, cards_store = previous, merged
+    elif full:
+        removed = [nm_id for nm_id in previous.get("cards", {}) if nm_id not in cards_store]
+        state["full_synced_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        state["synced_at"] = state["full_synced_at"]
+        if removed:
+            print(f"    [{cabinet_name}] Удалено из хранилища (нет в кабинете): {len(removed)}")
+
+    if pages or full:
+        save_sync_state(cabinet_name, state)
+
+    # Все карточки хранилища принадлежат этому кабинету, пропавшие - больше нет
+    ownership.forget(removed, api_key)
+    ownership.assign(cards_store.keys(), api_key, cabinet_name)
+    ownership.save()
+
+    print(f"    [{cabinet_name}] ✓ Запросов: {pages}, изменено карточек: {changed}, всего: {len(cards_store)}")
+    return cards_store
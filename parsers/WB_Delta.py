@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+ДЕЛЬТА СНИМКОВ ЦЕН: ЗАПИСЫВАЕМ ТОЛЬКО ИЗМЕНЕНИЯ
+Большинство цен между запусками не меняется. Новый снимок каждого nmID
+сравнивается с последним сохранённым (таблица latest в WB_Price_History)
+по хешу полей снимка:
+- changed   - цена/остаток изменились
+- new       - артикула ещё не было в истории
+- unchanged - всё как в прошлый раз (не пишется)
+- missing   - был в истории, но в этот раз цена не получена
+
+В историю цен и в Parquet уходят только changed + new.
+"""
+
+import hashlib
+import sqlite3
+
+from WB_Price_History import PriceHistory, SNAPSHOT_FIELDS
+
+
+def snapshot_hash(snapshot):
+    """Хеш полей снимка (числа округляются до копеек, пустые значения = 0)"""
+    parts = []
+    for field in SNAPSHOT_FIELDS:
+        value = snapshot.get(field)
+        if isinstance(value, (int, float)) or value is None:
+            value = round(float(value or 0), 2)
+        parts.append(f"{field}={value}")
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SnapshotDelta:
+    """Результат сравнения нового снимка с предыдущим"""
+
+    def __init__(self):
+        self.changed = []    # снимки с изменениями
+        self.new = []        # снимки новых артикулов
+        self.unchanged = 0
+        self.missing = []    # nmID, для которых цена не получена
+
+    @property
+    def emitted(self):
+        """Снимки, которые нужно записать"""
+        return self.changed + self.new
+
+    def emitted_ids(self):
+        return {str(snapshot["nm_id"]) for snapshot in self.emitted}
+
+    def report(self):
+        total = len(self.changed) + len(self.new) + self.unchanged
+        print(f"    [Дельта] Изменилось: {len(self.changed)}, новых: {len(self.new)}, "
+              f"без изменений: {self.unchanged}, пропало: {len(self.missing)} "
+              f"(к записи {len(self.emitted)} из {total})")
+
+
+def diff_snapshots(snapshots, previous, expected_ids=None):
+    """
+    snapshots: новые снимки [{nm_id, поля снимка}]
+    previous: {nm_id (str): поля прошлого снимка}
+    expected_ids: какие nmID запрашивались (для подсчёта пропавших), по умолчанию - все из previous
+    """
+    delta = SnapshotDelta()
+    seen = set()
+
+    for snapshot in snapshots:
+        nm_id = str(snapshot["nm_id"])
+        seen.add(nm_id)
+        old = previous.get(nm_id)
+        if old is None:
+            delta.new.append(snapshot)
+        elif snapshot_hash(snapshot) != snapshot_hash(old):
+            delta.changed.append(snapshot)
+        else:
+            delta.unchanged += 1
+
+    candidates = previous.keys() if expected_ids is None else (str(nm_id) for nm_id in expected_ids)
+    delta.missing = [nm_id for nm_id in candidates if nm_id in previous and nm_id not in seen]
+    return delta
+
+
+def compute_delta(snapshots, source, expected_ids=None):
+    """
+    Сравнивает снимки с последними сохранёнными в истории цен (source - как в WB_Price_History)
+    Если история недоступна - все снимки считаются новыми
+    """
+    ids = set(str(snapshot["nm_id"]) for snapshot in snapshots)
+    if expected_ids is not None:
+        ids.update(str(nm_id) for nm_id in expected_ids)
+
+    previous = {}
+    try:
+        history = PriceHistory()
+        try:
+            previous = history.latest(ids, source)
+        finally:
+            history.close()
+    except sqlite3.Error as e:
+        print(f"    [!] История цен недоступна, все снимки считаются новыми: {e}")
+
+    delta = diff_snapshots(snapshots, previous, ids if expected_ids is not None else None)
+    delta.report()
+    return delta
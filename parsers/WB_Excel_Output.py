@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+ПОТОКОВАЯ ЗАПИСЬ РЕЗУЛЬТАТОВ В EXCEL
+Вместо load_workbook + delete_rows + append по строке + save всей книги:
+- лист результатов пишется заново в режиме write_only (строки не держатся в памяти)
+- в архиве xlsx подменяется только XML этого листа: остальные листы (Настройка,
+  входные данные) копируются байт в байт - со стилями, ширинами колонок,
+  объединёнными ячейками, проверкой данных и картинками
+- книга собирается во временный файл и подменяет исходный одним os.replace,
+  поэтому при ошибке исходный файл остаётся целым
+
+Если листа результатов в книге ещё нет, он один раз добавляется через openpyxl
+(обычный режим: стили остальных листов сохраняются, картинки и диаграммы - нет).
+"""
+
+import os
+import time
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from datetime import date, datetime
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def sheet_part_name(zf, sheet_name):
+    """Имя XML листа sheet_name внутри архива xlsx (xl/worksheets/sheetN.xml) или None"""
+    workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+    rel_id = None
+    for sheet in workbook.iter(NS_MAIN + "sheet"):
+        if sheet.get("name") == sheet_name:
+            rel_id = sheet.get(NS_REL + "id")
+            break
+    if rel_id is None:
+        return None
+
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(NS_PKG_REL + "Relationship"):
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            # Путь бывает относительно xl/ или абсолютным от корня архива
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    return None
+
+
+def _plain_row(row):
+    """
+    Даты -> текст: ячейке с датой нужен стиль с форматом, а номер стиля из отдельной
+    книги write_only в исходной книге означал бы другой стиль
+    """
+    return [value.strftime("%Y-%m-%d %H:%M:%S") if isinstance(value, datetime)
+            else value.strftime("%Y-%m-%d") if isinstance(value, date) else value
+            for value in row]
+
+
+def _copy_rows(ws_src, ws_dst, skip_empty=False):
+    """Копирует значения листа построчно, возвращает число строк"""
+    count = 0
+    for row in ws_src.iter_rows(values_only=True):
+        if skip_empty and all(value is None for value in row):
+            continue
+        ws_dst.append(_plain_row(row))
+        count += 1
+    return count
+
+
+def _add_sheet(excel_file, sheet_name):
+    """Добавляет пустой лист в существующую книгу (один раз, обычным openpyxl)"""
+    wb = load_workbook(excel_file)
+    try:
+        wb.create_sheet(sheet_name)
+        wb.save(excel_file)
+    finally:
+        wb.close()
+
+
+def write_sheet_streaming(excel_file, sheet_name, header, rows, keep_existing=False, auto_filter=True):
+    """
+    Перестраивает лист sheet_name в excel_file, не загружая книгу целиком
+    rows: итерируемый объект строк (можно генератор)
+    keep_existing=True - старые строки листа сохраняются, новые дописываются в конец
+                         (заголовок пишется, только если лист был пустым)
+    Остальные листы книги не трогаются. Если файла нет - создаётся книга с одним листом
+    Возвращает число записанных строк данных
+    """
+    start_time = time.time()
+
+    exists = os.path.exists(excel_file)
+    if exists:
+        with zipfile.ZipFile(excel_file) as zf:
+            part = sheet_part_name(zf, sheet_name)
+        if part is None:
+            _add_sheet(excel_file, sheet_name)
+            with zipfile.ZipFile(excel_file) as zf:
+                part = sheet_part_name(zf, sheet_name)
+
+    # Новый лист - отдельной книгой из одного листа в режиме write_only
+    wb_out = Workbook(write_only=True)
+    ws_out = wb_out.create_sheet(sheet_name)
+    wb_in = load_workbook(excel_file, read_only=True) if exists and keep_existing else None
+
+    try:
+        old_rows = 0
+        if wb_in:
+            old_rows = _copy_rows(wb_in[sheet_name], ws_out, skip_empty=True)
+
+        total_rows = old_rows
+        if not old_rows:
+            ws_out.append(header)
+            total_rows = 1
+
+        written = 0
+        for row in rows:
+            ws_out.append(_plain_row(row))
+            written += 1
+        total_rows += written
+
+        if auto_filter:
+            ws_out.auto_filter.ref = f"A1:{get_column_letter(len(header))}{total_rows}"
+    finally:
+        if wb_in:
+            wb_in.close()
+
+    sheet_file = excel_file + ".sheet.tmp.xlsx"
+    tmp_file = excel_file + ".tmp.xlsx"
+    try:
+        if not exists:
+            wb_out.save(tmp_file)
+        else:
+            # Строки листа не зависят от общей таблицы строк и стилей книги (write_only
+            # пишет строки прямо в ячейки), поэтому XML листа переносится как есть
+            wb_out.save(sheet_file)
+            with zipfile.ZipFile(sheet_file) as zf_sheet:
+                sheet_xml = zf_sheet.read(sheet_part_name(zf_sheet, sheet_name))
+
+            with zipfile.ZipFile(excel_file) as zf_in, \
+                    zipfile.ZipFile(tmp_file, "w", zipfile.ZIP_DEFLATED) as zf_out:
+                for item in zf_in.infolist():
+                    data = sheet_xml if item.filename == part else zf_in.read(item.filename)
+                    zf_out.writestr(item, data, compress_type=zipfile.ZIP_DEFLATED)
+
+        # Подменяем исходный файл целиком
+        os.replace(tmp_file, excel_file)
+    finally:
+        for path in (sheet_file, tmp_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"    [Excel] Лист '{sheet_name}': записано {written} строк за {time.time() - start_time:.1f} сек")
+    return written
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+ЦЕНЫ СО СНИМКА СТРАНИЦЫ ТОВАРА (lxml, БЕЗ ЗАПРОСОВ К БРАУЗЕРУ)
+Раньше каждый селектор цены искался через драйвер (запрос к браузеру на селектор,
+плюс driver.page_source для captcha и ключевых слов). Здесь страница берётся один
+раз (driver.page_source) и разбирается за один проход по элементам
+(h2, ins, span, button, div с нужными классами):
+- price         - цена без кошелька (h2 color_primary после клика / ins priceBlockFinalPrice)
+- wallet_price  - цена с WB кошельком (h2 в кнопке priceBlockWalletPrice)
+- old_price     - зачёркнутая цена (priceBlockOldPrice)
+- sold_out      - почему товара нет (текст soldOutProduct или ключевое слово) или None
+- captcha       - страница-заглушка вместо товара
+- wallet_button - есть кнопка кошелька: цену без кошелька WB показывает после клика
+
+PageSnapshot - снимок вкладки: page_source запрашивается один раз, ответы запоминаются;
+для captcha и "нет в наличии" HTML не разбирается (проверки по тексту), дерево строится
+только когда нужны цены. extract_prices(html) - то же самое одним словарём.
+
+Цены берутся из блока цены товара (priceBlock--*): на странице есть карточки
+рекомендаций со своими ins.price__lower-price, за пределами блока они не считаются.
+Если блока нет (старая разметка) - ищется по всей странице, как раньше.
+"""
+
+import re
+
+from lxml import etree
+
+UNAVAILABLE_KEYWORDS = ['нет в наличии', 'товар недоступен', 'недоступен для заказа', 'закончился', 'распродан']
+CAPTCHA_TITLE = "Почти готово"
+
+# Теги, которые просматриваются (классы-кандидаты см. в цикле _parse_tree)
+_TAGS = ("h2", "ins", "span", "button", "div")
+_TITLE_RE = re.compile(r"<title[^>]*>([^<]*)")  # page_source браузера - теги в нижнем регистре
+# Обычный парсер etree: элементы lxml.html заметно дороже на больших страницах
+_PARSER = etree.HTMLParser()
+
+_PRICE_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def parse_price_text(text):
+    """'3 655,89 ₽' -> 3655.89, None если цифр нет (пробелы и nbsp внутри числа убираются)"""
+    if not text:
+        return None
+    match = _PRICE_RE.search(text.replace("\xa0", "").replace(" ", ""))
+    if not match:
+        return None
+    return float(match.group(0).replace(",", "."))
+
+
+def _text(element):
+    return "".join(element.itertext())
+
+
+def _price_rank(tag, classes):
+    """Приоритет цены без кошелька (меньше - лучше), как в порядке старых селекторов; None - не цена"""
+    if tag == "h2" and "mo-typography" in classes and "color_primary" in classes:
+        return 0
+    if tag == "h2" and "finalPrice" in classes:
+        return 1
+    if tag == "ins" and "priceBlockFinalPrice" in classes:
+        return 2
+    if tag == "ins" and "FinalPrice" in classes:
+        return 3
+    if tag == "span" and "final-price" in classes:
+        return 4
+    if tag == "ins" and "price" in classes:
+        return 5
+    return None
+
+
+def _wallet_rank(tag, classes):
+    """Приоритет цены с кошельком; h2 внутри кнопки кошелька ищется отдельно (ранг 0)"""
+    if tag == "h2" and ("color_danger" in classes or "color_accent" in classes):
+        return 1
+    if tag == "span" and "priceBlockWalletPrice" in classes:
+        return 2
+    if tag == "h2" and "walletPrice" in classes:
+        return 3
+    return None
+
+
+def _parse_tree(page_html):
+    """
+    Один проход по элементам страницы
+    Возвращает {price, wallet_price, old_price, sold_out (текст soldOutProduct), wallet_button}
+    """
+    result = {"price": None, "wallet_price": None, "old_price": None,
+              "sold_out": None, "wallet_button": False}
+    root = etree.fromstring(page_html, _PARSER)
+    if root is None:
+        return result
+
+    scope = None
+    wallet_buttons = []
+    prices, wallets = [], []  # (ранг, элемент)
+
+    for element in root.iter(*_TAGS):
+        tag = element.tag
+        classes = element.get("class")
+        # "rice" - price / Price во всех вариантах, "color_" - mo-typography_color_*
+        if not classes or not ("rice" in classes or "color_" in classes or "soldOut" in classes):
+            continue
+        if "soldOutProduct" in classes and result["sold_out"] is None:
+            result["sold_out"] = " ".join(_text(element).split()) or "soldOutProduct"
+            continue
+        if scope is None and any(token.startswith("priceBlock--") for token in classes.split()):
+            scope = element
+            continue
+        if tag == "button" and "priceBlockWalletPrice" in classes:
+            wallet_buttons.append(element)
+            continue
+        if "priceBlockOldPrice" in classes and result["old_price"] is None:
+            result["old_price"] = parse_price_text(_text(element))
+            continue
+
+        rank = _price_rank(tag, classes)
+        if rank is not None:
+            prices.append((rank, element))
+        rank = _wallet_rank(tag, classes)
+        if rank is not None:
+            wallets.append((rank, element))
+
+    # Цена внутри кнопки кошелька - это цена с кошельком, а не цена без него
+    for button in wallet_buttons:
+        result["wallet_button"] = True
+        for h2 in button.iter("h2"):
+            wallets.append((0, h2))
+    in_buttons = set(h2 for button in wallet_buttons for h2 in button.iter("h2"))
+    in_scope = set(scope.iter()) if scope is not None else None
+
+    def best(candidates, skip=()):
+        found = {}
+        for rank, element in candidates:
+            if element in skip or rank in found or (in_scope is not None and element not in in_scope):
+                continue
+            value = parse_price_text(_text(element))
+            if value:
+                found[rank] = value
+        return found[min(found)] if found else None
+
+    result["price"] = best(prices, in_buttons)
+    result["wallet_price"] = best(wallets)
+    return result
+
+
+class PageSnapshot:
+    """
+    Снимок вкладки: DOM берётся из браузера один раз (driver.page_source),
+    все проверки отвечают по нему и запоминают ответ
+    captcha и ключевые слова "нет в наличии" - по тексту страницы (одна копия lower()
+    на все проверки), дерево строится только когда нужны цены или элемент soldOutProduct
+    """
+
+    def __init__(self, page_html):
+        self.html = page_html or ""
+        self._lowered = None
+        self._tree = None
+
+    @classmethod
+    def from_driver(cls, driver):
+        return cls(driver.page_source)
+
+    @property
+    def lowered(self):
+        if self._lowered is None:
+            self._lowered = self.html.lower()
+        return self._lowered
+
+    @property
+    def title(self):
+        match = _TITLE_RE.search(self.html)
+        return match.group(1).strip() if match else ""
+
+    @property
+    def captcha(self):
+        return CAPTCHA_TITLE in self.title or "captcha" in self.lowered
+
+    @property
+    def sold_out(self):
+        """Почему товара нет: текст элемента soldOutProduct или ключевое слово; None - в наличии"""
+        if "soldOutProduct" in self.html and self.tree["sold_out"]:
+            return self.tree["sold_out"]
+        lowered = self.lowered
+        for keyword in UNAVAILABLE_KEYWORDS:
+            if keyword in lowered:
+                return keyword
+        return None
+
+    @property
+    def tree(self):
+        """Результат разбора дерева (один раз на снимок)"""
+        if self._tree is None:
+            if self.html.strip():
+                self._tree = _parse_tree(self.html)
+            else:
+                self._tree = {"price": None, "wallet_price": None, "old_price": None,
+                              "sold_out": None, "wallet_button": False}
+        return self._tree
+
+    @property
+    def price(self):
+        return self.tree["price"]
+
+    @property
+    def wallet_price(self):
+        return self.tree["wallet_price"]
+
+    @property
+    def old_price(self):
+        return self.tree["old_price"]
+
+    @property
+    def wallet_button(self):
+        return self.tree["wallet_button"]
+
+
+def extract_prices(page_html):
+    """
+    Разбирает HTML страницы товара (строка driver.page_source)
+    Возвращает {price, wallet_price, old_price, sold_out, captcha, wallet_button}
+    Цены - float или None
+    """
+    page = PageSnapshot(page_html)
+    return {"price": page.price, "wallet_price": page.wallet_price, "old_price": page.old_price,
+            "sold_out": page.sold_out, "captcha": page.captcha, "wallet_button": page.wallet_button}
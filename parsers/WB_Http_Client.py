@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+ОБЩИЙ HTTP КЛИЕНТ ДЛЯ ВСЕХ ПАРСЕРОВ
+Одна сессия requests на каждый кабинет вместо голых requests.post/get:
+- пул соединений на каждый хост (keep-alive, без TCP+TLS рукопожатия на каждый запрос)
+- сжатие ответов gzip/brotli (brotli - если установлен пакет brotli)
+- заголовок Authorization кабинета задаётся один раз при создании сессии
+- каждый запрос проходит через ограничитель скорости хоста/ключа (WB_Rate_Limiter),
+  ответ 429 повторяется после паузы, которую указал сервер
+
+Размеры пулов можно настроить через .env:
+WB_HTTP_POOL_CONNECTIONS=20   # сколько хостов держать в кеше пулов
+WB_HTTP_POOL_MAXSIZE=20       # сколько соединений держать к одному хосту
+"""
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from WB_Rate_Limiter import get_limiter_for_url
+
+# === КОНФИГУРАЦИЯ ===
+POOL_CONNECTIONS = int(os.getenv("WB_HTTP_POOL_CONNECTIONS", "20"))
+POOL_MAXSIZE = int(os.getenv("WB_HTTP_POOL_MAXSIZE", "20"))
+MAX_RETRIES_429 = 5  # Сколько раз повторять запрос после 429 Too Many Requests
+
+# urllib3 сам распаковывает brotli, если установлен brotli или brotlicffi
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive",
+    "Content-Type": "application/json"
+}
+
+_sessions = {}  # api_key (или None для запросов без авторизации) -> requests.Session
+_sessions_lock = threading.Lock()
+
+
+def create_session(api_key=None, pool_connections=None, pool_maxsize=None):
+    """
+    Создаёт новую сессию с пулом соединений
+    api_key: ключ кабинета WB (будет отправляться в заголовке Authorization)
+    """
+    session = requests.Session()
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections or POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize or POOL_MAXSIZE
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.headers.update(DEFAULT_HEADERS)
+    if api_key:
+        session.headers["Authorization"] = api_key
+
+    return session
+
+
+def get_session(api_key=None):
+    """
+    Возвращает общую сессию для кабинета (создаёт при первом обращении)
+    Все потоки одного кабинета используют один пул соединений
+    """
+    with _sessions_lock:
+        session = _sessions.get(api_key)
+        if session is None:
+            session = create_session(api_key)
+            _sessions[api_key] = session
+        return session
+
+
+def http_request(method, url, api_key=None, **kwargs):
+    """
+    Запрос через общую сессию кабинета с учётом лимитов API
+    Перед запросом ждёт токен ограничителя, после - подстраивает скорость по заголовкам ответа
+    """
+    session = get_session(api_key)
+    limiter = get_limiter_for_url(url, api_key)
+
+    for attempt in range(MAX_RETRIES_429 + 1):
+        if limiter:
+            limiter.acquire()
+
+        response = session.request(method, url, **kwargs)
+
+        if not limiter:
+            return response
+
+        wait = limiter.update_from_response(response)
+        if response.status_code != 429 or attempt == MAX_RETRIES_429:
+            return response
+
+        print(f"    [RATE] 429 от {limiter.name}, повтор через {wait:.1f} сек (попытка {attempt + 1}/{MAX_RETRIES_429})")
+
+    return response
+
+
+def http_post(url, api_key=None, **kwargs):
+    """POST через общую сессию кабинета (аргументы как у requests.post)"""
+    return http_request("POST", url, api_key=api_key, **kwargs)
+
+
+def http_get(url, api_key=None, **kwargs):
+    """GET через общую сессию кабинета (аргументы как у requests.get)"""
+    return http_request("GET", url, api_key=api_key, **kwargs)
+
+
+def close_all_sessions():
+    """Закрывает все сессии и их соединения"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
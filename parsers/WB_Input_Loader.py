@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+ЗАГРУЗКА АРТИКУЛОВ ИЗ ЛИСТА "Данные для парсера ВБ"
+Вместо load_workbook всей книги (вместе с большими листами результатов):
+- книга открывается в режиме read_only, разбирается только входной лист
+- артикулы отдаются лениво, без дублей: nmID (цифры) и артикулы продавца (vendorCode -
+  их находит по карточкам Parser_WB_API_FAST)
+- nm_ids_only=True - для парсеров, которым нужен именно nmID (ссылки, card.json):
+  остальные строки пропускаются, и каждая пропущенная называется в выводе
+- готовый список кешируется (data/input_articles_cache.json) по хешу XML входного
+  листа внутри xlsx: листы результатов перезаписываются каждый запуск, но входной
+  лист при этом не меняется - и книга не открывается вовсе
+
+Время запуска больше не зависит от размера истории на листах результатов.
+"""
+
+import os
+import json
+import hashlib
+import zipfile
+from openpyxl import load_workbook
+from WB_Excel_Output import sheet_part_name
+
+# === КОНФИГУРАЦИЯ ===
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+INPUT_CACHE_FILE = os.path.join(DATA_DIR, "input_articles_cache.json")
+
+
+def normalize_article(value):
+    """Значение ячейки -> артикул строкой (nmID или vendorCode), или None если ячейка пустая"""
+    if value is None:
+        return None
+    # Excel хранит числа как float: 123456.0 -> "123456"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    article = str(value).strip()
+    return article or None
+
+
+def iter_input_articles(excel_file, sheet_name, stats=None):
+    """
+    Лениво читает столбец A входного листа (со 2-й строки)
+    Выдаёт уникальные артикулы в порядке листа
+    stats: словарь, в который пишутся счётчики rows (непустых строк) и duplicates
+    """
+    if stats is None:
+        stats = {}
+    stats.update({"rows": 0, "duplicates": 0})
+    seen = set()
+
+    wb = load_workbook(excel_file, read_only=True)
+    try:
+        ws_in = wb[sheet_name]
+        for row in ws_in.iter_rows(min_row=2, max_col=1, values_only=True):
+            article = normalize_article(row[0]) if row else None
+            if article is None:
+                continue
+
+            stats["rows"] += 1
+            if article in seen:
+                stats["duplicates"] += 1
+                continue
+
+            seen.add(article)
+            yield article
+    finally:
+        wb.close()
+
+
+def _sheet_signature(excel_file, sheet_name):
+    """
+    Хеш XML входного листа и общей таблицы строк (в ней тексты ячеек листа)
+    Запись листа результатов (WB_Excel_Output) подменяет только XML своего листа
+    и строки пишет в ячейки - подпись входного листа от неё не меняется
+    """
+    digest = hashlib.sha1()
+    with zipfile.ZipFile(excel_file) as zf:
+        part = sheet_part_name(zf, sheet_name)
+        if part is None:
+            raise KeyError(f"Worksheet {sheet_name} does not exist.")
+        digest.update(zf.read(part))
+        if "xl/sharedStrings.xml" in zf.namelist():
+            digest.update(zf.read("xl/sharedStrings.xml"))
+    return {"file": os.path.abspath(excel_file), "sheet": sheet_name, "sha1": digest.hexdigest()}
+
+
+def _read_articles(excel_file, sheet_name, use_cache, stats):
+    """Все артикулы листа - из кеша, если входной лист не менялся (счётчики - в stats)"""
+    signature = _sheet_signature(excel_file, sheet_name)
+
+    if use_cache and os.path.exists(INPUT_CACHE_FILE):
+        try:
+            with open(INPUT_CACHE_FILE, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("signature") == signature and "stats" in cached:
+                print(f"    [Вход] Артикулы из кеша (лист не менялся): {len(cached['articles'])}")
+                stats.update(cached["stats"])
+                return cached["articles"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    articles = list(iter_input_articles(excel_file, sheet_name, stats))
+
+    if stats["duplicates"]:
+        print(f"    [Вход] Пропущено дублей: {stats['duplicates']}")
+
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(INPUT_CACHE_FILE), exist_ok=True)
+            tmp_path = INPUT_CACHE_FILE + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"signature": signature, "stats": stats, "articles": articles}, f)
+            os.replace(tmp_path, INPUT_CACHE_FILE)
+        except OSError as e:
+            print(f"    [!] Не удалось сохранить кеш артикулов: {e}")
+
+    return articles
+
+
+def load_input_articles(excel_file, sheet_name, use_cache=True, nm_ids_only=False, stats=None):
+    """
+    Список артикулов входного листа (с кешем по содержимому листа)
+    nm_ids_only=True - только nmID; каждый пропущенный артикул продавца печатается
+    stats: словарь, в который пишутся rows (непустых строк листа), duplicates и
+           not_nm_ids (пропущено при nm_ids_only) - чтобы объяснить, почему артикулов меньше строк
+    """
+    if stats is None:
+        stats = {}
+    articles = _read_articles(excel_file, sheet_name, use_cache, stats)
+    stats["not_nm_ids"] = 0
+    if not nm_ids_only:
+        return articles
+
+    skipped = [article for article in articles if not article.isdigit()]
+    stats["not_nm_ids"] = len(skipped)
+    if skipped:
+        print(f"    [!] Пропущено {len(skipped)} значений - не nmID (этот парсер ищет только по nmID, "
+              f"артикулы продавца понимает Parser_WB_API_FAST):")
+        for article in skipped:
+            print(f"        - {article}")
+        articles = [article for article in articles if article.isdigit()]
+    return articles
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+ВЫХОДНЫЕ ФОРМАТЫ РЕЗУЛЬТАТОВ: EXCEL И PARQUET
+Результаты пишутся во все включённые форматы за один проход по строкам:
+- excel   - лист в Excel (потоково, WB_Excel_Output) - для просмотра руками
+- parquet - колоночные файлы с типизированными столбцами для аналитики:
+    data/parquet/<набор>/date=ГГГГ-ММ-ДД/cabinet=<КАБИНЕТ>/part-ЧЧММСС-xxxx.parquet
+  Раскладка по дате и кабинету (hive), поэтому pyarrow.dataset / DuckDB / pandas
+  читают месяцы снимков цен, открывая только нужные файлы:
+    pyarrow.dataset.dataset("data/parquet/fast_prices", partitioning="hive")
+
+Какие форматы включены - переменная .env:
+WB_OUTPUT_BACKENDS=excel,parquet   # по умолчанию; "parquet" - без Excel
+Для parquet нужен pyarrow (pip install pyarrow); без него формат пропускается.
+
+Описание столбцов набора - список (заголовок Excel, поле Parquet, тип), тип:
+"string", "int64", "float64", "timestamp" (строка "%Y-%m-%d %H:%M:%S").
+"""
+
+import os
+import time
+import uuid
+from datetime import datetime
+
+from WB_Excel_Output import write_sheet_streaming
+
+# === КОНФИГУРАЦИЯ ===
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+PARQUET_DIR = os.path.join(DATA_DIR, "parquet")
+
+OUTPUT_BACKENDS = [name.strip().lower() for name in os.getenv("WB_OUTPUT_BACKENDS", "excel,parquet").split(",")
+                   if name.strip()]
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+PARTITION_CABINET_FIELD = "cabinet"  # Если такое поле есть - файлы раскладываются по кабинетам
+
+
+def _import_pyarrow():
+    """pyarrow импортируется только когда нужен (None, если не установлен)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def _to_int(value):
+    if value is None or value == "":
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_timestamp(value):
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.strptime(str(value), TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def _to_string(value):
+    return None if value is None else str(value)
+
+
+_CONVERTERS = {"string": _to_string, "int64": _to_int, "float64": _to_float, "timestamp": _to_timestamp}
+
+
+class ParquetSink:
+    """
+    Собирает строки набора и при close() пишет их в Parquet,
+    по файлу на каждую пару (дата, кабинет)
+    """
+
+    def __init__(self, dataset, columns, base_dir=None):
+        self.dataset = dataset
+        self.columns = columns
+        self.base_dir = base_dir or PARQUET_DIR
+        fields = [field for _, field, _ in columns]
+        types = [col_type for _, _, col_type in columns]
+        self.ts_index = types.index("timestamp") if "timestamp" in types else None
+        self.cabinet_index = fields.index(PARTITION_CABINET_FIELD) if PARTITION_CABINET_FIELD in fields else None
+        self.partitions = {}  # (дата, кабинет) -> список строк
+        self.rows_written = 0
+
+    def add(self, row):
+        date = datetime.now().strftime("%Y-%m-%d")
+        if self.ts_index is not None:
+            ts = _to_timestamp(row[self.ts_index])
+            if ts:
+                date = ts.strftime("%Y-%m-%d")
+        cabinet = None
+        if self.cabinet_index is not None:
+            cabinet = str(row[self.cabinet_index] or "unknown")
+        self.partitions.setdefault((date, cabinet), []).append(row)
+
+    def close(self):
+        """Пишет накопленные строки, возвращает список файлов"""
+        if not self.partitions:
+            return []
+
+        pa = _import_pyarrow()
+        arrow_types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(),
+                       "timestamp": pa.timestamp("s")}
+
+        # Поле кабинета берётся из пути (hive), в сами файлы не пишется
+        kept = [i for i in range(len(self.columns)) if i != self.cabinet_index]
+        schema = pa.schema([(self.columns[i][1], arrow_types[self.columns[i][2]]) for i in kept])
+
+        files = []
+        stamp = datetime.now().strftime("%H%M%S")
+        self.rows_written = 0
+        for (date, cabinet), rows in self.partitions.items():
+            self.rows_written += len(rows)
+            arrays = []
+            for position, i in enumerate(kept):
+                convert = _CONVERTERS[self.columns[i][2]]
+                arrays.append(pa.array([convert(row[i]) for row in rows], type=schema.field(position).type))
+            table = pa.Table.from_arrays(arrays, schema=schema)
+
+            partition_dir = os.path.join(self.base_dir, self.dataset, f"date={date}")
+            if cabinet is not None:
+                partition_dir = os.path.join(partition_dir, f"cabinet={cabinet}")
+            os.makedirs(partition_dir, exist_ok=True)
+
+            path = os.path.join(partition_dir, f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet")
+            tmp_path = path + ".tmp"
+            pa.parquet.write_table(table, tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+            files.append(path)
+
+        self.partitions = {}
+        return files
+
+
+def _tee_rows(rows, sinks, sink_filter=None):
+    """Отдаёт строки дальше (в Excel), попутно складывая их в остальные форматы"""
+    for row in rows:
+        if sink_filter is None or sink_filter(row):
+            for sink in sinks:
+                sink.add(row)
+        yield row
+
+
+def get_output_backends(backends=None):
+    """Включённые форматы с учётом доступности pyarrow"""
+    backends = list(backends or OUTPUT_BACKENDS)
+    if "parquet" in backends and _import_pyarrow() is None:
+        print("    [!] pyarrow не установлен - запись в Parquet пропущена (pip install pyarrow)")
+        backends.remove("parquet")
+    return backends
+
+
+def write_results(dataset, columns, rows, excel_file=None, sheet_name=None,
+                  keep_existing=False, auto_filter=True, backends=None, sink_filter=None):
+    """
+    Записывает строки результатов во все включённые форматы за один проход
+    dataset: имя набора для Parquet (папка в data/parquet)
+    columns: [(заголовок Excel, поле Parquet, тип), ...]
+    excel_file/sheet_name/keep_existing/auto_filter - как у write_sheet_streaming
+    sink_filter(row) -> bool: какие строки писать в Parquet (например, только изменившиеся);
+                              Excel всегда получает все строки - это текущий снимок
+    Возвращает число строк
+    """
+    backends = get_output_backends(backends)
+    start_time = time.time()
+
+    sinks = []
+    if "parquet" in backends:
+        sinks.append(ParquetSink(dataset, columns))
+
+    rows = _tee_rows(rows, sinks, sink_filter)
+    written = 0
+    if "excel" in backends and excel_file and sheet_name:
+        header = [title for title, _, _ in columns]
+        written = write_sheet_streaming(excel_file, sheet_name, header, rows, keep_existing, auto_filter)
+    else:
+        for _ in rows:
+            written += 1
+
+    for sink in sinks:
+        files = sink.close()
+        if files:
+            print(f"    [Parquet] Набор '{dataset}': {sink.rows_written} строк, файлов: {len(files)} "
+                  f"({time.time() - start_time:.1f} сек) -> {os.path.join(PARQUET_DIR, dataset)}")
+
+    return written
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+ИНДЕКС ВЛАДЕЛЬЦЕВ АРТИКУЛОВ: nmID -> КАБИНЕТ
+Каждый nmID принадлежит ровно одному кабинету, поэтому рассылать его
+в Prices/Stocks API всем ключам бессмысленно - при шести кабинетах
+пять запросов из шести возвращают пустой ответ.
+
+Индекс (data/nm_owners.json) пополняется из синхронизации Content API
+и из ответов Prices/Stocks. Кабинет хранится как отпечаток API ключа
+(sha256), а не сам ключ, поэтому одинаково работает и для ключей из .env,
+и для ключей из листа "Настройка".
+
+Маршрутизация:
+- владелец известен и его ключ среди переданных - nmID уходит только ему
+- владелец неизвестен - nmID уходит всем кабинетам (как раньше)
+
+Отдельно хранится, когда nmID не вернул ни один кабинет (missing: nmID -> дата):
+такие артикулы какое-то время не рассылаются повторно (см. WB_Cabinet_Routing).
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import date, timedelta
+
+# === КОНФИГУРАЦИЯ ===
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+OWNERSHIP_FILE = os.path.join(DATA_DIR, "nm_owners.json")
+
+
+def key_fingerprint(api_key):
+    """Короткий отпечаток API ключа (сам ключ на диск не пишется)"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class OwnershipIndex:
+    """Потокобезопасный индекс {nmID: отпечаток ключа кабинета}"""
+
+    def __init__(self, path=OWNERSHIP_FILE):
+        self.path = path
+        self.owners = {}    # nmID (str) -> отпечаток ключа
+        self.cabinets = {}  # отпечаток ключа -> название кабинета (для наглядности)
+        self.missing = {}   # nmID (str) -> дата (YYYY-MM-DD), когда его не вернул ни один кабинет
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=OWNERSHIP_FILE):
+        index = cls(path)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                index.owners = data.get("owners", {})
+                index.cabinets = data.get("cabinets", {})
+                index.missing = data.get("missing", {})
+            except (OSError, ValueError) as e:
+                print(f"[!] Не удалось прочитать индекс владельцев '{path}': {e}")
+        return index
+
+    def save(self):
+        """Атомарно сохраняет индекс (только если были изменения)"""
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"cabinets": self.cabinets, "owners": self.owners, "missing": self.missing},
+                          f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+
+    def assign(self, nm_ids, api_key, cabinet_name=None):
+        """Запоминает, что nm_ids принадлежат кабинету с ключом api_key"""
+        fingerprint = key_fingerprint(api_key)
+        with self.lock:
+            if cabinet_name and self.cabinets.get(fingerprint) != cabinet_name:
+                self.cabinets[fingerprint] = cabinet_name
+                self.dirty = True
+            for nm_id in nm_ids:
+                nm_id = str(nm_id)
+                if self.owners.get(nm_id) != fingerprint:
+                    self.owners[nm_id] = fingerprint
+                    self.dirty = True
+                if self.missing.pop(nm_id, None) is not None:
+                    self.dirty = True
+
+    def mark_missing(self, nm_ids):
+        """Запоминает, что nm_ids сегодня не вернул ни один кабинет"""
+        today = date.today().isoformat()
+        with self.lock:
+            for nm_id in nm_ids:
+                nm_id = str(nm_id)
+                if self.missing.get(nm_id) != today:
+                    self.missing[nm_id] = today
+                    self.dirty = True
+
+    def recently_missing(self, nm_ids, days):
+        """nmID (str) из nm_ids, которые не вернул ни один кабинет за последние days дней"""
+        since = (date.today() - timedelta(days=days)).isoformat()
+        with self.lock:
+            return {str(nm_id) for nm_id in nm_ids if self.missing.get(str(nm_id), "") > since}
+
+    def forget(self, nm_ids, api_key=None):
+        """
+        Удаляет владельцев (например, артикул переехал в другой кабинет)
+        api_key - только у тех nmID, владелец которых - этот кабинет
+        """
+        fingerprint = key_fingerprint(api_key) if api_key else None
+        with self.lock:
+            for nm_id in nm_ids:
+                nm_id = str(nm_id)
+                if fingerprint and self.owners.get(nm_id) != fingerprint:
+                    continue
+                if self.owners.pop(nm_id, None) is not None:
+                    self.dirty = True
+
+    def route(self, nm_ids, api_keys):
+        """
+        Распределяет nmID по кабинетам
+        Возвращает ({api_key: [nmID владельца]}, [nmID без известного владельца])
+        """
+        key_by_fingerprint = {key_fingerprint(api_key): api_key for api_key in api_keys}
+        routed = {api_key: [] for api_key in api_keys}
+        unknown = []
+        with self.lock:
+            for nm_id in nm_ids:
+                api_key = key_by_fingerprint.get(self.owners.get(str(nm_id)))
+                if api_key is None:
+                    unknown.append(nm_id)
+                else:
+                    routed[api_key].append(nm_id)
+        return routed, unknown
+
+
+_shared_index = None
+_shared_index_lock = threading.Lock()
+
+
+def get_ownership_index():
+    """Общий индекс процесса (загружается с диска при первом обращении)"""
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None:
+            _shared_index = OwnershipIndex.load()
+        return _shared_index
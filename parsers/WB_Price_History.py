@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+ИСТОРИЯ ЦЕН: ХРАНИЛИЩЕ СНИМКОВ (ТОЛЬКО ДОБАВЛЕНИЕ)
+Лист результатов в Excel хранит только текущий снимок, а вся история
+price / discountedPrice / clubDiscountedPrice / stockCount копится здесь:
+    data/price_history.sqlite
+
+- snapshots: все снимки, первичный ключ (nm_id, source, ts) - выборка истории
+  одного артикула идёт по индексу
+- latest: последний снимок каждого артикула - "текущая цена" без сканирования истории
+- compact(): снимки старше COMPACT_KEEP_ALL_DAYS прореживаются до одного
+  (последнего) на артикул в день
+
+source - откуда цены: "prices_api" (Prices API продавца, быстрый парсер - с остатками),
+"all_products" (Prices API, все товары кабинетов - без остатков), "card_api" (card.json с CDN).
+Источники с разным набором полей не смешиваются - иначе каждый запуск другого
+парсера считал бы все товары изменившимися и затирал бы остатки в latest
+
+ОБСЛУЖИВАНИЕ:
+    python parsers/WB_Price_History.py                # статистика
+    python parsers/WB_Price_History.py latest 123456  # текущая цена артикула
+    python parsers/WB_Price_History.py history 123456 # история артикула
+    python parsers/WB_Price_History.py compact        # прореживание старых снимков
+"""
+
+import os
+import sys
+import time
+import sqlite3
+from datetime import datetime
+
+# === КОНФИГУРАЦИЯ ===
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+PRICE_HISTORY_FILE = os.path.join(DATA_DIR, "price_history.sqlite")
+
+COMPACT_KEEP_ALL_DAYS = 30  # Более старые снимки прореживаются до одного в день
+SQL_BATCH = 500             # Параметров в одном запросе IN (...) (лимит SQLite - 999)
+
+SNAPSHOT_FIELDS = ["cabinet", "price", "discounted_price", "club_discounted_price", "stock_count"]
+
+
+class PriceHistory:
+    """Хранилище снимков цен {nm_id, cabinet, price, discounted_price, club_discounted_price, stock_count}"""
+
+    def __init__(self, path=PRICE_HISTORY_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                nm_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                cabinet TEXT,
+                price REAL,
+                discounted_price REAL,
+                club_discounted_price REAL,
+                stock_count INTEGER,
+                PRIMARY KEY (nm_id, source, ts)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS latest (
+                nm_id INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                cabinet TEXT,
+                price REAL,
+                discounted_price REAL,
+                club_discounted_price REAL,
+                stock_count INTEGER,
+                PRIMARY KEY (nm_id, source)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def append_snapshots(self, snapshots, source, ts=None):
+        """
+        Добавляет снимки (словари с nm_id и полями SNAPSHOT_FIELDS) одним временем ts
+        Возвращает число добавленных снимков
+        """
+        ts = int(ts if ts is not None else time.time())
+        rows = []
+        for snapshot in snapshots:
+            nm_id = str(snapshot.get("nm_id", "")).strip()
+            if not nm_id.isdigit():
+                continue
+            rows.append((int(nm_id), source, ts) + tuple(snapshot.get(field) for field in SNAPSHOT_FIELDS))
+
+        if not rows:
+            return 0
+
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            # Текущая цена обновляется, только если снимок не старше уже записанного
+            self.conn.executemany("""
+                INSERT INTO latest VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (nm_id, source) DO UPDATE SET
+                    ts = excluded.ts, cabinet = excluded.cabinet, price = excluded.price,
+                    discounted_price = excluded.discounted_price,
+                    club_discounted_price = excluded.club_discounted_price,
+                    stock_count = excluded.stock_count
+                WHERE excluded.ts >= latest.ts
+            """, rows)
+        return len(rows)
+
+    def latest(self, nm_ids=None, source=None):
+        """Текущие цены {nm_id (str): {ts, source, поля снимка}} - по всем артикулам или по списку"""
+        query = f"SELECT nm_id, source, ts, {', '.join(SNAPSHOT_FIELDS)} FROM latest"
+        conditions, params = [], []
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+
+        batches = [None]
+        if nm_ids is not None:
+            ids = [int(nm_id) for nm_id in nm_ids if str(nm_id).strip().isdigit()]
+            batches = [ids[i:i + SQL_BATCH] for i in range(0, len(ids), SQL_BATCH)]
+
+        result = {}
+        for batch in batches:
+            batch_conditions, batch_params = list(conditions), list(params)
+            if batch is not None:
+                batch_conditions.append(f"nm_id IN ({','.join('?' * len(batch))})")
+                batch_params.extend(batch)
+            where = f" WHERE {' AND '.join(batch_conditions)}" if batch_conditions else ""
+            for row in self.conn.execute(query + where, batch_params):
+                result[str(row[0])] = dict(zip(["source", "ts"] + SNAPSHOT_FIELDS, row[1:]))
+        return result
+
+    def history(self, nm_id, source=None, since_ts=None):
+        """Все снимки артикула по времени [(ts, source, поля снимка), ...]"""
+        query = f"SELECT ts, source, {', '.join(SNAPSHOT_FIELDS)} FROM snapshots WHERE nm_id = ?"
+        params = [int(nm_id)]
+        if source:
+            query += " AND source = ?"
+            params.append(source)
+        if since_ts:
+            query += " AND ts >= ?"
+            params.append(int(since_ts))
+        return self.conn.execute(query + " ORDER BY ts", params).fetchall()
+
+    def compact(self, keep_all_days=COMPACT_KEEP_ALL_DAYS, vacuum=True):
+        """
+        Снимки старше keep_all_days прореживаются: остаётся последний снимок
+        артикула за каждый день. Возвращает число удалённых снимков
+        """
+        cutoff = int(time.time()) - keep_all_days * 86400
+        with self.conn:
+            deleted = self.conn.execute("""
+                DELETE FROM snapshots
+                WHERE ts < :cutoff
+                  AND (nm_id, source, ts) NOT IN (
+                      SELECT nm_id, source, MAX(ts) FROM snapshots
+                      WHERE ts < :cutoff
+                      GROUP BY nm_id, source, ts / 86400
+                  )
+            """, {"cutoff": cutoff}).rowcount
+        if vacuum and deleted:
+            self.conn.execute("VACUUM")
+        return deleted
+
+    def stats(self):
+        """(снимков, артикулов, первый ts, последний ts)"""
+        snapshots, first_ts, last_ts = self.conn.execute(
+            "SELECT COUNT(*), MIN(ts), MAX(ts) FROM snapshots"
+        ).fetchone()
+        articles = self.conn.execute("SELECT COUNT(DISTINCT nm_id) FROM latest").fetchone()[0]
+        return snapshots, articles, first_ts, last_ts
+
+
+def record_snapshots(snapshots, source):
+    """Добавляет снимки в общее хранилище и печатает итог (ошибка хранилища не прерывает парсер)"""
+    try:
+        history = PriceHistory()
+        try:
+            added = history.append_snapshots(snapshots, source)
+        finally:
+            history.close()
+        print(f"    [История] Добавлено снимков цен: {added} ({PRICE_HISTORY_FILE})")
+        return added
+    except sqlite3.Error as e:
+        print(f"    [!] Не удалось записать историю цен: {e}")
+        return 0
+
+
+def _format_ts(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else "-"
+
+
+def main():
+    history = PriceHistory()
+    try:
+        command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+        if command == "latest" and len(sys.argv) > 2:
+            for nm_id, data in history.latest(sys.argv[2:]).items():
+                print(f"{nm_id} [{data['source']}] {_format_ts(data['ts'])}: "
+                      + ", ".join(f"{field}={data[field]}" for field in SNAPSHOT_FIELDS))
+        elif command == "history" and len(sys.argv) > 2:
+            for row in history.history(sys.argv[2]):
+                print(f"{_format_ts(row[0])} [{row[1]}] "
+                      + ", ".join(f"{field}={value}" for field, value in zip(SNAPSHOT_FIELDS, row[2:])))
+        elif command == "compact":
+            deleted = history.compact()
+            print(f"✓ Удалено снимков: {deleted} (оставлено по одному в день старше {COMPACT_KEEP_ALL_DAYS} дн.)")
+        else:
+            snapshots, articles, first_ts, last_ts = history.stats()
+            print(f"История цен: {history.path}")
+            print(f"  Снимков: {snapshots}, артикулов: {articles}")
+            print(f"  Период: {_format_ts(first_ts)} - {_format_ts(last_ts)}")
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+ЖУРНАЛ ПРОГРЕССА ДЛИННОГО ЗАПУСКА (JSONL, ТОЛЬКО ДОПИСЫВАНИЕ)
+Каждый обработанный товар сразу дописывается строкой в файл и сбрасывается на диск
+(flush + fsync): после падения процесса, перезагрузки или разорванной сессии
+браузера готовые товары не теряются. Запуск с --resume пропускает всё, что уже
+есть в журнале, и продолжает с места остановки.
+
+- в журнал попадают только товары с окончательным ответом (цена или "недоступен");
+  captcha и ошибки не пишутся - при продолжении они обработаются заново
+- последняя строка, оборванная на середине (падение во время записи), пропускается,
+  а при продолжении обрезается - новые записи начинаются с новой строки
+- новый запуск без --resume начинает журнал заново (старый переименовывается в .prev)
+
+Формат строки: {"article": "...", "url": "...", "price": 123, "ts": "2024-01-01 12:00:00"}
+"""
+
+import os
+import json
+from datetime import datetime
+
+
+class ProgressJournal:
+    """Журнал готовых товаров одного запуска"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def load(self):
+        """Готовые товары из журнала: {артикул: {url, article, price}} в порядке записи"""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    done[record["article"]] = {"url": record["url"], "article": record["article"],
+                                               "price": record["price"]}
+                except (ValueError, KeyError, TypeError):
+                    continue  # Строка оборвана на середине - товар обработается заново
+        return done
+
+    def open(self, resume=False):
+        """Открывает журнал на дописывание; без resume прошлый журнал уходит в .prev"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not resume and os.path.exists(self.path):
+            os.replace(self.path, self.path + ".prev")
+        if resume:
+            self._drop_torn_tail()
+        self.file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def _drop_torn_tail(self):
+        """Обрезает оборванную последнюю строку (без перевода строки), иначе следующая запись склеится с ней"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)  # Нет ни одной целой строки - обрезается до пустого
+
+    def record(self, result):
+        """Дописывает готовый товар и сразу сбрасывает на диск"""
+        line = json.dumps({"article": result["article"], "url": result["url"], "price": result["price"],
+                           "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}, ensure_ascii=False)
+        self.file.write(line + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
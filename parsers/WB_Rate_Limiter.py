@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+АДАПТИВНЫЙ ОГРАНИЧИТЕЛЬ ЗАПРОСОВ (TOKEN BUCKET)
+Отдельный лимит на каждую пару (хост API, ключ кабинета) вместо фиксированных time.sleep
+
+Как подстраивается скорость:
+- X-Ratelimit-Remaining > burst  -> у API есть запас, скорость плавно растёт (до max_rate)
+- X-Ratelimit-Remaining = 0      -> ждём X-Ratelimit-Reset секунд
+- 429 Too Many Requests          -> ждём X-Ratelimit-Retry / Retry-After, скорость падает вдвое
+
+Стартовые лимиты взяты из документации WB API (запросов в секунду на один ключ)
+"""
+
+import time
+import threading
+from urllib.parse import urlparse
+
+# === КОНФИГУРАЦИЯ ===
+# хост (или суффикс хоста с точкой в начале) -> параметры лимита
+RATE_LIMITS = {
+    "content-api.wildberries.ru": {"rate": 100 / 60, "burst": 5},           # 100 запросов в минуту
+    "discounts-prices-api.wildberries.ru": {"rate": 10 / 6, "burst": 5},    # 10 запросов за 6 секунд
+    "seller-analytics-api.wildberries.ru": {"rate": 3 / 60, "burst": 3},    # 3 запроса в минуту
+    ".wbbasket.ru": {"rate": 20, "burst": 20},                              # CDN карточек, лимит на каждый basket-XX
+}
+
+MAX_RATE_MULTIPLIER = 3  # Во сколько раз можно разогнаться выше стартового лимита
+MIN_RATE_DIVIDER = 10    # Во сколько раз можно замедлиться ниже стартового лимита
+
+_limiters = {}  # (host, api_key) -> RateLimiter
+_limiters_lock = threading.Lock()
+
+
+def _header_number(headers, name):
+    """Читает числовой заголовок, None если его нет или он не число"""
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token bucket для одного хоста и одного API ключа (потокобезопасный)"""
+
+    def __init__(self, name, rate, burst=1):
+        self.name = name
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.max_rate = self.base_rate * MAX_RATE_MULTIPLIER
+        self.min_rate = self.base_rate / MIN_RATE_DIVIDER
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Блокирует поток, пока не появится токен на запрос"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def update_from_response(self, response):
+        """
+        Подстраивает скорость по ответу API
+        Возвращает сколько секунд нужно подождать перед повтором (для 429), иначе 0
+        """
+        headers = response.headers
+        remaining = _header_number(headers, "X-Ratelimit-Remaining")
+        reset = _header_number(headers, "X-Ratelimit-Reset")
+        retry = _header_number(headers, "X-Ratelimit-Retry")
+        if retry is None:
+            retry = _header_number(headers, "Retry-After")
+
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if response.status_code == 429:
+                self.rate = max(self.min_rate, self.rate / 2)
+                wait = retry or reset or 1 / self.rate
+                self.blocked_until = max(self.blocked_until, now + wait)
+                self.tokens = 0
+                return wait
+
+            if remaining is not None:
+                if remaining <= 0:
+                    wait = reset or 1 / self.rate
+                    self.blocked_until = max(self.blocked_until, now + wait)
+                    self.tokens = 0
+                elif remaining > self.burst:
+                    # Запас есть - аккуратно ускоряемся
+                    self.rate = min(self.max_rate, self.rate + self.base_rate * 0.1)
+                # Не тратим больше, чем разрешает сервер
+                self.tokens = min(self.tokens, remaining)
+
+        return 0
+
+
+def _find_limit_config(host):
+    if host in RATE_LIMITS:
+        return RATE_LIMITS[host]
+    for pattern, config in RATE_LIMITS.items():
+        if pattern.startswith(".") and host.endswith(pattern):
+            return config
+    return None
+
+
+def get_limiter_for_url(url, api_key=None):
+    """
+    Возвращает ограничитель для хоста из url и ключа кабинета
+    None - если для хоста лимит не задан (запрос идёт без ограничений)
+    """
+    host = urlparse(url).hostname or ""
+    config = _find_limit_config(host)
+    if config is None:
+        return None
+
+    key = (host, api_key)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(host, config["rate"], config["burst"])
+            _limiters[key] = limiter
+        return limiter
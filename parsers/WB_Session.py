@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+СЕССИЯ ПОКУПАТЕЛЯ: ВХОД ОДИН РАЗ В БРАУЗЕРЕ, ДАЛЬШЕ ЦЕНЫ ПО HTTP
+Браузер нужен только ради авторизации (cookie x_wbaas_token) и выбранного ПВЗ:
+цена после СПП зависит от покупателя и dest. После входа сессия выгружается в
+data/wb_session.json:
+- cookies браузера и его User-Agent
+- адрес запроса карточки, который делает сама страница товара
+  (card.wb.ru/cards/v4/detail?...&dest=..&spp=..) - без nm
+Дальше цены запрашиваются напрямую, пачками по CARD_BATCH_SIZE артикулов
+(asyncio + aiohttp, общий пул соединений, не больше MAX_CONCURRENCY запросов).
+
+- export_session(driver, probe_url) - после входа (probe_url: страница любого товара,
+  чтобы страница сделала запрос карточки и стали известны dest и spp)
+- load_session() - сохранённая сессия или None (нет файла / нет токена / устарела)
+- fetch_prices(nm_ids, session) -> ({nmID: {price, basic_price, sold_out}}, expired)
+  expired=True - сервер перестал принимать сессию (401 / 403 / 498): оставшиеся
+  товары нужно снова смотреть в браузере (там же сессия выгрузится заново)
+
+Цены с WB кошельком в JSON нет - по HTTP известна только цена после СПП.
+Файл сессии содержит cookies авторизации - не передавайте его и не коммитьте.
+"""
+
+import os
+import json
+import time
+import asyncio
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import aiohttp
+
+from WB_Cdp_Capture import CardCapture, nm_id_from_url, parse_card_detail
+
+# === КОНФИГУРАЦИЯ ===
+# Пути относительно корня проекта
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+SESSION_FILE = os.path.join(DATA_DIR, "wb_session.json")
+
+AUTH_COOKIE = "x_wbaas_token"
+SESSION_MAX_AGE_HOURS = 12     # Старше - войти в браузере заново
+PROBE_TIMEOUT = 5              # Ожидание запроса карточки на странице-пробе (сек)
+
+# Если страница-проба не показала запрос карточки
+DEFAULT_CARD_URL = "https://card.wb.ru/cards/v4/detail"
+DEFAULT_CARD_PARAMS = {"appType": "1", "curr": "rub", "dest": "-1257786", "spp": "30"}
+
+CARD_BATCH_SIZE = 100          # Артикулов в одном запросе (nm=ID1;ID2;...)
+MAX_CONCURRENCY = 10           # Одновременных запросов
+REQUEST_TIMEOUT = 10           # Таймаут одного запроса (секунды)
+MAX_RETRIES = 3                # Повторы при 429/5xx и сетевых ошибках
+EXPIRED_STATUSES = (401, 403, 498)  # Сессию больше не принимают
+
+
+class SessionExpired(Exception):
+    """Сервер не принимает сохранённую сессию"""
+
+
+def export_session(driver, probe_url=None, path=SESSION_FILE):
+    """
+    Выгружает cookies, User-Agent и адрес запроса карточки из браузера в файл
+    probe_url - страница товара, которая откроется, чтобы увидеть запрос карточки
+    (нужен браузер с enable_network_capture). Возвращает сессию (dict)
+    """
+    capture = CardCapture.for_driver(driver)
+    nm_id = nm_id_from_url(probe_url)
+    if probe_url and nm_id and capture.card_url is None:
+        driver.get(probe_url)
+        capture.wait_for(nm_id, PROBE_TIMEOUT)
+
+    if capture.card_url:
+        parts = urlsplit(capture.card_url)
+        card_url = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        card_params = {key: value for key, value in parse_qsl(parts.query) if key != "nm"}
+    else:
+        print("    [!] Запрос карточки не пойман - dest и spp по умолчанию (цены могут отличаться)")
+        card_url, card_params = DEFAULT_CARD_URL, dict(DEFAULT_CARD_PARAMS)
+
+    session = {
+        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "user_agent": driver.execute_script("return navigator.userAgent"),
+        "cookies": [{key: cookie[key] for key in ("name", "value", "domain", "expiry") if key in cookie}
+                    for cookie in driver.get_cookies()],
+        "card_url": card_url,
+        "card_params": card_params,
+    }
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(session, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    print(f"    ✓ Сессия сохранена: {path} (dest {card_params.get('dest', '-')}, spp {card_params.get('spp', '-')})")
+    return session
+
+
+def session_problem(session, max_age_hours=SESSION_MAX_AGE_HOURS):
+    """Почему сессией нельзя пользоваться (строка) или None"""
+    token = next((cookie for cookie in session.get("cookies", []) if cookie.get("name") == AUTH_COOKIE), None)
+    if token is None:
+        return f"нет cookie {AUTH_COOKIE} (вход не выполнен)"
+    if token.get("expiry") and token["expiry"] <= time.time():
+        return "срок cookie авторизации истёк"
+    try:
+        created = datetime.strptime(session["created"], "%Y-%m-%d %H:%M:%S")
+    except (KeyError, ValueError):
+        return "повреждён файл сессии"
+    age_hours = (datetime.now() - created).total_seconds() / 3600
+    if age_hours > max_age_hours:
+        return f"сессии {age_hours:.0f} ч (больше {max_age_hours} ч)"
+    return None
+
+
+def load_session(path=SESSION_FILE, max_age_hours=SESSION_MAX_AGE_HOURS):
+    """Сохранённая сессия или None (с причиной в выводе)"""
+    if not os.path.exists(path):
+        print("    [!] Сохранённой сессии нет - нужен вход в браузере")
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            session = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"    [!] Не удалось прочитать сессию: {e}")
+        return None
+    problem = session_problem(session, max_age_hours)
+    if problem:
+        print(f"    [!] Сессия не подходит: {problem} - нужен вход в браузере")
+        return None
+    return session
+
+
+def _cookie_header(session, host):
+    """Cookies, которые браузер отправил бы на host"""
+    pairs = []
+    for cookie in session.get("cookies", []):
+        domain = cookie.get("domain", "").lstrip(".")
+        if domain and (host == domain or host.endswith("." + domain)):
+            pairs.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(pairs)
+
+
+async def _fetch_batch(http, semaphore, session, batch):
+    """
+    Цены пачки артикулов одним запросом
+    Возвращает {nmID: {price, basic_price, sold_out}}; SessionExpired - сессию не принимают
+    """
+    params = dict(session["card_params"], nm=";".join(batch))
+    url = f"{session['card_url']}?{urlencode(params, safe=';')}"
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                async with http.get(url) as response:
+                    status = response.status
+                    if status == 200:
+                        return parse_card_detail(await response.json(content_type=None))
+                    retry_after = response.headers.get("Retry-After", "")
+
+            if status in EXPIRED_STATUSES:
+                raise SessionExpired(f"HTTP {status}")
+            if status == 429 or status >= 500:
+                wait = float(retry_after) if retry_after.replace(".", "", 1).isdigit() else 0.5 * attempt
+                await asyncio.sleep(wait)
+                continue
+            print(f"  [Сессия] Пачка из {len(batch)} артикулов: HTTP {status}")
+            return {}
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            if attempt == MAX_RETRIES:
+                print(f"  [Сессия] Пачка из {len(batch)} артикулов: ошибка {e!r}")
+                return {}
+            await asyncio.sleep(0.5 * attempt)
+
+    return {}
+
+
+async def fetch_prices_async(nm_ids, session):
+    """
+    Цены всех артикулов по сессии (пачки по CARD_BATCH_SIZE, одновременно)
+    Возвращает ({nmID: {price, basic_price, sold_out}}, expired)
+    """
+    nm_ids = [str(nm_id) for nm_id in nm_ids]
+    batches = [nm_ids[i:i + CARD_BATCH_SIZE] for i in range(0, len(nm_ids), CARD_BATCH_SIZE)]
+    wanted = set(nm_ids)
+    results = {}
+    expired = False
+    if not batches:
+        return results, expired
+
+    headers = {
+        "User-Agent": session.get("user_agent") or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Accept": "application/json",
+        "Accept-Language": "ru-RU,ru;q=0.9",
+        "Referer": "https://www.wildberries.ru/",
+        "Origin": "https://www.wildberries.ru",
+    }
+    cookies = _cookie_header(session, urlsplit(session["card_url"]).hostname or "")
+    if cookies:
+        headers["Cookie"] = cookies
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY)
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT)
+
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as http:
+        tasks = [asyncio.ensure_future(_fetch_batch(http, semaphore, session, batch)) for batch in batches]
+        try:
+            for task in asyncio.as_completed(tasks):
+                try:
+                    cards = await task
+                except SessionExpired as e:
+                    print(f"  [Сессия] [!] Сессию больше не принимают ({e})")
+                    expired = True
+                    break
+                results.update((nm_id, card) for nm_id, card in cards.items() if nm_id in wanted)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Дожидаемся отменённых, чтобы сессия aiohttp закрылась без висящих запросов
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return results, expired
+
+
+def fetch_prices(nm_ids, session):
+    """Синхронная обёртка над fetch_prices_async"""
+    start_time = time.time()
+    results, expired = asyncio.run(fetch_prices_async(nm_ids, session))
+    elapsed = time.time() - start_time
+    print(f"  [Сессия] Получено {len(results)}/{len(nm_ids)} цен за {elapsed:.1f} сек")
+    return results, expired
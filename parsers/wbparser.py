@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+ЕДИНАЯ ТОЧКА ЗАПУСКА ПАРСЕРОВ (БЕЗ ВОПРОСОВ, ДЛЯ CRON / SYSTEMD)
+Каждый режим - это существующий скрипт, запущенный без input() и меню:
+    fast    - Parser_WB_API_FAST.py    (цены и остатки по списку артикулов, только API)
+    all     - Parser_WB_ALL_PRODUCTS.py (все товары всех кабинетов)
+    ids     - Step1_Load_All_IDs.py    (выгрузка всех nmID во входной лист)
+    card    - Parser_WB_Card_API.py    (цены с card.json, без ключей)
+    browser - Parser_UNIFIED.py        (браузер + API)
+
+ПРИМЕРЫ:
+    python parsers/wbparser.py fast
+    python parsers/wbparser.py fast --cabinets COSMO,MMA --concurrency 2
+    python parsers/wbparser.py card --input data/список.xlsx --output data/результат.xlsx
+    python parsers/wbparser.py all --backends parquet --dry-run
+    python parsers/wbparser.py ids --full-resync   # каталог целиком, удалённые карточки уходят из хранилища
+    python parsers/wbparser.py browser --session   # цены по сессии, сохранённой после входа (--auth)
+
+    # crontab: каждый день в 06:00
+    0 6 * * * cd /opt/parser && venv/bin/python parsers/wbparser.py fast >> logs/fast.log 2>&1
+
+Модуль режима импортируется только при запуске этого режима, поэтому
+selenium и прочие тяжёлые зависимости не грузятся для API-режимов.
+Код выхода: 0 - успех, 1 - ошибка, 2 - неверные параметры.
+"""
+
+import os
+import sys
+import argparse
+import importlib
+
+# Режим -> модуль и его настройки, которые можно переопределить из командной строки
+# input: "separate" - входную книгу можно указать отдельно, "shared" - читает и пишет одну книгу
+MODES = {
+    "fast": {
+        "module": "Parser_WB_API_FAST",
+        "help": "цены и остатки по артикулам из входного листа (API продавца)",
+        "input": "separate",
+        "input_sheet": "SHEET_INPUT_WB",
+        "output_sheet": "SHEET_OUTPUT_WB",
+        "cabinets": True,
+        "concurrency": ("WB_Cabinet_Routing", "MAX_CABINET_WORKERS"),
+    },
+    "all": {
+        "module": "Parser_WB_ALL_PRODUCTS",
+        "help": "все товары всех кабинетов с ценами до и после СПП",
+        "input": None,
+        "input_sheet": None,
+        "output_sheet": "SHEET_OUTPUT_WB",
+        "cabinets": True,
+        "concurrency": None,
+    },
+    "ids": {
+        "module": "Step1_Load_All_IDs",
+        "help": "выгрузить все nmID кабинетов во входной лист",
+        "input": None,
+        "input_sheet": None,
+        "output_sheet": "SHEET_INPUT_WB",
+        "cabinets": True,
+        "concurrency": None,
+    },
+    "card": {
+        "module": "Parser_WB_Card_API",
+        "help": "цены с карточек (card.json), без API ключей",
+        "input": "separate",
+        "input_sheet": "SHEET_INPUT",
+        "output_sheet": "SHEET_OUTPUT",
+        "cabinets": False,
+        "concurrency": ("WB_Basket_Fetcher", "MAX_CONCURRENCY_TOTAL"),
+    },
+    "browser": {
+        "module": "Parser_UNIFIED",
+        "help": "браузер + API (ключи из листа 'Настройка')",
+        "input": "shared",
+        "input_sheet": "SHEET_INPUT_WB",
+        "output_sheet": "SHEET_OUTPUT_WB",
+        "cabinets": False,
+        "concurrency": None,
+    },
+}
+
+KNOWN_BACKENDS = ["excel", "parquet"]
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--cabinets", help="кабинеты через запятую (по умолчанию - все из .env), например COSMO,MMA")
+    common.add_argument("--input", metavar="FILE", help="книга Excel с артикулами (по умолчанию - как --output)")
+    common.add_argument("--output", metavar="FILE", help="книга Excel для результатов (по умолчанию data/Парсер цен.xlsx)")
+    common.add_argument("--input-sheet", metavar="NAME", help="лист с артикулами")
+    common.add_argument("--output-sheet", metavar="NAME", help="лист результатов")
+    common.add_argument("--backends", help="форматы результатов: excel,parquet (по умолчанию WB_OUTPUT_BACKENDS)")
+    common.add_argument("--parquet-dir", metavar="DIR", help="папка наборов Parquet (по умолчанию data/parquet)")
+    common.add_argument("--concurrency", type=int, metavar="N",
+                        help="параллельность: кабинетов (fast) или запросов к CDN (card)")
+    common.add_argument("--full-resync", action="store_true",
+                        help="пройти каталог Content API целиком и убрать из хранилища пропавшие карточки "
+                             "(иначе - само, раз в WB_Content_Sync.FULL_RESYNC_DAYS дней)")
+    common.add_argument("--dry-run", action="store_true",
+                        help="показать настройки, ключи и число артикулов, ничего не запрашивая")
+
+    parser = argparse.ArgumentParser(
+        prog="wbparser",
+        description="Парсеры цен Wildberries без интерактивных вопросов",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Пример: python parsers/wbparser.py fast --cabinets COSMO,MMA --backends parquet",
+    )
+    subparsers = parser.add_subparsers(dest="mode", metavar="{" + ",".join(MODES) + "}")
+    subparsers.required = True
+    for mode, spec in MODES.items():
+        sub = subparsers.add_parser(mode, parents=[common], help=spec["help"], description=spec["help"])
+        if mode == "browser":
+            sub.add_argument("--auth", action="store_true",
+                             help="с авторизацией (нужен человек у браузера, только из терминала)")
+            sub.add_argument("--session", action="store_true",
+                             help="по сессии, сохранённой после --auth: цены по HTTP без браузера")
+    return parser
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def configure(args, parser):
+    """Импортирует модуль режима и переопределяет его настройки. Возвращает модуль"""
+    spec = MODES[args.mode]
+
+    if args.input and not spec["input"]:
+        parser.error(f"режим {args.mode} не читает артикулы из Excel, --input не нужен")
+    if args.input_sheet and not spec["input_sheet"]:
+        parser.error(f"режим {args.mode} не читает входной лист, --input-sheet не нужен")
+    if spec["input"] == "shared" and args.input and args.output and \
+            os.path.abspath(args.input) != os.path.abspath(args.output):
+        parser.error(f"режим {args.mode} читает и пишет одну книгу: укажите только --output")
+    if args.cabinets and not spec["cabinets"]:
+        parser.error(f"режим {args.mode} не использует кабинеты из .env, --cabinets не нужен")
+    if args.full_resync and not spec["cabinets"]:
+        parser.error(f"режим {args.mode} не синхронизирует карточки кабинетов, --full-resync не нужен")
+    if args.concurrency is not None and (not spec["concurrency"] or args.concurrency < 1):
+        parser.error(f"--concurrency: для режима {args.mode} "
+                     + ("нужно число >= 1" if spec["concurrency"] else "параллельность не настраивается"))
+    if getattr(args, "auth", False) and getattr(args, "session", False):
+        parser.error("--auth и --session не совмещаются (--session сам откроет браузер, если сессия истекла)")
+    if getattr(args, "auth", False) and not sys.stdin.isatty():
+        parser.error("--auth требует входа в браузере вручную - запускайте из терминала")
+
+    backends = None
+    if args.backends:
+        backends = _split_list(args.backends.lower())
+        unknown = [name for name in backends if name not in KNOWN_BACKENDS]
+        if unknown or not backends:
+            parser.error(f"--backends: неизвестный формат {', '.join(unknown)} (есть: {', '.join(KNOWN_BACKENDS)})")
+
+    module = importlib.import_module(spec["module"])
+
+    if args.cabinets:
+        cabinets = [name.upper() for name in _split_list(args.cabinets)]
+        unknown = [name for name in cabinets if name not in module.CABINET_NAMES]
+        if unknown or not cabinets:
+            parser.error(f"--cabinets: неизвестный кабинет {', '.join(unknown)} "
+                         f"(есть: {', '.join(module.CABINET_NAMES)})")
+        module.CABINET_NAMES = cabinets
+
+    input_file = args.input or args.output
+    if args.output:
+        module.EXCEL_FILE = os.path.abspath(args.output)
+    if spec["input"] == "separate" and input_file:
+        module.INPUT_EXCEL_FILE = os.path.abspath(input_file)
+    elif spec["input"] == "shared" and input_file:
+        module.EXCEL_FILE = os.path.abspath(input_file)
+    if args.input_sheet:
+        setattr(module, spec["input_sheet"], args.input_sheet)
+    if args.output_sheet:
+        setattr(module, spec["output_sheet"], args.output_sheet)
+
+    if args.concurrency is not None:
+        module_name, attr = spec["concurrency"]
+        setattr(importlib.import_module(module_name), attr, args.concurrency)
+
+    if args.full_resync:
+        importlib.import_module("WB_Content_Sync").FORCE_FULL_RESYNC = True
+
+    if backends or args.parquet_dir:
+        output_backends = importlib.import_module("WB_Output_Backends")
+        if backends:
+            output_backends.OUTPUT_BACKENDS = backends
+        if args.parquet_dir:
+            output_backends.PARQUET_DIR = os.path.abspath(args.parquet_dir)
+
+    return module
+
+
+def dry_run(args, module):
+    """Печатает, что будет сделано: файлы, листы, кабинеты с ключами, число артикулов"""
+    spec = MODES[args.mode]
+    output_backends = importlib.import_module("WB_Output_Backends")
+
+    print("\n" + "="*80)
+    print(f"ПРОБНЫЙ ЗАПУСК: {args.mode} ({spec['module']}.py) - запросов не будет")
+    print("="*80)
+    print(f"  Книга результатов: {module.EXCEL_FILE}")
+    print(f"  Лист результатов:  {getattr(module, spec['output_sheet'])}")
+
+    ok = True
+    if spec["input_sheet"]:
+        input_file = getattr(module, "INPUT_EXCEL_FILE", None) or module.EXCEL_FILE
+        input_sheet = getattr(module, spec["input_sheet"])
+        print(f"  Книга артикулов:   {input_file}")
+        print(f"  Лист артикулов:    {input_sheet}")
+        if not os.path.exists(input_file):
+            print(f"  [!] Файл не найден: {input_file}")
+            ok = False
+        else:
+            from WB_Input_Loader import load_input_articles
+            try:
+                print(f"  Артикулов:         {len(load_input_articles(input_file, input_sheet))}")
+            except KeyError:
+                print(f"  [!] Лист '{input_sheet}' не найден")
+                ok = False
+
+    if args.mode != "browser":
+        print(f"  Форматы:           {', '.join(output_backends.get_output_backends())}")
+        if "parquet" in output_backends.OUTPUT_BACKENDS:
+            print(f"  Parquet:           {output_backends.PARQUET_DIR}")
+
+    if spec["concurrency"]:
+        module_name, attr = spec["concurrency"]
+        print(f"  Параллельность:    {getattr(importlib.import_module(module_name), attr)}")
+
+    if spec["cabinets"]:
+        content_sync = importlib.import_module("WB_Content_Sync")
+        print("  Карточки кабинетов: " + ("полный обход" if content_sync.FORCE_FULL_RESYNC else
+              f"по курсору, полный обход раз в {content_sync.FULL_RESYNC_DAYS} дн."))
+        api_keys, _ = module.load_api_keys_from_env()
+        if not api_keys:
+            print("  [!] Нет API ключей в .env для выбранных кабинетов")
+            ok = False
+
+    print("="*80)
+    print("✓ Настройки в порядке" if ok else "[!] Есть ошибки - реальный запуск не пройдёт")
+    return ok
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    module = configure(args, parser)
+
+    if args.dry_run:
+        return 0 if dry_run(args, module) else 1
+
+    try:
+        if args.mode == "browser":
+            result = module.main(interactive=False,
+                                 auth_choice='1' if args.auth else '3' if args.session else '2')
+        elif args.mode == "card":
+            result = module.main()
+        else:
+            result = module.main(interactive=False)
+    except KeyboardInterrupt:
+        print("\n[!] Прервано пользователем")
+        return 130
+
+    return 0 if result else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())